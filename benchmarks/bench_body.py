@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Cost of materializing a ``plan_routes`` body out of the encoder's chunks.
+
+Compares the single ``''.join`` done by ``encode_body`` with writing the chunks
+into a reusable (pooled) buffer.
+
+Usage::
+
+    python -m benchmarks.bench_body [no_orders]
+"""
+import cStringIO
+import sys
+
+from optimo.util import OptimoEncoder
+
+from benchmarks.common import make_route_plan, best_of
+
+
+def main(no_orders=1000):
+    route_plan = make_route_plan(no_orders=no_orders)
+    encoder = OptimoEncoder()
+    chunks = encoder.iterencode(route_plan, _one_shot=True)
+    size = sum(len(chunk) for chunk in chunks)
+    print('{} orders, {} chunks, {} bytes'.format(no_orders, len(chunks), size))
+
+    pooled_bytearray = bytearray(size)
+
+    def slice_writes():
+        position = 0
+        for chunk in chunks:
+            end = position + len(chunk)
+            pooled_bytearray[position:end] = chunk
+            position = end
+
+    def bytearray_extend():
+        buf = bytearray()
+        map(buf.extend, chunks)
+
+    pooled_stringio = cStringIO.StringIO()
+
+    def stringio_writes():
+        pooled_stringio.seek(0)
+        pooled_stringio.truncate()
+        map(pooled_stringio.write, chunks)
+
+    print('{:<30} {:>8.2f} ms'.format(
+        'encode (chunks)', best_of(lambda: encoder.iterencode(route_plan, _one_shot=True)) * 1000))
+    for name, func in (('join', lambda: ''.join(chunks)),
+                       ('bytearray.extend', bytearray_extend),
+                       ('pooled bytearray slices', slice_writes),
+                       ('pooled cStringIO writes', stringio_writes)):
+        print('{:<30} {:>8.2f} ms'.format(name, best_of(func, number=10) * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
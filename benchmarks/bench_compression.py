@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Bytes on the wire vs CPU cost of compressing ``plan_routes`` bodies.
+
+Usage::
+
+    python -m benchmarks.bench_compression [no_orders]
+"""
+import json
+import sys
+
+from optimo.base import compress_body, decompress_content
+from optimo.util import OptimoEncoder
+
+from benchmarks.common import make_route_plan, best_of
+
+
+def main(no_orders=1000):
+    route_plan = make_route_plan(no_orders=no_orders)
+    body = json.dumps(route_plan, cls=OptimoEncoder)
+    print('{} orders, uncompressed body: {} bytes'.format(no_orders, len(body)))
+    print('{:<8} {:>5} {:>10} {:>7} {:>14} {:>16}'.format(
+        'method', 'level', 'bytes', 'ratio', 'compress (ms)', 'decompress (ms)'))
+
+    for method in ('gzip', 'deflate'):
+        for level in (1, 3, 6, 9):
+            compressed = compress_body(body, method, level)
+            compress_time = best_of(lambda: compress_body(body, method, level))
+            decompress_time = best_of(lambda: decompress_content(compressed, method))
+            print('{:<8} {:>5} {:>10} {:>7.3f} {:>14.2f} {:>16.2f}'.format(
+                method, level, len(compressed), float(len(compressed)) / len(body),
+                compress_time * 1000, decompress_time * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Encode time and payload size of a plan with full precision coordinates vs
+quantized ones.
+
+Usage::
+
+    python -m benchmarks.bench_coordinates [no_orders]
+"""
+import json
+import sys
+
+from optimo.util import OptimoEncoder
+
+from benchmarks.common import make_route_plan, best_of
+
+
+def main(no_orders=1000):
+    route_plan = make_route_plan(no_orders=no_orders)
+    print('{} orders'.format(no_orders))
+    print('{:<10} {:>10} {:>12}'.format('precision', 'bytes', 'encode (ms)'))
+    for precision in (None, 7, 6, 5):
+        encode = lambda: json.dumps(route_plan, cls=OptimoEncoder,
+                                    coordinate_precision=precision)
+        print('{:<10} {:>10} {:>12.2f}'.format(
+            precision, len(encode()), best_of(encode) * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
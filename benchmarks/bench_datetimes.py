@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Cost of formatting the datetimes of a plan, with the memoizing
+:class:`DatetimeFormatter` against a ``strftime`` per datetime, on its own and
+as part of encoding a whole plan.
+
+Usage::
+
+    python -m benchmarks.bench_datetimes [no_orders]
+"""
+import datetime
+import random
+import sys
+
+from optimo.util import DATETIME_FORMAT, DatetimeFormatter, OptimoEncoder
+
+from benchmarks.common import make_route_plan, best_of
+
+
+class StrftimeEncoder(OptimoEncoder):
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.strftime(DATETIME_FORMAT)
+        return super(StrftimeEncoder, self).default(o)
+
+
+def main(no_orders=5000):
+    rnd = random.Random(0)
+    day = datetime.datetime(year=2014, month=12, day=5)
+    dts = [day + datetime.timedelta(minutes=rnd.randrange(0, 600, 5)) for _ in range(50000)]
+    formatter = DatetimeFormatter()
+
+    def strftime():
+        for dt in dts:
+            dt.strftime(DATETIME_FORMAT)
+
+    def memoized():
+        for dt in dts:
+            formatter.format(dt)
+
+    print('{} datetimes: strftime {:.1f} ms, DatetimeFormatter {:.1f} ms'.format(
+        len(dts), best_of(strftime) * 1000, best_of(memoized) * 1000))
+
+    route_plan = make_route_plan(no_orders=no_orders)
+    plain = best_of(lambda: StrftimeEncoder().encode(route_plan), repeat=3)
+    memoized = best_of(lambda: OptimoEncoder().encode(route_plan), repeat=3)
+    print('encode {} orders: strftime {:.1f} ms, DatetimeFormatter {:.1f} ms'.format(
+        no_orders, plain * 1000, memoized * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Time to diff two results of a growing size, where 10% of the orders moved
+to another driver and 10% got a new time. It should grow linearly.
+
+Usage::
+
+    python -m benchmarks.bench_diff
+"""
+import random
+from datetime import datetime, timedelta
+
+from optimo.diff import diff_results
+from optimo.util import DATETIME_FORMAT
+
+from benchmarks.common import best_of
+
+
+def make_results(no_orders, no_drivers=250, seed=0):
+    rnd = random.Random(seed)
+    day = datetime(year=2014, month=12, day=5, hour=8)
+    old_routes = dict(('driver-{}'.format(i), []) for i in range(no_drivers))
+    new_routes = dict(('driver-{}'.format(i), []) for i in range(no_drivers))
+    for i in range(no_orders):
+        driver_id = 'driver-{}'.format(i % no_drivers)
+        scheduled_at = day + timedelta(minutes=i // no_drivers * 15)
+        old_routes[driver_id].append({'id': str(i), 'scheduledAt': scheduled_at.strftime(DATETIME_FORMAT)})
+        roll = rnd.random()
+        if roll < 0.1:
+            driver_id = 'driver-{}'.format(rnd.randrange(no_drivers))
+        elif roll < 0.2:
+            scheduled_at += timedelta(minutes=30)
+        new_routes[driver_id].append({'id': str(i), 'scheduledAt': scheduled_at.strftime(DATETIME_FORMAT)})
+
+    def result(routes):
+        return {'routes': [{'driverId': driver_id, 'orders': orders}
+                           for driver_id, orders in sorted(routes.items())],
+                'unservedOrders': []}
+    return result(old_routes), result(new_routes)
+
+
+def main():
+    print('{:>10} {:>12} {:>14}'.format('orders', 'diff (ms)', 'us per order'))
+    for no_orders in (10000, 50000, 200000):
+        old, new = make_results(no_orders)
+        elapsed = best_of(lambda: diff_results(old, new, threshold=5), repeat=3)
+        print('{:>10} {:>12.1f} {:>14.2f}'.format(no_orders, elapsed * 1000, elapsed / no_orders * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Time to export an archive of results to CSV and to a NumPy structured
+array, against walking the nested dicts into a list of row dicts.
+
+Usage::
+
+    python -m benchmarks.bench_export [no_stops]
+"""
+import io
+import sys
+
+from optimo.export import to_csv, to_numpy
+
+from benchmarks.bench_diff import make_results
+from benchmarks.common import best_of
+
+
+def walk(results):
+    rows = []
+    for response in results:
+        for route in response['routes']:
+            for sequence, order in enumerate(route['orders']):
+                rows.append({'driver_id': route['driverId'], 'order_id': order['id'],
+                             'sequence': sequence, 'scheduled_at': order['scheduledAt']})
+    return rows
+
+
+def main(no_stops=1000000):
+    # an archive of daily results of 50000 stops each
+    daily, _ = make_results(50000)
+    results = [daily] * (no_stops // 50000)
+    print('{} stops'.format(no_stops))
+    print('{:<16} {:>10} {:>12}'.format('export', 'time (s)', 'us per stop'))
+    timings = [
+        ('dict walk', lambda: walk(results)),
+        ('csv', lambda: to_csv(results, io.BytesIO())),
+    ]
+    try:
+        import numpy  # noqa
+    except ImportError:
+        print('numpy is not installed')
+    else:
+        timings.append(('numpy', lambda: to_numpy(results)))
+        timings.append(('numpy, U16 ids', lambda: to_numpy(results, id_dtype='U16')))
+    for name, func in timings:
+        elapsed = best_of(func, repeat=3)
+        print('{:<16} {:>10.2f} {:>12.2f}'.format(name, elapsed, elapsed / no_stops * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Cold import time of the package, each measured in a fresh interpreter, and
+of the first network use that loads the HTTP stack.
+
+Usage::
+
+    python -m benchmarks.bench_import
+"""
+import subprocess
+import sys
+
+
+STATEMENTS = [
+    ('python', 'pass'),
+    ('import optimo', 'import optimo'),
+    ('import optimo.models', 'import optimo.models'),
+    ('import requests', 'import requests'),
+    ('import optimo + session', 'import optimo; optimo.OptimoAPI("https://a.b", "key").core_api.get_session()'),
+]
+
+TIMER = '''
+import time
+start = time.time()
+{}
+print(time.time() - start)
+'''
+
+
+def import_time(statement, repeat=7):
+    """Returns the best time, in seconds, to run ``statement`` in a new
+    interpreter.
+    """
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', TIMER.format(statement)])
+        timings.append(float(output))
+    return min(timings)
+
+
+def main():
+    print('{:>26} {:>10}'.format('statement', 'time (ms)'))
+    for name, statement in STATEMENTS:
+        print('{:>26} {:>10.1f}'.format(name, import_time(statement) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Time to encode a plan and to parse a result with each installed JSON
+backend.
+
+Usage::
+
+    python -m benchmarks.bench_json
+"""
+import json
+
+from optimo.jsonbackend import BACKENDS
+from optimo.util import OptimoEncoder
+
+from benchmarks.common import best_of, make_route_plan
+
+
+def make_result(no_orders, no_drivers=50):
+    return json.dumps({'success': True, 'requestId': 'bench', 'result': {
+        'routes': [{'driverId': str(i), 'orders': [
+            {'id': str(j), 'scheduledAt': '2014-12-05T08:00', 'lat': 53.1 + j * 1e-5, 'lng': -6.2}
+            for j in range(i, no_orders, no_drivers)
+        ]} for i in range(no_drivers)],
+        'unservedOrders': [],
+    }})
+
+
+def main():
+    route_plan = make_route_plan(2000, 50)
+    result = make_result(2000)
+    print('{:<12} {:>12} {:>12}'.format('backend', 'dumps (ms)', 'loads (ms)'))
+    for name, backend_cls in BACKENDS:
+        try:
+            backend = backend_cls()
+        except ImportError:
+            print('{:<12} not installed'.format(name))
+            continue
+        dumps = best_of(lambda: backend.dumps(route_plan, cls=OptimoEncoder, validate_models=False))
+        loads = best_of(lambda: backend.loads(result), number=10)
+        print('{:<12} {:>12.1f} {:>12.2f}'.format(name, dumps * 1000, loads * 1000))
+
+
+if __name__ == '__main__':
+    main()
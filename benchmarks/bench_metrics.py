@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Time to compute the distances and costs of every route of a result, with
+and without ``numpy``.
+
+Usage::
+
+    python -m benchmarks.bench_metrics
+"""
+from optimo.metrics import route_metrics
+
+from benchmarks.common import best_of, make_route_plan
+
+
+def make_result(route_plan):
+    drivers = route_plan.drivers
+    routes = [{'driverId': drv.id, 'orders': []} for drv in drivers]
+    for i, order in enumerate(route_plan.orders):
+        routes[i % len(drivers)]['orders'].append({'id': order.id})
+    return {'routes': routes, 'unservedOrders': []}
+
+
+def main():
+    try:
+        import numpy  # noqa
+    except ImportError:
+        numpy = None
+    print('{:>8} {:>8} {:>12} {:>12}'.format('orders', 'routes', 'python (ms)', 'numpy (ms)'))
+    for no_orders, no_drivers in ((10000, 500), (50000, 2500), (200000, 10000)):
+        route_plan = make_route_plan(no_orders, no_drivers)
+        result = make_result(route_plan)
+        python = best_of(lambda: route_metrics(route_plan, result, use_numpy=False), repeat=3)
+        vectorized = float('nan')
+        if numpy is not None:
+            vectorized = best_of(lambda: route_metrics(route_plan, result, use_numpy=True), repeat=3)
+        print('{:>8} {:>8} {:>12.1f} {:>12.1f}'.format(
+            no_orders, no_drivers, python * 1000, vectorized * 1000))
+
+
+if __name__ == '__main__':
+    main()
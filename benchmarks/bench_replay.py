@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Records ``get()`` and ``plan()`` traffic against the local stub server,
+then replays it with the recorded latency, 10 times faster and without any,
+to show the client-side cost that is left once the network is taken out.
+
+Usage::
+
+    python -m benchmarks.bench_replay [no_requests]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from optimo import OptimoAPI
+from optimo.recording import RecordingTransport, ReplayTransport
+from optimo.transports import RequestsTransport
+
+from benchmarks.common import make_route_plan, stub_server
+
+
+def run(optimo_api, route_plan, no_requests):
+    started = time.time()
+    for i in xrange(no_requests):
+        if i % 10 == 0:
+            optimo_api.plan(route_plan, validation_sample=0.01)
+        else:
+            optimo_api.get('bench')
+    return time.time() - started
+
+
+def main(no_requests=1000):
+    route_plan = make_route_plan(200, 10)
+    route_plan.request_id = 'bench'
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'traffic.rec')
+    try:
+        with stub_server() as url:
+            transport = RecordingTransport(RequestsTransport(), path)
+            live = run(OptimoAPI(url, 'benchkey', transport=transport), route_plan, no_requests)
+            transport.close()
+        print('{} requests, {} KB recorded'.format(no_requests, os.path.getsize(path) // 1024))
+        print('{:<16} {:>10}'.format('run', 'time (s)'))
+        print('{:<16} {:>10.3f}'.format('live', live))
+        for name, speed in (('replay x1', 1.0), ('replay x10', 10.0), ('replay, no wait', None)):
+            transport = ReplayTransport(path, speed=speed)
+            elapsed = run(OptimoAPI(url, 'benchkey', transport=transport), route_plan, no_requests)
+            print('{:<16} {:>10.3f}'.format(name, elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
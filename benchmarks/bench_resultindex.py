@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Time to build a :class:`ResultIndex` and to answer time-range and
+next-stop queries with it, against scanning the result for each query.
+
+Usage::
+
+    python -m benchmarks.bench_resultindex
+"""
+from datetime import datetime, timedelta
+
+from optimo.resultindex import ResultIndex
+from optimo.util import DATETIME_FORMAT
+
+from benchmarks.bench_diff import make_results
+from benchmarks.common import best_of
+
+
+def scan_between(result, start, end):
+    start, end = start.strftime(DATETIME_FORMAT), end.strftime(DATETIME_FORMAT)
+    return [order['id'] for route in result['routes'] for order in route['orders']
+            if start <= order['scheduledAt'] < end]
+
+
+def main():
+    start = datetime(year=2014, month=12, day=5, hour=10)
+    end = start + timedelta(hours=1)
+    now = start + timedelta(minutes=17)
+    print('{:>8} {:>10} {:>14} {:>14} {:>14}'.format(
+        'orders', 'build (ms)', 'between (us)', 'scan (us)', 'next stop (us)'))
+    for no_orders in (10000, 50000, 200000):
+        result, _ = make_results(no_orders)
+        build = best_of(lambda: ResultIndex(result), repeat=3)
+        index = ResultIndex(result)
+        between = best_of(lambda: index.between(start, end), number=100)
+        scan = best_of(lambda: scan_between(result, start, end), repeat=3)
+        next_stop = best_of(lambda: index.next_stop(now, driver_id='driver-7'), number=1000)
+        print('{:>8} {:>10.1f} {:>14.1f} {:>14.1f} {:>14.2f}'.format(
+            no_orders, build * 1000, between * 1e6, scan * 1e6, next_stop * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Time to find the drivers that have the skills of every order, with skill
+masks against intersecting per-skill driver sets.
+
+Usage::
+
+    python -m benchmarks.bench_skills
+"""
+import random
+from collections import defaultdict
+
+from optimo import Driver, Order
+from optimo.skills import SkillMatcher
+
+from benchmarks.common import best_of
+
+
+SKILLS = ['skill-{}'.format(i) for i in range(20)]
+
+
+def make_models(no_orders, no_drivers, seed=0):
+    rnd = random.Random(seed)
+    drivers = [Driver('driver-{}'.format(i), 53.35, -6.26, 53.35, -6.26,
+                      skills=rnd.sample(SKILLS, rnd.randint(2, 6)))
+               for i in range(no_drivers)]
+    orders = [Order('order-{}'.format(i), 53.35, -6.26, 15,
+                    skills=rnd.sample(SKILLS, rnd.randint(0, 2)))
+              for i in range(no_orders)]
+    return orders, drivers
+
+
+def match_sets(orders, drivers):
+    skill_index = defaultdict(set)
+    for drv in drivers:
+        for skill in drv.skills:
+            skill_index[skill].add(drv.id)
+    matches = []
+    for order in orders:
+        candidates = None
+        for skill in order.skills:
+            driver_ids = skill_index.get(skill, set())
+            candidates = set(driver_ids) if candidates is None else candidates & driver_ids
+        matches.append(candidates)
+    return matches
+
+
+def match_masks(orders, drivers):
+    matcher = SkillMatcher(drivers)
+    return [matcher.drivers_for(order.skill_mask) for order in orders]
+
+
+def main():
+    print('{:>8} {:>8} {:>10} {:>11}'.format('orders', 'drivers', 'sets (ms)', 'masks (ms)'))
+    for no_orders, no_drivers in ((10000, 200), (100000, 2000)):
+        orders, drivers = make_models(no_orders, no_drivers)
+        sets = best_of(lambda: match_sets(orders, drivers), repeat=3)
+        masks = best_of(lambda: match_masks(orders, drivers), repeat=3)
+        print('{:>8} {:>8} {:>10.1f} {:>11.1f}'.format(
+            no_orders, no_drivers, sets * 1000, masks * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Throughput of ``get()`` calls of a single, shared ``OptimoAPI`` from a
+growing number of threads, against a local stub server.
+
+Compares the per-thread sessions of ``CoreOptimoAPI`` with a new connection
+per request and with a single session shared by every thread.
+
+Usage::
+
+    python -m benchmarks.bench_threads [no_requests]
+"""
+import sys
+import threading
+import time
+
+import requests
+
+from optimo import OptimoAPI
+
+from benchmarks.common import stub_server
+
+
+def throughput(optimo_api, no_threads, no_requests):
+    per_thread = no_requests // no_threads
+
+    def work():
+        for _ in xrange(per_thread):
+            optimo_api.get('bench')
+
+    threads = [threading.Thread(target=work) for _ in range(no_threads)]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_thread * no_threads / (time.time() - started)
+
+
+def main(no_requests=2000):
+    with stub_server() as url:
+        print('{} requests'.format(no_requests))
+        print('{:<20} {:>8} {:>12}'.format('sessions', 'threads', 'requests/s'))
+        for name, session in (('per thread', None),
+                              # the module behaves like a session without pooling
+                              ('none', requests),
+                              ('single shared', requests.Session())):
+            for no_threads in (1, 4, 8, 16):
+                optimo_api = OptimoAPI(url, 'benchkey', session=session)
+                print('{:<20} {:>8} {:>12.0f}'.format(
+                    name, no_threads, throughput(optimo_api, no_threads, no_requests)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
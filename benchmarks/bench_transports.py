@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Throughput of concurrent ``get()`` polls and of ``plan()`` submissions
+through each transport, against a local stub server.
+
+The stub server only speaks HTTP/1.1, so :class:`HTTP2Transport` is only
+benchmarked against a server given on the command line (it also needs
+``hyper`` to be installed).
+
+Usage::
+
+    python -m benchmarks.bench_transports [no_requests] [http2_url]
+"""
+import sys
+import threading
+import time
+
+from optimo import OptimoAPI
+from optimo.transports import HTTP2Transport, RequestsTransport, Urllib3Transport
+
+from benchmarks.common import make_route_plan, stub_server
+
+
+def throughput(func, no_threads, no_requests):
+    per_thread = no_requests // no_threads
+
+    def work():
+        for _ in xrange(per_thread):
+            func()
+
+    threads = [threading.Thread(target=work) for _ in range(no_threads)]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_thread * no_threads / (time.time() - started)
+
+
+def run(name, url, transport, no_requests, route_plan):
+    optimo_api = OptimoAPI(url, 'benchkey', transport=transport)
+    for no_threads in (1, 8, 32):
+        print('{:<10} {:<6} {:>8} {:>12.0f}'.format(
+            name, 'get', no_threads,
+            throughput(lambda: optimo_api.get('bench'), no_threads, no_requests)))
+    print('{:<10} {:<6} {:>8} {:>12.0f}'.format(
+        name, 'plan', 4,
+        throughput(lambda: optimo_api.plan(route_plan, validation_sample=0.01), 4, no_requests // 10)))
+    optimo_api.core_api.close()
+
+
+def main(no_requests=2000, http2_url=None):
+    route_plan = make_route_plan(200, 10)
+    route_plan.request_id = 'bench'
+    print('{} requests'.format(no_requests))
+    print('{:<10} {:<6} {:>8} {:>12}'.format('transport', 'call', 'threads', 'requests/s'))
+    with stub_server() as url:
+        run('requests', url, RequestsTransport(), no_requests, route_plan)
+        run('urllib3', url, Urllib3Transport(maxsize=32), no_requests, route_plan)
+    if http2_url is None:
+        print('http2: skipped, pass the url of an HTTP/2 server')
+    else:
+        run('http2', http2_url, HTTP2Transport(), no_requests, route_plan)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Validation time of a plan with the models' own ``validate()`` methods vs
+the checks compiled from the JSON schema that :meth:`OptimoAPI.plan` uses for
+sampled plans, with ``Decimal`` and ``float`` coordinates.
+
+Usage::
+
+    python -m benchmarks.bench_validation [no_orders]
+"""
+import sys
+
+from optimo.compiler import get_validators
+from optimo.validation import validate_route_plan
+
+from benchmarks.common import make_route_plan, best_of
+
+
+def to_floats(route_plan):
+    for order in route_plan.orders:
+        order.lat, order.lng = float(order.lat), float(order.lng)
+    for drv in route_plan.drivers:
+        drv.start_lat, drv.start_lng = float(drv.start_lat), float(drv.start_lng)
+        drv.end_lat, drv.end_lng = float(drv.end_lat), float(drv.end_lng)
+    return route_plan
+
+
+def main(no_orders=1000):
+    validators = get_validators('v1')
+    print('{} orders'.format(no_orders))
+    print('{:<10} {:<16} {:>10}'.format('coords', 'validation', 'time (ms)'))
+    for coords, route_plan in (('Decimal', make_route_plan(no_orders=no_orders)),
+                               ('float', to_floats(make_route_plan(no_orders=no_orders)))):
+        for name, validate in (
+                ('collect_errors', route_plan.collect_errors),
+                ('compiled', lambda: validate_route_plan(route_plan, validators=validators))):
+            print('{:<10} {:<16} {:>10.2f}'.format(coords, name, best_of(validate) * 1000))
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
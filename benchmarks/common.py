@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by the benchmark scripts. Not part of the library."""
+import BaseHTTPServer
+import SocketServer
+import multiprocessing
+import random
+import timeit
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from optimo import (
+    TimeWindow,
+    WorkShift,
+    Break,
+    Driver,
+    Order,
+    RoutePlan,
+)
+
+
+def make_route_plan(no_orders=1000, no_drivers=50, seed=0):
+    """Builds a realistic, valid :class:`RoutePlan` for a single working day.
+
+    :param no_orders: ``int`` number of orders
+    :param no_drivers: ``int`` number of drivers
+    :param seed: seed of the random generator, so runs are reproducible
+    """
+    rnd = random.Random(seed)
+    day = datetime(year=2014, month=12, day=5)
+    skills = ['fridge', 'lift', 'hazmat', 'ladder']
+
+    def coordinate(center):
+        return Decimal(repr(center + rnd.uniform(-0.1, 0.1)))
+
+    drivers = []
+    for i in range(no_drivers):
+        shift = WorkShift(
+            start_work=day + timedelta(hours=8),
+            end_work=day + timedelta(hours=17),
+            allowed_overtime=30,
+            break_=Break(day + timedelta(hours=12), day + timedelta(hours=13), 30),
+        )
+        drivers.append(Driver(
+            id='driver-{}'.format(i),
+            start_lat=coordinate(53.35), start_lng=coordinate(-6.26),
+            end_lat=coordinate(53.35), end_lng=coordinate(-6.26),
+            work_shifts=[shift],
+            skills=rnd.sample(skills, 2),
+        ))
+
+    orders = []
+    for i in range(no_orders):
+        start = day + timedelta(hours=8, minutes=rnd.randrange(0, 8 * 60, 15))
+        orders.append(Order(
+            id='order-{}'.format(i),
+            lat=coordinate(53.35),
+            lng=coordinate(-6.26),
+            duration=rnd.choice([10, 15, 20, 30]),
+            time_window=TimeWindow(start, start + timedelta(hours=2)),
+            priority=rnd.choice('LMHC'),
+            skills=rnd.sample(skills, rnd.randint(0, 1)),
+        ))
+
+    return RoutePlan(
+        request_id='bench',
+        callback_url='https://callback.example.com/bench',
+        status_callback_url='https://status.example.com/bench',
+        orders=orders,
+        drivers=drivers,
+    )
+
+
+def best_of(func, repeat=5, number=1):
+    """Returns the best wall-clock time, in seconds, of a single ``func()`` call"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+STUB_GET_RESPONSE = ('{"success": true, "requestId": "bench", "status": "F", '
+                     '"routes": [], "unserved": []}')
+STUB_POST_RESPONSE = '{"success": true}'
+
+
+class _StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connections can be reused
+    # send each response in a single packet, right away
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _respond(self, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self._respond(STUB_GET_RESPONSE)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.getheader('Content-Length') or 0))
+        self._respond(STUB_POST_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def _serve(port_queue):
+    server = _StubServer(('127.0.0.1', 0), _StubHandler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+@contextmanager
+def stub_server():
+    """Runs a local HTTP server that answers like OptimoRoute's service, in a
+    separate process so it doesn't compete for the GIL with the client.
+
+    :return: ``str`` base url of the server
+    """
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(port_queue,))
+    process.daemon = True
+    process.start()
+    try:
+        yield 'http://127.0.0.1:{}'.format(port_queue.get(timeout=10))
+    finally:
+        process.terminate()
+        process.join()
@@ -1,14 +1,16 @@
 # -*- coding: utf-8 -*-
-import json
-
 from .errors import OptimoError
 from .base import CoreOptimoAPI
-from .util import OptimoEncoder, DEFAULT_API_VERSION, validate_config_params
+from .util import OptimoEncoder, DEFAULT_API_VERSION, SingleFlight, validate_config_params
 from .models import RoutePlan
+from .compiler import get_validators
+from .fingerprint import fingerprint
+from .jsonbackend import default_backend
+from .validation import validate_route_plan
 
 
 def parse_response(raw_response):
-    data = json.loads(raw_response['content'])
+    data = default_backend().loads(raw_response['content'])
     status_code = raw_response['status_code']
     return data, status_code
 
@@ -18,9 +20,28 @@ class OptimoAPI(object):
 
     Uses :class:`CoreOptimoAPI` internally to perform the actual API calls.
 
-    :param optimo_url: the url of the optimoroute's service
+    :param optimo_url: the url of the optimoroute's service. It's normalized
+        (lower case scheme and host, no default port or trailing slash).
     :param access_key: access key for the account (provided by optimoroute)
     :param version: (optional) API version string(v1, v2, ...). Will be appended to ``optimo_url``
+    :param result_ttl: (optional) ``float`` number of seconds the result of
+        :meth:`get` is shared with later calls for the same ``request_id``.
+        Concurrent calls for the same ``request_id`` always share a single
+        request.
+    :param plan_cache: (optional) :class:`optimo.fingerprint.PlanCache`. When
+        given, a plan with the same content and callback urls as one that was
+        already submitted (see :mod:`optimo.fingerprint`) is not submitted
+        again: its request id is answered by the earlier optimization.
+    :param job_tracker: (optional) :class:`optimo.jobs.JobTracker` that
+        records the submitted plans and the state of their optimizations,
+        see :meth:`poll_jobs`.
+    :param core_options: (optional) keyword arguments that will be relayed to
+        :class:`CoreOptimoAPI` (e.g. ``compression='gzip'``)
+
+    A single instance can be shared between threads, e.g. by the workers of a
+    threaded WSGI server. :meth:`plan` works on a snapshot of the route plan
+    (see :meth:`RoutePlan.snapshot`), so other threads may keep adding orders
+    to it in the meantime.
 
     Usage::
 
@@ -31,24 +52,73 @@ class OptimoAPI(object):
       >>> optimo_api.get('1234')  # Get the results of a plan optimization
       >>> optimo_api.stop('1234')  # Stop a running plan optimization
     """
-    def __init__(self, optimo_url, access_key, version=DEFAULT_API_VERSION):
+    def __init__(self, optimo_url, access_key, version=DEFAULT_API_VERSION,
+                 result_ttl=0.0, plan_cache=None, job_tracker=None, **core_options):
         optimo_url, version, access_key = validate_config_params(
             optimo_url,
             version,
             access_key
         )
-        self.core_api = CoreOptimoAPI(optimo_url, version, access_key)
+        self.core_api = CoreOptimoAPI(optimo_url, version, access_key, **core_options)
         self.optimo_url = optimo_url
         self.version = version
         self.access_key = access_key
+        self._validators = None
+        self.results = SingleFlight(ttl=result_ttl)
+        self.plan_cache = plan_cache
+        self.job_tracker = job_tracker
+        # coalesces concurrent submissions of the same plan
+        self._plans = SingleFlight()
+
+    @property
+    def validators(self):
+        """The :class:`optimo.compiler.CompiledValidators` of the JSON schema
+        of ``version``, compiled on first use.
+        """
+        if self._validators is None:
+            self._validators = get_validators(self.version)
+        return self._validators
+
+    def _plan_validators(self):
+        try:
+            return self.validators
+        except OptimoError:
+            # no JSON schema is shipped for this version
+            return None
 
-    def plan(self, route_plan, encoder=OptimoEncoder):
+    def validate(self, route_plan, fail_fast=False):
+        """Checks a route plan against the JSON schema of the API version
+        used by this instance, collecting every problem.
+
+        :param route_plan: a :class:`Routeplan <RoutePlan>` object
+        :param fail_fast: (optional) ``bool``, stop at the first problem
+        :return: :class:`optimo.validation.ValidationReport` object
+        """
+        return validate_route_plan(route_plan, fail_fast=fail_fast,
+                                   validators=self.validators)
+
+    def plan(self, route_plan, encoder=OptimoEncoder, validation_sample=1.0,
+             deep_snapshot=False):
         """Starts a plan optimization
 
         :param route_plan: a :class:`Routeplan <RoutePlan>` object
         :param encoder: (optional) Custom JSON encoder that will be relayed to ``json.dumps()``
+        :param validation_sample: (optional) ``float`` in ``(0, 1]``. When less
+            than ``1.0``, only that fraction of the orders and the drivers is
+            validated (see :func:`optimo.validation.validate_route_plan`). Only
+            use it for homogeneous plans that come from a trusted source.
+        :param deep_snapshot: (optional) ``bool``, also copy the orders and the
+            drivers of the plan before validating and encoding it. Use it when
+            other threads modify them in place.
         :return: ``None`` if successful, otherwise it will raise an :class:`OptimoError`
-                 with an appropriate error message.
+                 with an appropriate error message, or the ``TypeError`` or
+                 ``ValueError`` of an invalid plan.
+
+        The whole plan is validated with the models' ``validate()`` methods.
+        A sampled plan is checked against the JSON schema of ``version`` with
+        the compiled :attr:`validators` instead (falling back to the models,
+        for versions without a schema), which reject everything the models
+        reject, and the rest of its models are encoded without validation.
         """
         if not isinstance(route_plan, RoutePlan):
             raise TypeError(
@@ -56,11 +126,43 @@ class OptimoAPI(object):
                 .format(RoutePlan, type(route_plan))
             )
 
-        route_plan.validate()
-        raw_response = self.core_api.plan_routes(route_plan, encoder=encoder)
+        # validate and encode the same orders and drivers
+        route_plan = route_plan.snapshot(deep=deep_snapshot)
+        request_id = route_plan.request_id
+        self.results.forget(request_id)
+        if self.plan_cache is not None:
+            self.plan_cache.forget(request_id)
+        encoder_options = None
+        if validation_sample < 1.0:
+            validate_route_plan(route_plan, fail_fast=True, sample=validation_sample,
+                                validators=self._plan_validators()).raise_for_errors()
+            encoder_options = {'validate_models': False}
+        else:
+            # the models are validated while being encoded
+            route_plan.validate()
+
+        if self.plan_cache is None:
+            self._submit(route_plan, encoder, encoder_options)
+            return
+        plan_fingerprint = fingerprint(route_plan)
+        original_request_id = self.plan_cache.lookup(plan_fingerprint)
+        if original_request_id is None:
+            original_request_id = self._plans.do(
+                plan_fingerprint, self._submit, route_plan, encoder, encoder_options,
+                plan_fingerprint=plan_fingerprint)
+        self.plan_cache.alias(request_id, original_request_id)
+
+    def _submit(self, route_plan, encoder, encoder_options, plan_fingerprint=None):
+        raw_response = self.core_api.plan_routes(route_plan, encoder=encoder,
+                                                 encoder_options=encoder_options)
         data, status_code = parse_response(raw_response)
         if not data['success']:
             raise OptimoError(data['message'])
+        if plan_fingerprint is not None:
+            self.plan_cache.add(plan_fingerprint, route_plan.request_id)
+        if self.job_tracker is not None:
+            self.job_tracker.submitted(route_plan.request_id)
+        return route_plan.request_id
 
     def stop(self, request_id):
         """Stops the plan optimization corresponding to the ``request_id``
@@ -70,11 +172,21 @@ class OptimoAPI(object):
         :return: ``None`` if successful, otherwise it will raise an :class:`OptimoError`
                  with an appropriate error message.
         """
+        self.results.forget(request_id)
+        if self.plan_cache is not None:
+            original_request_id = self.plan_cache.resolve(request_id)
+            self.plan_cache.forget(request_id)
+            if original_request_id != request_id:
+                # the optimization is shared with another request id, which
+                # will still need it
+                return
         payload = {'requestId': request_id}
         raw_response = self.core_api.stop_planning(payload)
         data, status_code = parse_response(raw_response)
         if not data['success']:
             raise OptimoError(data['message'])
+        if self.job_tracker is not None:
+            self.job_tracker.stopped(request_id)
 
     def get(self, request_id):
         """Gets the results of the plan optimization corresponding to the
@@ -83,13 +195,65 @@ class OptimoAPI(object):
         :param request_id: the string request id that was provided to
                            optimoroute for a specific plan optimization.
         :return: dictionary with information about the planned optimization.
+                 It's shared with the concurrent calls for the same
+                 ``request_id``, so it must not be modified.
         """
+        if self.plan_cache is not None:
+            request_id = self.plan_cache.resolve(request_id)
+            result = self.plan_cache.get_result(request_id)
+            if result is not None:
+                return result
+        return self.results.do(request_id, self._get, request_id)
+
+    def _get(self, request_id):
+        if self.plan_cache is not None:
+            result = self._fetch(request_id)
+            if result is not None:
+                self.plan_cache.set_result(request_id, result)
+            return result
+        return self._fetch(request_id)
+
+    def _fetch(self, request_id):
         raw_response = self.core_api.get_result(request_id)
         data, status_code = parse_response(raw_response)
+        job_tracker = self.job_tracker
         if data['success'] is True:
+            if job_tracker is not None:
+                job_tracker.finished(request_id, data)
             return data
         elif data['code'] == 'ERR_PLANNING_IN_PROGRESS':
+            if job_tracker is not None:
+                job_tracker.running(request_id)
             # Just return None. No reason to panic.
             return
         else:
+            if job_tracker is not None:
+                job_tracker.failed(request_id, data['message'])
             raise OptimoError(data['message'])
+
+    def poll_jobs(self, limit=100):
+        """Gets the results of the optimizations of the ``job_tracker`` that
+        are due for a poll, e.g. to resume polling after a restart. Each job
+        is claimed in the tracker first, so several workers can call it
+        concurrently without polling the same job twice.
+
+        :param limit: (optional) ``int`` maximum number of jobs to poll
+        :return: ``list`` of ``(request_id, result)`` of the optimizations
+                 that finished
+        """
+        if self.job_tracker is None:
+            raise OptimoError("'poll_jobs' requires a 'job_tracker'")
+        finished = []
+        for request_id in self.job_tracker.claim_due(limit):
+            try:
+                result = self.get(request_id)
+            except Exception:
+                # the tracker recorded the failure, or the poll was throttled
+                # or could not reach the service (connection errors, 5xx
+                # responses that aren't JSON...) and will be retried once the
+                # job's lease runs out. Either way, the other jobs still get
+                # polled.
+                continue
+            if result is not None:
+                finished.append((request_id, result))
+        return finished
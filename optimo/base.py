@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
-import json
-
-import requests
+import zlib
 
+from optimo.jsonbackend import default_backend
+from optimo.transports import RequestsTransport
 from optimo.util import CoreOptimoEncoder
 
 
@@ -12,16 +12,108 @@ ENDPOINT_METHODS = {
     'stop_planning': 'POST',
 }
 
+COMPRESSION_METHODS = ('gzip', 'deflate')
+DEFAULT_COMPRESSION_LEVEL = 6
+# bodies smaller than this (in bytes) are not worth the CPU cost of compressing
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+
+def compress_body(body, method, level=DEFAULT_COMPRESSION_LEVEL):
+    """Compresses a request body.
+
+    :param body: ``str`` body to compress
+    :param method: one of ('gzip', 'deflate')
+    :param level: ``int`` zlib compression level (1-9)
+    :return: ``str`` of the compressed body
+    """
+    if method == 'gzip':
+        wbits = 16 + zlib.MAX_WBITS
+    else:
+        wbits = zlib.MAX_WBITS
+    compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+    return compressor.compress(body) + compressor.flush()
+
+
+def decompress_content(content, encoding):
+    """Decompresses gzip/deflate encoded response content.
+
+    Some HTTP libraries (e.g. ``requests``) already decode the content, but
+    leave the ``Content-Encoding`` header in place, so the content is only
+    touched if it actually starts with a gzip or zlib header.
+
+    :param content: ``str`` raw response content
+    :param encoding: value of the ``Content-Encoding`` response header
+    :return: ``str`` of the decompressed content
+    """
+    if not content or not encoding or encoding.lower() not in COMPRESSION_METHODS:
+        return content
+    if content[:1] not in ('\x1f', '\x78'):
+        return content
+    # 32 + MAX_WBITS auto-detects the gzip and zlib headers
+    return zlib.decompress(content, 32 + zlib.MAX_WBITS)
+
+
+def encode_body(data, encoder=CoreOptimoEncoder, encoder_options=None):
+    """Serializes ``data`` to the UTF-8 JSON bytes of a request body.
+
+    The C encoder of the JSON backend (see :mod:`optimo.jsonbackend`)
+    produces the chunks of the JSON document, which are then joined exactly
+    once; unicode output (e.g. ``ensure_ascii=False`` encoders) is encoded to
+    UTF-8 in that same step.
+
+    :param data: the data to serialize
+    :param encoder: JSON encoder class
+    :param encoder_options: (optional) ``dict`` of keyword arguments for the
+        encoder (e.g. ``{'coordinate_precision': 6}``)
+    :return: ``str`` (bytes) of the body
+    """
+    body = default_backend().dumps(data, cls=encoder, **(encoder_options or {}))
+    if isinstance(body, unicode):
+        body = body.encode('utf-8')
+    return body
+
+
+def get_header(headers, name):
+    """Case-insensitive lookup of the ``name`` header"""
+    if not headers:
+        return None
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
 
 class CoreOptimoAPI(object):
     """Low-level interface for the optimoroute API.
 
-    Leverages the ``requests`` library to perform the HTTP requests to the
-    OptimoRoute's service.
+    Leverages the ``requests`` library (or another ``transport``) to perform
+    the HTTP requests to the OptimoRoute's service.
+
+    Instances are safe to share between threads: their configuration is not
+    changed after construction and, unless a ``session`` is given, each thread
+    sends its requests through a :class:`requests.Session` of its own, which
+    keeps its connections open for the next requests of that thread.
 
     :param base_url: the url of the optimoroute's service
     :param version: API version string(v1, v2, ...). Will be appended to ``base_url``
     :param access_key: access key for the account (provided by optimoroute)
+    :param compression: (optional) one of ('gzip', 'deflate') to compress the
+        bodies of the POST requests. Disabled by default.
+    :param compression_level: (optional) ``int`` zlib compression level (1-9)
+    :param compression_threshold: (optional) ``int`` bodies smaller than this
+        number of bytes are sent uncompressed.
+    :param session: (optional) :class:`requests.Session` to send the requests
+        of every thread with, e.g. to share its connection pool between
+        instances
+    :param throttle: (optional) :class:`optimo.ratelimit.Throttle` (or any
+        object with an ``acquire(access_key, endpoint)`` method) that is waited
+        on before each request is sent
+    :param scheduler: (optional) :class:`optimo.scheduler.RequestScheduler`
+        that admits the requests by priority
+    :param transport: (optional) :class:`optimo.transports.Transport` to send
+        the requests with. Defaults to a
+        :class:`optimo.transports.RequestsTransport` over ``session``.
 
     Usage:
       >>> from optimo.base import CoreOptimoAPI
@@ -34,17 +126,38 @@ class CoreOptimoAPI(object):
       >>> stop_plan_data = {'requestId': '1234'}
       >>> core_api.stop_planning(stop_plan_data)
     """
-    def __init__(self, base_url, version, access_key):
+    def __init__(self, base_url, version, access_key, compression=None,
+                 compression_level=DEFAULT_COMPRESSION_LEVEL,
+                 compression_threshold=DEFAULT_COMPRESSION_THRESHOLD,
+                 session=None, throttle=None, scheduler=None, transport=None):
+        if compression is not None and compression not in COMPRESSION_METHODS:
+            raise ValueError(
+                "'compression' must be one of {!r}".format(COMPRESSION_METHODS)
+            )
         self.base_url = base_url
         self.version = version
         self.access_key = access_key
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+        self.session = session
+        self.throttle = throttle
+        self.scheduler = scheduler
+        self.transport = transport if transport is not None else RequestsTransport(session)
+
+    def get_session(self):
+        """Returns the :class:`requests.Session` of the current thread (or the
+        shared ``session``, if one was given), when using a
+        :class:`optimo.transports.RequestsTransport`.
+        """
+        return self.transport.get_session()
 
     def raw_request(self, url, method, params, data=None, headers=None):
-        """Performs the actual http requests to OptimoRoute's service, by using
-        the ``requests`` library.
+        """Performs the actual http requests to OptimoRoute's service, through
+        the ``transport``.
 
-        If for some reason someone would want to use a different library, this
-        is the function they should override.
+        To use a different library, pass a ``transport`` (see
+        :mod:`optimo.transports`) rather than overriding this.
 
         The only requirement is to always return a dictionary of the form:
         {
@@ -56,26 +169,20 @@ class CoreOptimoAPI(object):
         :param url: the full url for the specific operation
         :param method: the HTTP method ('GET' and 'POST' are currently supported)
         :param params: url parameters (the access key is always passed in this way)
-        :param data: (optional) for POST operations it will hold the data that
-                     will be sent to the server.
+        :param data: (optional) for POST operations it will hold the encoded
+                     body (``str``, ``bytearray`` or ``memoryview``) that will
+                     be sent to the server.
         :param headers: (optional) dictionary with any additional custom headers
         :return: dictionary containing the server's raw response
         """
-        if method == 'GET':
-            resp = requests.get(url, params=params, headers=headers)
-        else:
-            # POST
-            resp = requests.post(url, params=params, data=data, headers=headers)
+        return self.transport.request(url, method, params, data, headers)
 
-        resp_dict = {
-            'status_code': resp.status_code,
-            'headers': resp.headers,
-            'content': resp.content
-        }
-        return resp_dict
+    def close(self):
+        """Closes the open connections of the ``transport``"""
+        self.transport.close()
 
     def do_request(self, endpoint, request_id=None, data=None, headers=None,
-                   encoder=CoreOptimoEncoder):
+                   encoder=CoreOptimoEncoder, encoder_options=None):
         """Resolves optimoroute operations to HTTP methods and prepares the
         data that will be passed to ``raw_request()``.
 
@@ -84,7 +191,10 @@ class CoreOptimoAPI(object):
         :param data: (optional) holds the data for the POST operations.
         :param headers: (optional) dictionary of additional custom headers
         :param encoder: (optional) custom encoder to be used on the data.
-        :return: dictionary containing the server's raw response
+        :param encoder_options: (optional) ``dict`` of keyword arguments for
+                                the encoder.
+        :return: dictionary containing the server's raw response, with its
+                 content decompressed if it was gzip/deflate encoded.
         """
         method = ENDPOINT_METHODS[endpoint]
         url = u'/'.join([self.base_url, self.version, endpoint])
@@ -96,21 +206,38 @@ class CoreOptimoAPI(object):
         else:
             # POST
             if data:
-                data = json.dumps(data, cls=encoder)
+                data = encode_body(data, encoder, encoder_options)
+                if self.compression and len(data) >= self.compression_threshold:
+                    data = compress_body(data, self.compression, self.compression_level)
+                    headers = dict(headers or {})
+                    headers['Content-Encoding'] = self.compression
+                    headers.setdefault('Content-Type', 'application/json')
 
-        resp_dict = self.raw_request(url, method, params, data, headers)
+        if self.throttle is not None:
+            self.throttle.acquire(self.access_key, endpoint)
+        if self.scheduler is not None:
+            with self.scheduler.slot(endpoint):
+                resp_dict = self.raw_request(url, method, params, data, headers)
+        else:
+            resp_dict = self.raw_request(url, method, params, data, headers)
+        resp_dict['content'] = decompress_content(
+            resp_dict['content'],
+            get_header(resp_dict['headers'], 'Content-Encoding')
+        )
         return resp_dict
 
-    def plan_routes(self, data, headers=None, encoder=CoreOptimoEncoder):
+    def plan_routes(self, data, headers=None, encoder=CoreOptimoEncoder,
+                    encoder_options=None):
         """Performs request to start a plan optimization.
 
         :param data: dictionary with route plan data as expected by optimoroute
         :param headers: dictionary of additional custom headers
-        :param encoder:
+        :param encoder: custom encoder to be used on the data
+        :param encoder_options: ``dict`` of keyword arguments for the encoder
         :return: dictionary containing the server's raw response
         """
         resp_dict = self.do_request('plan_routes', data=data, headers=headers,
-                                    encoder=encoder)
+                                    encoder=encoder, encoder_options=encoder_options)
         return resp_dict
 
     def get_result(self, request_id, headers=None):
@@ -0,0 +1,522 @@
+# -*- coding: utf-8 -*-
+"""Compiles OptimoRoute's versioned JSON schema into flat, per-model
+validation functions.
+
+For every model class, the properties of its part of the schema are turned
+into straight-line Python source (one ``isinstance`` and a few comparisons
+per attribute), which is compiled once per API version. The resulting checks
+read the model attributes directly, report every problem of a model instead
+of the first one and don't go through :meth:`BaseModel.validate_type`.
+
+The rules of the models that the schema can't express (non empty ids and
+work shifts, url schemes, polygon coordinates, stricter types, properties that
+can't be ``None``) are checked too, so the compiled checks reject everything
+the models' ``validate()`` methods reject, as well as what only the schema
+does (e.g. coordinate ranges). :meth:`optimo.OptimoAPI.plan` validates sampled
+plans with them.
+
+Usage::
+
+  >>> from optimo.compiler import get_validators
+  >>> validators = get_validators('v1')
+  >>> validators.errors(order)
+  ["'Order.lat' must be >= -90"]
+"""
+import datetime
+import json
+import os
+import threading
+import urlparse
+from decimal import Decimal
+from numbers import Number
+
+from .errors import OptimoError, OptimoValidationError
+from .models import (
+    ITERABLES,
+    Break,
+    Driver,
+    OptimizationParameters,
+    Order,
+    RoutePlan,
+    SchedulingInfo,
+    ServiceRegionPolygon,
+    TimeWindow,
+    WorkShift,
+)
+
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), 'schema')
+
+_ORDER = ('properties', 'orders', 'items')
+_DRIVER = ('properties', 'drivers', 'items')
+_WORK_SHIFT = _DRIVER + ('properties', 'workShifts', 'items')
+
+#: model class -> (path of its schema, {schema property: model attribute}).
+#: ``None`` maps the whole schema node to a single attribute.
+MODEL_SCHEMAS = (
+    (RoutePlan, (), {
+        'requestId': 'request_id',
+        'callback': 'callback_url',
+        'statusCallback': 'status_callback_url',
+        'noLoadCapacities': 'no_load_capacities',
+        'orders': 'orders',
+        'drivers': 'drivers',
+        'optimizationParameters': 'optimization_parameters',
+    }),
+    (OptimizationParameters, ('properties', 'optimizationParameters'), {
+        'serviceOutsideServiceAreas': 'service_outside_service_areas',
+        'balancing': 'balancing',
+        'balanceBy': 'balance_by',
+        'balancingFactor': 'balancing_factor',
+    }),
+    (Order, _ORDER, {
+        'id': 'id',
+        'lat': 'lat',
+        'lon': 'lng',
+        'duration': 'duration',
+        'tw': 'time_window',
+        'priority': 'priority',
+        'skills': 'skills',
+        'assignedTo': 'assigned_to',
+        'schedulingInfo': 'scheduling_info',
+    }),
+    (TimeWindow, _ORDER + ('properties', 'tw'), {
+        'timeFrom': 'start_time',
+        'timeTo': 'end_time',
+    }),
+    (SchedulingInfo, _ORDER + ('properties', 'schedulingInfo'), {
+        'scheduledAt': 'scheduled_at',
+        'scheduledDriver': 'scheduled_driver',
+        'locked': 'locked',
+    }),
+    (Driver, _DRIVER, {
+        'id': 'id',
+        'startLat': 'start_lat',
+        'startLon': 'start_lng',
+        'endLat': 'end_lat',
+        'endLon': 'end_lng',
+        'workShifts': 'work_shifts',
+        'skills': 'skills',
+        'speedFactor': 'speed_factor',
+        'serviceRegions': 'service_regions',
+        'costPerHour': 'cost_per_hour',
+        'costPerHourForOvertime': 'cost_per_hour_for_overtime',
+        'costPerKm': 'cost_per_km',
+        'fixedCost': 'fixed_cost',
+    }),
+    (WorkShift, _WORK_SHIFT, {
+        'workTimeFrom': 'start_work',
+        'workTimeTo': 'end_work',
+        'allowedOvertime': 'allowed_overtime',
+        'break': 'break_',
+        'unavailableTimes': 'unavailable_times',
+    }),
+    (Break, _WORK_SHIFT + ('properties', 'break'), {
+        'breakStartFrom': 'earliest_start',
+        'breakStartTo': 'latest_start',
+        'breakDuration': 'duration',
+    }),
+    (ServiceRegionPolygon, _DRIVER + ('properties', 'serviceRegions', 'items'), {
+        None: 'lat_lng_pairs',
+    }),
+)
+
+# schema nodes of models that appear in more than one place
+EXTRA_SCHEMA_PATHS = {
+    _WORK_SHIFT + ('properties', 'unavailableTimes', 'items'): TimeWindow,
+}
+
+# string properties that hold a driver id, but also accept a Driver object
+REFERENCE_PROPERTIES = ('assignedTo', 'scheduledDriver')
+
+# string properties the models don't accept empty
+NON_EMPTY_PROPERTIES = {
+    RoutePlan: ('requestId',),
+    Order: ('id',),
+    Driver: ('id',),
+}
+
+# string properties that hold a url, which must have a scheme
+URL_PROPERTIES = ('callback', 'statusCallback')
+
+# optional properties that still can't be None: the models either always
+# encode them (and the schema has no null) or reject None themselves
+NOT_NULL_PROPERTIES = {
+    RoutePlan: ('statusCallback', 'optimizationParameters'),
+    OptimizationParameters: ('serviceOutsideServiceAreas', 'balancing', 'balanceBy',
+                             'balancingFactor'),
+    Order: ('priority', 'skills'),
+    SchedulingInfo: ('locked',),
+    Driver: ('skills', 'serviceRegions'),
+    WorkShift: ('unavailableTimes',),
+}
+
+# properties the models accept fewer types for than the schema
+TYPE_OVERRIDES = {
+    Order: {'id': 'str'},
+    OptimizationParameters: {'balancingFactor': 'fraction'},
+}
+
+# array properties the models don't accept empty
+MIN_ITEMS = {
+    Driver: {'workShifts': 1},
+}
+
+# models with rules the schema doesn't express (the coordinate ranges of
+# polygons), that are also checked with their own validate() once the
+# compiled checks pass. They are rare enough for it not to matter.
+MODEL_VALIDATED = (ServiceRegionPolygon,)
+
+_TYPE_CHECKS = {
+    'string': ('isinstance({0}, basestring)', 'a string'),
+    'datetime': ('isinstance({0}, datetime)', 'a datetime'),
+    'reference': ('isinstance({0}, (basestring, Driver))', 'a string or a Driver'),
+    'number': ('type({0}) in NUMBERS or (isinstance({0}, Number) and not isinstance({0}, bool))',
+               'a number'),
+    'integer': ('type({0}) in INTEGERS or (isinstance({0}, (int, long)) and not isinstance({0}, bool))',
+                'an integer'),
+    'boolean': ('isinstance({0}, bool)', 'a boolean'),
+    'array': ('isinstance({0}, ITERABLES)', 'a list'),
+    'str': ('isinstance({0}, str)', 'a str'),
+    'fraction': ('isinstance({0}, (float, Decimal))', 'a float or a Decimal'),
+}
+
+_NAMESPACE = {
+    'datetime': datetime.datetime,
+    'Number': Number,
+    'ITERABLES': ITERABLES,
+    # the common types are looked up directly, ABC isinstance() checks are slow
+    'NUMBERS': frozenset([int, long, float, Decimal]),
+    'INTEGERS': frozenset([int, long]),
+    'FLOATS': frozenset([int, long, float]),
+    'Decimal': Decimal,
+    'urlsplit': urlparse.urlsplit,
+}
+for _cls, _, _ in MODEL_SCHEMAS:
+    _NAMESPACE[_cls.__name__] = _cls
+
+
+def load_schema(version):
+    """Loads the JSON schema of an API version shipped with the package.
+
+    :param version: API version string (v1, v2, ...)
+    :return: ``dict`` of the JSON schema
+    :raises OptimoError: if there is no schema for ``version``
+    """
+    version_dir = os.path.join(SCHEMA_DIR, version)
+    if not os.path.isdir(version_dir):
+        raise OptimoError("There is no JSON schema for API version '{}'".format(version))
+    for filename in sorted(os.listdir(version_dir)):
+        if filename.endswith('.json'):
+            with open(os.path.join(version_dir, filename)) as f:
+                return json.load(f)
+    raise OptimoError("There is no JSON schema for API version '{}'".format(version))
+
+
+def _schema_node(schema, path):
+    node = schema
+    for key in path:
+        node = node[key]
+    return node
+
+
+class _Source(object):
+    """Accumulates indented source lines, and the constants they refer to"""
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+
+    def add(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def constant(self, value):
+        """Returns the name of a global holding ``value``, so it's built once
+        instead of on every call.
+        """
+        name = 'CONSTANT{}'.format(len(self.constants))
+        self.constants[name] = value
+        return name
+
+
+def _compile_value(src, indent, node, var, label, kind, model_name, stop=False,
+                   non_empty=False, url=False):
+    """Appends the checks of the ``var`` variable against the schema ``node``.
+
+    :param kind: key of ``_TYPE_CHECKS``, ``'object'`` or ``None`` (enum only)
+    :param model_name: class name expected for ``'object'`` values and items
+    :param stop: whether to ``break`` out of the enclosing loop on an error
+    :param non_empty: whether to reject empty values
+    :param url: whether the value is a url that must have a scheme
+    """
+    def fail(indent, msg):
+        src.add(indent, 'errors.append({!r})'.format("'{}' {}".format(label, msg)))
+        if stop:
+            src.add(indent, 'break')
+
+    if kind == 'object':
+        src.add(indent, 'if not isinstance({}, {}):'.format(var, model_name))
+        fail(indent + 1, 'must be of type {}'.format(model_name))
+        return
+    if kind is not None:
+        check, description = _TYPE_CHECKS[kind]
+        src.add(indent, 'if not ({}):'.format(check.format(var)))
+        fail(indent + 1, 'must be {}'.format(description))
+        src.add(indent, 'else:')
+        indent += 1
+    start = len(src.lines)
+
+    if non_empty:
+        src.add(indent, 'if not {}:'.format(var))
+        fail(indent + 1, 'cannot be empty')
+    if url:
+        src.add(indent, 'if not urlsplit({}).scheme:'.format(var))
+        src.add(indent + 1, 'errors.append("The url: \'{}\' does not define a protocol '
+                            'scheme".format(%s))' % var)
+    if 'enum' in node:
+        enum = frozenset(str(value) for value in node['enum'])
+        src.add(indent, 'if {} not in {}:'.format(var, src.constant(enum)))
+        fail(indent + 1, 'must be one of: {}'.format(', '.join(node['enum'])))
+    if 'minimum' in node or 'maximum' in node:
+        _compile_range(src, indent, node, var, fail, decimals=kind in ('number', 'fraction'))
+    if 'minItems' in node:
+        src.add(indent, 'if len({}) < {!r}:'.format(var, node['minItems']))
+        fail(indent + 1, 'must have at least {!r} elements'.format(node['minItems']))
+    if 'maxItems' in node:
+        src.add(indent, 'if len({}) > {!r}:'.format(var, node['maxItems']))
+        fail(indent + 1, 'must have at most {!r} elements'.format(node['maxItems']))
+
+    items = node.get('items')
+    if kind == 'array' and isinstance(items, dict):
+        item_var = 'item{}'.format(indent)
+        item_kind = 'object' if model_name else _kind(items, None)
+        if item_kind == 'object' and not model_name:
+            item_kind = None
+        # report a single bad element per list
+        if item_kind == 'array':
+            errors_before = 'errors_before{}'.format(indent)
+            src.add(indent, '{} = len(errors)'.format(errors_before))
+            src.add(indent, 'for {} in {}:'.format(item_var, var))
+            _compile_value(src, indent + 1, items, item_var,
+                           '{}[]'.format(label), item_kind, model_name)
+            src.add(indent + 1, 'if len(errors) > {}:'.format(errors_before))
+            src.add(indent + 2, 'break')
+        elif item_kind is not None:
+            src.add(indent, 'for {} in {}:'.format(item_var, var))
+            _compile_value(src, indent + 1, items, item_var,
+                           '{}[]'.format(label), item_kind, model_name, stop=True)
+
+    if kind is not None and len(src.lines) == start:
+        # no constraints besides the type, drop the 'else:'
+        src.lines.pop()
+
+
+def _is_integral(value):
+    return value is None or value == int(value)
+
+
+def _max_magnitude_exponent(minimum, maximum):
+    """Returns the largest ``e`` for which every number with ``abs(x) <
+    10 ** (e + 1)`` is inside of ``[minimum, maximum]``, or ``None``.
+    """
+    if minimum is None or maximum is None or not minimum < 0 < maximum:
+        return None
+    bound = min(-minimum, maximum)
+    exponent = 0
+    while 10 ** (exponent + 1) <= bound:
+        exponent += 1
+    while 10 ** exponent > bound:
+        exponent -= 1
+    return exponent - 1
+
+
+def _compile_range(src, indent, node, var, fail, decimals=True):
+    """Appends the ``minimum``/``maximum`` checks of ``var``.
+
+    Numbers are compared as floats, like the API does once the JSON is
+    parsed. Converting a ``Decimal`` to a float is slow though, and so is
+    comparing ``Decimal`` objects, so ``Decimal`` values are first checked
+    with cheaper, exact tests:
+
+    * their magnitude (``Decimal.adjusted()``), when every number of that
+      magnitude is in range, e.g. any ``abs(v) < 100`` for a longitude
+    * with integral bounds, their truncation to an ``int``, as
+      ``min < int(v) < max`` implies ``min < v < max``
+
+    Only the values that fail both (within 1 of a bound, out of range, or not
+    finite) are converted.
+    """
+    minimum, maximum = node.get('minimum'), node.get('maximum')
+    fast_checks = []
+    if decimals:
+        exponent = _max_magnitude_exponent(minimum, maximum)
+        if exponent is not None:
+            fast_checks.append('{}.adjusted() <= {!r}'.format(var, exponent))
+        if _is_integral(minimum) and _is_integral(maximum):
+            bounds = 'int({})'.format(var)
+            if minimum is not None:
+                bounds = '{!r} < {}'.format(int(minimum), bounds)
+            if maximum is not None:
+                bounds = '{} < {!r}'.format(bounds, int(maximum))
+            fast_checks.append(bounds)
+    if fast_checks:
+        src.add(indent, 'if not (type({0}) is Decimal and {0}.is_finite() and ({1})):'
+                .format(var, ' or '.join(fast_checks)))
+        indent += 1
+    src.add(indent, 'f = {0} if type({0}) in FLOATS else float({0})'.format(var))
+    if minimum is not None:
+        src.add(indent, 'if f < {!r}:'.format(minimum))
+        fail(indent + 1, 'must be >= {!r}'.format(minimum))
+    if maximum is not None:
+        src.add(indent, 'if f > {!r}:'.format(maximum))
+        fail(indent + 1, 'must be <= {!r}'.format(maximum))
+
+
+def _kind(node, key):
+    if 'type' not in node:
+        return None
+    kind = node['type']
+    if kind == 'string' and node.get('format') == 'datetime':
+        return 'datetime'
+    if kind == 'string' and key in REFERENCE_PROPERTIES:
+        return 'reference'
+    return kind
+
+
+def compile_model_source(schema, cls, path, attributes, classes_by_path):
+    """Generates the source of the check function of a model class.
+
+    :return: ``tuple`` of the ``str`` source of a ``check(obj)`` function
+             that returns the ``list`` of error messages of ``obj``, and the
+             ``dict`` of the globals it needs besides the common ones.
+    """
+    node = _schema_node(schema, path)
+    cls_name = cls.__name__
+    src = _Source()
+    src.add(0, 'def check_{}(obj):'.format(cls_name))
+    src.add(1, 'errors = []')
+
+    required = set(node.get('required', ()))
+    if None in attributes:
+        properties = [(None, node)]
+    else:
+        properties = sorted(node.get('properties', {}).items())
+    for key, prop in properties:
+        attr = attributes.get(key)
+        if attr is None:
+            # not supported by the models (e.g. 'load1'), nothing to check
+            continue
+        label = '{}.{}'.format(cls_name, attr)
+        prop_path = path if key is None else path + ('properties', key)
+        kind = TYPE_OVERRIDES.get(cls, {}).get(key) or _kind(prop, key)
+        min_items = MIN_ITEMS.get(cls, {}).get(key)
+        if min_items is not None:
+            prop = dict(prop, minItems=max(min_items, prop.get('minItems', 0)))
+        model_name = None
+        if kind == 'object':
+            model_name = classes_by_path[prop_path].__name__
+        elif kind == 'array' and prop_path + ('items',) in classes_by_path:
+            model_name = classes_by_path[prop_path + ('items',)].__name__
+
+        src.add(1, 'v = obj.{}'.format(attr))
+        if key in required or key is None:
+            src.add(1, 'if v is None:')
+            src.add(2, 'errors.append({!r})'.format("'{}' is required".format(label)))
+            src.add(1, 'else:')
+            indent = 2
+        elif key in NOT_NULL_PROPERTIES.get(cls, ()):
+            # None fails the type check
+            indent = 1
+        else:
+            src.add(1, 'if v is not None:')
+            indent = 2
+        _compile_value(src, indent, prop, 'v', label, kind, model_name,
+                       non_empty=key in NON_EMPTY_PROPERTIES.get(cls, ()),
+                       url=key in URL_PROPERTIES)
+
+    src.add(1, 'return errors')
+    return '\n'.join(src.lines) + '\n', src.constants
+
+
+class CompiledValidators(object):
+    """The compiled checks of all the models, for a single API version.
+
+    :param version: API version string (v1, v2, ...)
+    :param schema: (optional) ``dict`` of the JSON schema. Loaded from the
+        package when not given.
+    """
+    def __init__(self, version, schema=None):
+        self.version = version
+        self.schema = schema if schema is not None else load_schema(version)
+        self.sources = {}
+        self.checks = {}
+
+        classes_by_path = dict((path, cls) for cls, path, _ in MODEL_SCHEMAS)
+        classes_by_path.update(EXTRA_SCHEMA_PATHS)
+        for cls, path, attributes in MODEL_SCHEMAS:
+            source, constants = compile_model_source(self.schema, cls, path, attributes,
+                                                     classes_by_path)
+            namespace = dict(_NAMESPACE)
+            namespace.update(constants)
+            code = compile(source, '<optimo {} {} validator>'.format(version, cls.__name__), 'exec')
+            exec code in namespace
+            self.sources[cls] = source
+            self.checks[cls] = namespace['check_{}'.format(cls.__name__)]
+        for cls in MODEL_VALIDATED:
+            self.checks[cls] = _with_model_validation(self.checks[cls])
+
+    def errors(self, model):
+        """Returns the error messages of a single model (its nested models
+        are only type-checked).
+
+        :param model: :class:`optimo.models.BaseModel` object
+        :return: ``list`` of ``str`` messages, empty if the model is valid
+        """
+        check = self.checks.get(type(model))
+        if check is None:
+            for cls in type(model).__mro__:
+                check = self.checks.get(cls)
+                if check is not None:
+                    break
+            else:
+                raise TypeError("No compiled validator for {!r}".format(type(model)))
+        return check(model)
+
+    def validate(self, model):
+        """Validates a single model.
+
+        :raises OptimoValidationError: listing all of the model's errors
+        """
+        errors = self.errors(model)
+        if errors:
+            raise OptimoValidationError('; '.join(errors), errors=errors)
+
+
+def _with_model_validation(check):
+    def check_with_model_validation(obj):
+        errors = check(obj)
+        if not errors:
+            try:
+                obj.validate()
+            except (TypeError, ValueError, OptimoError) as e:
+                errors.append(str(e))
+        return errors
+    return check_with_model_validation
+
+
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def get_validators(version):
+    """Returns the (cached) :class:`CompiledValidators` of an API version.
+
+    :param version: API version string (v1, v2, ...)
+    :raises OptimoError: if there is no schema for ``version``
+    """
+    validators = _validators.get(version)
+    if validators is None:
+        with _validators_lock:
+            validators = _validators.get(version)
+            if validators is None:
+                validators = _validators[version] = CompiledValidators(version)
+    return validators
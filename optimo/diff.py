@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Differences between two optimization results of the same fleet, e.g. to
+only push the changed stops to the drivers after a re-plan.
+
+Both results are indexed by order id once, so diffing takes linear time in
+the number of orders.
+
+Usage::
+
+  >>> from optimo.diff import diff_results
+  >>> old, new = optimo_api.get('plan-1'), optimo_api.get('plan-2')
+  >>> diff = diff_results(old, new, threshold=10)
+  >>> diff.reassigned
+  [Reassignment(order_id=u'123', old_driver_id=u'drv1', new_driver_id=u'drv2')]
+  >>> diff.changed_drivers
+  set([u'drv1', u'drv2'])
+"""
+from collections import namedtuple
+
+from .util import DatetimeParser, unwrap_result
+
+
+Reassignment = namedtuple('Reassignment', 'order_id old_driver_id new_driver_id')
+TimeShift = namedtuple('TimeShift', 'order_id driver_id old_time new_time minutes')
+RouteChange = namedtuple('RouteChange', 'driver_id old_order_ids new_order_ids')
+
+
+class _IndexedResult(object):
+    """The routes and the unserved orders of a result, indexed by id"""
+    def __init__(self, result):
+        result = unwrap_result(result)
+        # order id -> (driver id, scheduledAt)
+        self.stops = {}
+        # driver id -> tuple of order ids, in visiting order
+        self.routes = {}
+        self.driver_ids = []
+        for route in result.get('routes') or ():
+            driver_id = route['driverId']
+            order_ids = []
+            for order in route.get('orders') or ():
+                self.stops[order['id']] = (driver_id, order.get('scheduledAt'))
+                order_ids.append(order['id'])
+            self.routes[driver_id] = tuple(order_ids)
+            self.driver_ids.append(driver_id)
+        self.unserved_ids = [
+            order['id'] if isinstance(order, dict) else order
+            for order in result.get('unservedOrders') or ()
+        ]
+        self.unserved = set(self.unserved_ids)
+
+
+def _stop_ids(result):
+    for driver_id in result.driver_ids:
+        for order_id in result.routes[driver_id]:
+            yield order_id
+
+
+class ResultDiff(object):
+    """The changes between two results.
+
+    :ivar reassigned: ``list`` of :class:`Reassignment` of orders served by a
+        different driver
+    :ivar time_shifts: ``list`` of :class:`TimeShift` of orders served by the
+        same driver, whose time changed by more than the threshold
+    :ivar newly_unserved: ``list`` of ids of orders that were served and no
+        longer are (or that are new and unserved)
+    :ivar newly_served: ``list`` of ids of orders that are served and weren't
+    :ivar route_changes: ``list`` of :class:`RouteChange` of the drivers whose
+        sequence of orders changed
+    """
+    def __init__(self):
+        self.reassigned = []
+        self.time_shifts = []
+        self.newly_unserved = []
+        self.newly_served = []
+        self.route_changes = []
+
+    def __nonzero__(self):
+        return bool(self.reassigned or self.time_shifts or self.newly_unserved or
+                    self.newly_served or self.route_changes)
+
+    @property
+    def changed_drivers(self):
+        """``set`` of the ids of the drivers whose stops changed"""
+        drivers = set()
+        for change in self.reassigned:
+            drivers.add(change.old_driver_id)
+            drivers.add(change.new_driver_id)
+        drivers.update(shift.driver_id for shift in self.time_shifts)
+        drivers.update(change.driver_id for change in self.route_changes)
+        drivers.discard(None)
+        return drivers
+
+
+def diff_results(old, new, threshold=0):
+    """Compares two results of :meth:`optimo.OptimoAPI.get`.
+
+    :param old: ``dict`` of the previous result (the whole response, or its
+        ``'result'``)
+    :param new: ``dict`` of the new result
+    :param threshold: (optional) ``int`` number of minutes an order's time must
+        move by to be reported as a :class:`TimeShift`
+    :return: :class:`ResultDiff` object. Its lists follow the order of the
+        routes and the unserved orders of ``new``.
+    """
+    old = _IndexedResult(old)
+    new = _IndexedResult(new)
+    diff = ResultDiff()
+    parse_time = DatetimeParser()
+
+    for order_id in _stop_ids(new):
+        driver_id, scheduled_at = new.stops[order_id]
+        previous = old.stops.get(order_id)
+        if previous is None:
+            diff.newly_served.append(order_id)
+            continue
+        old_driver_id, old_scheduled_at = previous
+        if old_driver_id != driver_id:
+            diff.reassigned.append(Reassignment(order_id, old_driver_id, driver_id))
+        elif old_scheduled_at != scheduled_at and old_scheduled_at and scheduled_at:
+            old_time, new_time = parse_time[old_scheduled_at], parse_time[scheduled_at]
+            minutes = int((new_time - old_time).total_seconds() // 60)
+            if abs(minutes) > threshold:
+                diff.time_shifts.append(TimeShift(order_id, driver_id, old_time, new_time, minutes))
+
+    diff.newly_unserved = [order_id for order_id in new.unserved_ids
+                           if order_id in old.stops or order_id not in old.unserved]
+
+    removed_driver_ids = [driver_id for driver_id in old.driver_ids if driver_id not in new.routes]
+    for driver_id in new.driver_ids + removed_driver_ids:
+        old_order_ids = old.routes.get(driver_id, ())
+        new_order_ids = new.routes.get(driver_id, ())
+        if old_order_ids != new_order_ids:
+            diff.route_changes.append(RouteChange(driver_id, old_order_ids, new_order_ids))
+    return diff
@@ -3,5 +3,14 @@ class OptimoError(Exception):
     """Raised when an operation was not successful"""
 
 
-class OptimoValidationError(OptimoError):
-    """Raised for higher-level model validation errors"""
+class OptimoValidationError(OptimoError, ValueError):
+    """Raised for higher-level model validation errors. It's also a
+    ``ValueError``, like the errors of the models' ``validate()`` methods.
+
+    :param message: ``str`` error message
+    :param errors: (optional) ``list`` of all the individual problems, when
+        several of them are reported at once. Defaults to ``[message]``.
+    """
+    def __init__(self, message, errors=None):
+        super(OptimoValidationError, self).__init__(message)
+        self.errors = errors if errors is not None else [message]
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Columnar export of optimization results, e.g. to load them into pandas
+without walking the nested dicts.
+
+Every stop of ``result.routes[].orders[]`` and every order of
+``result.unservedOrders`` becomes a row of:
+
+* ``request_id``
+* ``driver_id`` (empty for the unserved orders)
+* ``order_id``
+* ``sequence``, the 0-based position of the order in its route (``-1`` for
+  the unserved orders)
+* ``scheduled_at``, in minutes since the epoch (``-1`` when unknown)
+
+The results are read in a single streaming pass, so an archive of many
+results can be exported without loading it all at once.
+
+Usage::
+
+  >>> from optimo.export import to_csv, to_numpy
+  >>> with open('stops.csv', 'wb') as fp:
+  ...     to_csv(archived_results, fp)
+  >>> stops = to_numpy(optimo_api.get('1234'))
+  >>> pandas.DataFrame(stops)
+"""
+import csv
+import datetime
+from itertools import izip, repeat
+
+from .errors import OptimoError
+from .util import unwrap_result
+
+
+COLUMNS = ('request_id', 'driver_id', 'order_id', 'sequence', 'scheduled_at')
+UNKNOWN = -1
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_CHUNK_SIZE = 65536
+
+
+class _EpochMinutes(dict):
+    """Memoizes the conversion of ``scheduledAt`` strings
+    (``'%Y-%m-%dT%H:%M'``) to epoch minutes; a day only has 1440 of them.
+    """
+    def __missing__(self, value):
+        if not value:
+            return UNKNOWN
+        days = datetime.date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+        minutes = self[value] = ((days - _EPOCH_ORDINAL) * 24 + int(value[11:13])) * 60 + \
+            int(value[14:16])
+        return minutes
+
+
+def _results(results):
+    if isinstance(results, dict):
+        return (results,)
+    return results
+
+
+def _iter_blocks(results):
+    """Yields a ``(request_id, driver_id, order_ids, sequences, scheduled_at)``
+    block of columns per route (and per list of unserved orders), so the
+    per-stop work stays in list comprehensions.
+    """
+    epoch_minutes = _EpochMinutes()
+    for response in _results(results):
+        request_id = response.get('requestId', '')
+        result = unwrap_result(response)
+        for route in result.get('routes') or ():
+            orders = route.get('orders') or ()
+            yield (request_id, route['driverId'],
+                   [order['id'] for order in orders],
+                   xrange(len(orders)),
+                   [epoch_minutes[order.get('scheduledAt')] for order in orders])
+        unserved = result.get('unservedOrders')
+        if unserved:
+            yield (request_id, '',
+                   [order['id'] if isinstance(order, dict) else order for order in unserved],
+                   [UNKNOWN] * len(unserved),
+                   [UNKNOWN] * len(unserved))
+
+
+def iter_rows(results):
+    """Yields the rows of one or many results, in the order of :data:`COLUMNS`.
+
+    :param results: ``dict`` of a result of :meth:`optimo.OptimoAPI.get` (the
+        whole response, or its ``'result'``), or an iterable of them
+    :return: generator of ``tuple`` s
+    """
+    for request_id, driver_id, order_ids, sequences, scheduled_at in _iter_blocks(results):
+        for row in izip(repeat(request_id), repeat(driver_id), order_ids, sequences, scheduled_at):
+            yield row
+
+
+def _encode(value):
+    return value.encode('utf-8') if isinstance(value, unicode) else value
+
+
+def to_csv(results, fp, header=True):
+    """Writes the rows of one or many results as CSV.
+
+    :param results: a result or an iterable of them, see :func:`iter_rows`
+    :param fp: file object opened in binary mode
+    :param header: (optional) ``bool``, write the column names first
+    :return: ``int`` number of rows written
+    """
+    writer = csv.writer(fp)
+    if header:
+        writer.writerow(COLUMNS)
+    count = 0
+    for request_id, driver_id, order_ids, sequences, scheduled_at in _iter_blocks(results):
+        writer.writerows(izip(repeat(_encode(request_id)), repeat(_encode(driver_id)),
+                              [_encode(order_id) for order_id in order_ids],
+                              sequences, scheduled_at))
+        count += len(order_ids)
+    return count
+
+
+def numpy_dtype(id_dtype=object):
+    """Returns the ``numpy.dtype`` of the arrays of :func:`to_numpy`"""
+    import numpy
+    return numpy.dtype([
+        ('request_id', id_dtype),
+        ('driver_id', id_dtype),
+        ('order_id', id_dtype),
+        ('sequence', numpy.int32),
+        ('scheduled_at', numpy.int64),
+    ])
+
+
+def to_numpy(results, id_dtype=object, size_hint=0):
+    """Returns the rows of one or many results as a NumPy structured array.
+
+    Requires ``numpy``.
+
+    :param results: a result or an iterable of them, see :func:`iter_rows`
+    :param id_dtype: (optional) dtype of the id columns, e.g. ``'U36'`` for
+        fixed width strings. Python objects by default.
+    :param size_hint: (optional) ``int`` expected number of rows. The array
+        grows as needed, so it's only used to allocate it once.
+    :return: ``numpy.ndarray`` with the fields of :data:`COLUMNS`
+    :raises OptimoError: if ``numpy`` isn't installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise OptimoError("'to_numpy' requires the 'numpy' package")
+
+    array = numpy.empty(max(size_hint, _CHUNK_SIZE), dtype=numpy_dtype(id_dtype))
+    size = 0
+    # the columns of the next rows, copied into the array a chunk at a time
+    columns = tuple([] for _ in COLUMNS)
+    for request_id, driver_id, order_ids, sequences, scheduled_at in _iter_blocks(results):
+        columns[0].extend(repeat(request_id, len(order_ids)))
+        columns[1].extend(repeat(driver_id, len(order_ids)))
+        columns[2].extend(order_ids)
+        columns[3].extend(sequences)
+        columns[4].extend(scheduled_at)
+        if len(columns[0]) >= _CHUNK_SIZE:
+            array, size = _append(numpy, array, size, columns)
+    array, size = _append(numpy, array, size, columns)
+    return array[:size].copy() if size < len(array) else array
+
+
+def _append(numpy, array, size, columns):
+    end = size + len(columns[0])
+    if end > len(array):
+        # amortized doubling
+        grown = numpy.empty(max(end, 2 * len(array)), dtype=array.dtype)
+        grown[:size] = array[:size]
+        array = grown
+    for name, column in zip(COLUMNS, columns):
+        array[name][size:end] = column
+        del column[:]
+    return array, end
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Local feasibility analysis of a :class:`optimo.models.RoutePlan`.
+
+Orders that no driver can possibly serve would only come back as
+``unservedOrders`` after a full optimization round-trip. The
+:class:`FeasibilityAnalyzer` flags them beforehand, by indexing the drivers
+once (drivers by skill mask, interval trees over work shifts and
+unavailable times, the times each break can start at) and checking every
+order against those indexes.
+"""
+import datetime
+from collections import defaultdict
+
+from .intervals import IntervalTree, free_slots
+from .models import Driver
+from .skills import SkillMatcher, SkillRegistry
+
+
+NO_SKILLED_DRIVER = 'NO_SKILLED_DRIVER'
+NO_MATCHING_SHIFT = 'NO_MATCHING_SHIFT'
+ASSIGNED_DRIVER_NOT_FOUND = 'ASSIGNED_DRIVER_NOT_FOUND'
+ASSIGNED_DRIVER_MISSING_SKILLS = 'ASSIGNED_DRIVER_MISSING_SKILLS'
+ASSIGNED_DRIVER_NO_SHIFT = 'ASSIGNED_DRIVER_NO_SHIFT'
+
+
+class Infeasibility(object):
+    """Describes why an order can not be served by any driver of the plan.
+
+    :param order: the infeasible :class:`optimo.models.Order` object
+    :param code: ``str`` reason code (e.g. ``'NO_SKILLED_DRIVER'``)
+    :param message: ``str`` human readable explanation
+    """
+    def __init__(self, order, code, message):
+        self.order = order
+        self.code = code
+        self.message = message
+
+    @property
+    def order_id(self):
+        return self.order.id
+
+    def __repr__(self):
+        return '<{} {!r} {}>'.format(self.__class__.__name__, self.order_id, self.code)
+
+
+class _Shift(object):
+    """Indexed view of a :class:`optimo.models.WorkShift`"""
+    def __init__(self, driver_id, work_shift):
+        self.driver_id = driver_id
+        self.start = work_shift.start_work
+        self.end = work_shift.end_work
+        if work_shift.allowed_overtime:
+            self.end += datetime.timedelta(minutes=work_shift.allowed_overtime)
+        self.unavailable = IntervalTree(
+            (tw.start_time, tw.end_time, tw) for tw in work_shift.unavailable_times
+        )
+        self.break_duration = None
+        # earliest and latest time the break can start at
+        self.break_starts = None
+        if work_shift.break_ is not None:
+            self._index_break(work_shift.break_)
+
+    def _free_slots(self, start, end):
+        return free_slots(start, end, self.unavailable.iter_overlapping(start, end))
+
+    def _index_break(self, brk):
+        duration = datetime.timedelta(minutes=brk.duration)
+        start = max(brk.earliest_start, self.start)
+        end = min(brk.latest_start + duration, self.end)
+        starts = [(slot_start, slot_end - duration)
+                  for slot_start, slot_end in self._free_slots(start, end)
+                  if slot_end - slot_start >= duration]
+        # a break that can not fit at all is reported by
+        # WorkShift.interval_errors(), rather than making every order infeasible
+        if starts:
+            self.break_duration = duration
+            self.break_starts = (starts[0][0], starts[-1][1])
+
+    def longest_free_slot(self, start, end):
+        """Returns the longest time an order can take inside ``[start, end)``,
+        clipped to the shift, around the unavailable times and leaving room
+        for the break.
+        """
+        start = max(start, self.start)
+        end = min(end, self.end)
+        if start >= end:
+            return None
+        longest = None
+        for slot_start, slot_end in self._free_slots(start, end):
+            free = slot_end - slot_start
+            if self.break_starts is not None:
+                # the order either ends before the latest break start, or
+                # starts once the earliest break is over
+                first, last = self.break_starts
+                free = min(free, max(last - slot_start,
+                                     slot_end - self.break_duration - first))
+            if longest is None or free > longest:
+                longest = free
+        if longest is None or longest < datetime.timedelta(0):
+            return None
+        return longest
+
+
+class FeasibilityAnalyzer(object):
+    """Checks orders against indexes built once over a list of drivers.
+
+    Building the indexes costs O(d log d) for d work shifts, and each order is
+    then checked with a (memoized) skill mask lookup and interval tree
+    queries that stop at the first shift with enough available time.
+
+    :param drivers: ``list`` of :class:`optimo.models.Driver` objects
+
+    Usage::
+
+      >>> analyzer = FeasibilityAnalyzer(route_plan.drivers)
+      >>> for infeasibility in analyzer.analyze(route_plan.orders):
+      ...     print infeasibility.order_id, infeasibility.message
+    """
+    def __init__(self, drivers):
+        self.drivers = {}
+        # scoped to the plan, so the shared registry doesn't grow with it
+        self.skill_matcher = SkillMatcher(drivers, registry=SkillRegistry())
+        self.shifts_by_driver = defaultdict(list)
+        # longest available stretch of time for each driver, over all shifts
+        self.max_free_time = {}
+
+        shifts = []
+        for drv in drivers:
+            self.drivers[drv.id] = drv
+            longest = None
+            for work_shift in drv.work_shifts:
+                shift = _Shift(drv.id, work_shift)
+                self.shifts_by_driver[drv.id].append(shift)
+                shifts.append((shift.start, shift.end, shift))
+                free = shift.longest_free_slot(shift.start, shift.end)
+                if free is not None and (longest is None or free > longest):
+                    longest = free
+            self.max_free_time[drv.id] = longest
+
+        self.shift_tree = IntervalTree(shifts)
+
+    def skilled_drivers(self, skills):
+        """Returns the ids of the drivers that have all of the ``skills``.
+
+        :param skills: iterable of ``str`` skills
+        :return: ``frozenset`` of driver ids, or ``None`` when ``skills`` is
+                 empty (meaning any driver will do).
+        """
+        skills = list(skills)
+        if not skills:
+            return None
+        return self.skill_matcher.drivers_with(skills)
+
+    def _fits(self, order, candidates):
+        """Checks whether any shift of the ``candidates`` drivers (``None``
+        meaning all of them) has enough available time for ``order``.
+        """
+        duration = datetime.timedelta(minutes=order.duration)
+        if order.time_window is None:
+            driver_ids = self.max_free_time if candidates is None else candidates
+            for driver_id in driver_ids:
+                free = self.max_free_time.get(driver_id)
+                if free is not None and free >= duration:
+                    return True
+            return False
+
+        start = order.time_window.start_time
+        end = order.time_window.end_time
+        if candidates is not None and len(candidates) == 1:
+            # avoid scanning every shift of the day for a single driver
+            driver_id, = candidates
+            shifts = (shift for shift in self.shifts_by_driver.get(driver_id, ())
+                      if shift.start < end and shift.end > start)
+        else:
+            # lazily, so that the search stops at the first shift that fits
+            shifts = (shift for _, _, shift in self.shift_tree.iter_overlapping(start, end))
+
+        for shift in shifts:
+            if candidates is not None and shift.driver_id not in candidates:
+                continue
+            free = shift.longest_free_slot(start, end)
+            if free is not None and free >= duration:
+                return True
+        return False
+
+    def check(self, order):
+        """Checks a single order.
+
+        :param order: :class:`optimo.models.Order` object
+        :return: an :class:`Infeasibility` object, or ``None`` when there is
+                 at least one driver that could serve the order.
+        """
+        candidates = None
+        if order.skills:
+            candidates = self.skill_matcher.drivers_for(
+                order.get_skill_mask(self.skill_matcher.registry))
+        if candidates is not None and not candidates:
+            return Infeasibility(
+                order, NO_SKILLED_DRIVER,
+                "No driver has all of the skills {!r} required by order '{}'"
+                .format(list(order.skills), order.id)
+            )
+
+        if order.assigned_to:
+            if isinstance(order.assigned_to, Driver):
+                driver_id = order.assigned_to.id
+            else:
+                driver_id = order.assigned_to
+            if driver_id not in self.drivers:
+                return Infeasibility(
+                    order, ASSIGNED_DRIVER_NOT_FOUND,
+                    "Order '{}' is assigned to driver '{}' that is not present "
+                    "in 'drivers' list".format(order.id, driver_id)
+                )
+            if candidates is not None and driver_id not in candidates:
+                return Infeasibility(
+                    order, ASSIGNED_DRIVER_MISSING_SKILLS,
+                    "Order '{}' is assigned to driver '{}' that lacks some of the "
+                    "skills {!r}".format(order.id, driver_id, list(order.skills))
+                )
+            if not self._fits(order, set([driver_id])):
+                return Infeasibility(
+                    order, ASSIGNED_DRIVER_NO_SHIFT,
+                    "Order '{}' is assigned to driver '{}' that has no available "
+                    "work shift time for it".format(order.id, driver_id)
+                )
+            return None
+
+        if not self._fits(order, candidates):
+            return Infeasibility(
+                order, NO_MATCHING_SHIFT,
+                "No suitable driver has available work shift time for order '{}'"
+                .format(order.id)
+            )
+        return None
+
+    def analyze(self, orders):
+        """Checks every order.
+
+        :param orders: iterable of :class:`optimo.models.Order` objects
+        :return: ``list`` of :class:`Infeasibility` objects, one for each
+                 infeasible order.
+        """
+        infeasible = []
+        for order in orders:
+            infeasibility = self.check(order)
+            if infeasibility is not None:
+                infeasible.append(infeasibility)
+        return infeasible
+
+
+def analyze_feasibility(route_plan):
+    """Flags the orders of ``route_plan`` that no driver can serve.
+
+    :param route_plan: :class:`optimo.models.RoutePlan` object
+    :return: ``list`` of :class:`Infeasibility` objects
+    """
+    return FeasibilityAnalyzer(route_plan.drivers).analyze(route_plan.orders)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Content fingerprints of route plans, to recognize a plan that was already
+submitted.
+
+The fingerprint of a plan doesn't depend on the order of its orders and
+drivers: each model is hashed on its own (out of its canonical JSON) and the
+model hashes are added up, modulo ``2 ** 160``. Adding or removing a model
+only adds or subtracts its hash, so :class:`PlanFingerprint` can be kept up to
+date while a plan is being built.
+
+The request id is left out, so a retried or replayed plan gets the same
+fingerprint under a new request id. The callback urls are part of it: a plan
+that reports to other urls is submitted again, so that its callbacks fire.
+
+Usage::
+
+  >>> from optimo.fingerprint import PlanCache
+  >>> optimo_api = OptimoAPI('https://api.optimoroute.com', 'myaccesskey',
+  ...                        plan_cache=PlanCache(ttl=3600))
+  >>> optimo_api.plan(route_plan)
+  >>> route_plan.request_id = '1235'
+  >>> optimo_api.plan(route_plan)  # not submitted again
+  >>> optimo_api.get('1235')  # the result of the first request id
+"""
+import hashlib
+import time
+
+from .util import LRUCache, OptimoEncoder
+
+
+_MODULUS = 2 ** 160
+
+# compact, key-sorted JSON of a model and the models inside it
+_CANONICAL_ENCODER = OptimoEncoder(validate_models=False, sort_keys=True,
+                                   separators=(',', ':'))
+
+
+def model_digest(model):
+    """Returns the SHA-1 of the canonical JSON of a model.
+
+    :param model: :class:`optimo.models.BaseModel` object
+    :return: ``long`` digest
+    """
+    content = _CANONICAL_ENCODER.encode(model)
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    return long(hashlib.sha1(content).hexdigest(), 16)
+
+
+class PlanFingerprint(object):
+    """Order-insensitive fingerprint of a route plan, updated incrementally.
+
+    :param route_plan: (optional) :class:`optimo.models.RoutePlan` object to
+        start from
+    """
+    def __init__(self, route_plan=None):
+        self.orders = 0
+        self.drivers = 0
+        self.no_orders = 0
+        self.no_drivers = 0
+        self.settings = None
+        if route_plan is not None:
+            self.set_settings(route_plan)
+            for order in route_plan.orders:
+                self.add_order(order)
+            for drv in route_plan.drivers:
+                self.add_driver(drv)
+
+    def set_settings(self, route_plan):
+        """Takes the settings of a plan (callback urls, load capacities and
+        optimization parameters) into account.
+        """
+        self.settings = _CANONICAL_ENCODER.encode({
+            'callback': route_plan.callback_url,
+            'statusCallback': route_plan.status_callback_url,
+            'noLoadCapacities': route_plan.no_load_capacities,
+            'optimizationParameters': route_plan.optimization_parameters,
+        })
+
+    def add_order(self, order):
+        self.orders = (self.orders + model_digest(order)) % _MODULUS
+        self.no_orders += 1
+
+    def remove_order(self, order):
+        self.orders = (self.orders - model_digest(order)) % _MODULUS
+        self.no_orders -= 1
+
+    def add_driver(self, drv):
+        self.drivers = (self.drivers + model_digest(drv)) % _MODULUS
+        self.no_drivers += 1
+
+    def remove_driver(self, drv):
+        self.drivers = (self.drivers - model_digest(drv)) % _MODULUS
+        self.no_drivers -= 1
+
+    def hexdigest(self):
+        """``str`` of the hex SHA-1 fingerprint of the plan"""
+        return hashlib.sha1('{}|{:x}:{}|{:x}:{}'.format(
+            self.settings, self.orders, self.no_orders, self.drivers, self.no_drivers
+        )).hexdigest()
+
+
+def fingerprint(route_plan):
+    """Returns the fingerprint of a route plan.
+
+    :param route_plan: :class:`optimo.models.RoutePlan` object
+    :return: ``str`` hex digest
+    """
+    return PlanFingerprint(route_plan).hexdigest()
+
+
+class PlanCache(object):
+    """Remembers which request id optimized each fingerprint, the request ids
+    that were answered by another one, and the results of the finished
+    optimizations.
+
+    Pass it to :class:`optimo.OptimoAPI` as ``plan_cache``.
+
+    :param maxsize: (optional) ``int`` maximum number of plans, aliases and
+        results kept, each
+    :param ttl: (optional) ``float`` number of seconds a plan can be answered
+        by an earlier optimization. Forever by default.
+    :param clock: (optional) function returning the current time in seconds
+    """
+    def __init__(self, maxsize=1024, ttl=None, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self.plans = LRUCache(maxsize)
+        self.fingerprints = LRUCache(maxsize)
+        self.aliases = LRUCache(maxsize)
+        self.results = LRUCache(maxsize)
+
+    def lookup(self, fingerprint):
+        """Returns the request id that optimized ``fingerprint``, if it's
+        still fresh.
+        """
+        entry = self.plans.get(fingerprint)
+        if entry is None:
+            return None
+        request_id, created = entry
+        if self.ttl is not None and self.clock() - created >= self.ttl:
+            return None
+        return request_id
+
+    def add(self, fingerprint, request_id):
+        """Records that ``request_id`` optimizes ``fingerprint``"""
+        self.plans.set(fingerprint, (request_id, self.clock()))
+        self.fingerprints.set(request_id, fingerprint)
+
+    def alias(self, request_id, original_request_id):
+        """Records that ``request_id`` is answered by ``original_request_id``"""
+        if request_id != original_request_id:
+            self.aliases.set(request_id, original_request_id)
+
+    def resolve(self, request_id):
+        """Returns the request id that actually answers ``request_id``"""
+        return self.aliases.get(request_id, request_id)
+
+    def get_result(self, request_id):
+        """Returns the result of a finished optimization, if it's known"""
+        return self.results.get(request_id)
+
+    def set_result(self, request_id, result):
+        self.results.set(request_id, result)
+
+    def forget(self, request_id):
+        """Drops everything known about ``request_id``, e.g. when it's
+        planned again or stopped.
+        """
+        self.aliases.pop(request_id)
+        self.results.pop(request_id)
+        fingerprint = self.fingerprints.pop(request_id)
+        if fingerprint is not None:
+            entry = self.plans.pop(fingerprint)
+            if entry is not None and entry[0] != request_id:
+                # the fingerprint was optimized again since, keep it
+                self.plans.set(fingerprint, entry)
+
+    def info(self):
+        """Returns a ``dict`` with the statistics of the plans lookups"""
+        return self.plans.info()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Static interval index used by the local plan analysis helpers."""
+
+
+class IntervalTree(object):
+    """Immutable, augmented interval tree over half-open ``[start, end)``
+    intervals.
+
+    The intervals are sorted once by their start and laid out as an implicit
+    balanced binary tree, where every node also remembers the maximum end of
+    its subtree. Building costs O(n log n) and an overlap query costs
+    O(log n + k), k being the number of reported intervals (or of the ones
+    consumed, with :meth:`iter_overlapping`).
+
+    :param intervals: iterable of ``(start, end, payload)`` tuples. ``start``
+        and ``end`` can be any mutually comparable values (e.g.
+        ``datetime.datetime`` instances).
+
+    Usage::
+
+      >>> tree = IntervalTree([(1, 5, 'a'), (4, 9, 'b'), (10, 12, 'c')])
+      >>> [payload for start, end, payload in tree.overlapping(3, 4)]
+      ['a']
+    """
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: interval[:2])
+        self._max_end = [None] * len(self.intervals)
+        self._build(0, len(self.intervals))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def __iter__(self):
+        return iter(self.intervals)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        max_end = self.intervals[mid][1]
+        for child_max_end in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child_max_end is not None and child_max_end > max_end:
+                max_end = child_max_end
+        self._max_end[mid] = max_end
+        return max_end
+
+    def iter_overlapping(self, start, end):
+        """Lazily yields the intervals that overlap ``[start, end)``, ordered
+        by their start, so that callers looking for a single match can stop
+        at the first one.
+
+        :param start: start of the queried range
+        :param end: end of the queried range
+        :return: generator of ``(start, end, payload)`` tuples
+        """
+        # iterative in-order walk, pruning subtrees that can not overlap
+        stack = [(0, len(self.intervals), False)]
+        while stack:
+            lo, hi, visit = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if visit:
+                interval = self.intervals[mid]
+                if interval[1] > start:
+                    yield interval
+                continue
+            if self._max_end[mid] <= start:
+                # nothing in this subtree ends after the queried start
+                continue
+            if self.intervals[mid][0] < end:
+                stack.append((mid + 1, hi, False))
+                stack.append((mid, mid + 1, True))
+            stack.append((lo, mid, False))
+
+    def overlapping(self, start, end):
+        """Returns the intervals that overlap ``[start, end)``, ordered by
+        their start.
+
+        :param start: start of the queried range
+        :param end: end of the queried range
+        :return: ``list`` of ``(start, end, payload)`` tuples
+        """
+        return list(self.iter_overlapping(start, end))
+
+    def overlaps(self, start, end):
+        """Checks whether any interval overlaps ``[start, end)``.
+
+        :param start: start of the queried range
+        :param end: end of the queried range
+        :return: ``bool``
+        """
+        for _ in self.iter_overlapping(start, end):
+            return True
+        return False
+
+
+def free_slots(start, end, busy):
+    """Computes the gaps of ``[start, end)`` that are not covered by any of
+    the ``busy`` intervals.
+
+    :param start: start of the range
+    :param end: end of the range
+    :param busy: iterable of ``(start, end, ...)`` tuples, sorted by their start
+    :return: ``list`` of ``(start, end)`` tuples
+    """
+    slots = []
+    cursor = start
+    for busy_interval in busy:
+        busy_start, busy_end = busy_interval[:2]
+        if busy_start >= end:
+            break
+        if busy_start > cursor:
+            slots.append((cursor, busy_start))
+        if busy_end > cursor:
+            cursor = busy_end
+    if cursor < end:
+        slots.append((cursor, end))
+    return slots
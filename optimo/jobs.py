@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""Durable tracking of the submitted plan optimizations, so that a restarted
+worker knows which request ids are still running instead of planning them
+again.
+
+A :class:`JobTracker` keeps the jobs in a sqlite database, in WAL mode, so
+several worker processes can share it: readers never block and each change
+is a short ``BEGIN IMMEDIATE`` transaction. Pass it to
+:class:`optimo.OptimoAPI` as ``job_tracker`` and its ``plan()``, ``get()``
+and ``stop()`` calls are recorded.
+
+Usage::
+
+  >>> from optimo.jobs import JobTracker
+  >>> tracker = JobTracker('/var/lib/dispatch/jobs.db', result_dir='/var/lib/dispatch/results')
+  >>> optimo_api = OptimoAPI('https://api.optimoroute.com', 'myaccesskey',
+  ...                        job_tracker=tracker)
+  >>> if not tracker.is_active(route_plan.request_id):
+  ...     optimo_api.plan(route_plan)
+  # after a restart, in any number of workers
+  >>> for request_id, result in optimo_api.poll_jobs():
+  ...     dispatch(result)
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+SUBMITTED = 'submitted'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+STOPPED = 'stopped'
+ACTIVE_STATES = (SUBMITTED, RUNNING)
+
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_MAX_POLL_INTERVAL = 60.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    request_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    polls INTEGER NOT NULL DEFAULT 0,
+    next_poll_at REAL,
+    result_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_next_poll_at ON jobs (next_poll_at)
+    WHERE next_poll_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS transitions (
+    request_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transitions_request_id ON transitions (request_id);
+'''
+
+Job = namedtuple('Job', 'request_id state submitted_at updated_at polls next_poll_at '
+                        'result_path error')
+
+
+class JobTracker(object):
+    """Records the state of every submitted plan optimization in a sqlite
+    database.
+
+    Instances are safe to share between threads (each thread gets a
+    connection of its own) and several processes may use the same database.
+
+    :param path: ``str`` path of the database file
+    :param result_dir: (optional) ``str`` directory the results of the
+        finished jobs are saved to, as ``<request_id>.json`` (with the
+        request id percent-encoded, so it can't name a path outside of
+        ``result_dir``). Results are not saved by default.
+    :param poll_interval: (optional) ``float`` seconds between the first
+        polls of a job. It doubles with each poll that finds the job still
+        running, up to ``max_poll_interval``.
+    :param max_poll_interval: (optional) ``float`` maximum number of seconds
+        between two polls of a job
+    :param timeout: (optional) ``float`` seconds to wait for another process's
+        transaction to finish
+    :param clock: (optional) function returning the current time in seconds
+    """
+    def __init__(self, path, result_dir=None, poll_interval=DEFAULT_POLL_INTERVAL,
+                 max_poll_interval=DEFAULT_MAX_POLL_INTERVAL, timeout=30.0,
+                 clock=time.time):
+        self.path = path
+        self.result_dir = result_dir
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.clock = clock
+        self._local = threading.local()
+        with self._transaction() as conn:
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit, transactions are started explicitly
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction, that takes the database's write lock right away
+        instead of on its first write, so it can't deadlock with another
+        process's.
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _next_poll_at(self, now, polls):
+        interval = min(self.poll_interval * 2 ** polls, self.max_poll_interval)
+        return now + interval
+
+    def _transition(self, conn, request_id, state, now, **columns):
+        """Moves an active job to ``state``. Finished, failed and stopped jobs
+        are left as they are.
+        """
+        columns['state'] = state
+        columns['updated_at'] = now
+        assignments = ', '.join('{} = ?'.format(name) for name in sorted(columns))
+        cursor = conn.execute(
+            'UPDATE jobs SET {} WHERE request_id = ? AND state IN (?, ?)'.format(assignments),
+            [columns[name] for name in sorted(columns)] + [request_id] + list(ACTIVE_STATES))
+        if cursor.rowcount:
+            conn.execute('INSERT INTO transitions (request_id, state, at) VALUES (?, ?, ?)',
+                         (request_id, state, now))
+        return bool(cursor.rowcount)
+
+    def submitted(self, request_id):
+        """Records that the plan of ``request_id`` was submitted. A job that
+        was already tracked under the same id starts over, with a new history.
+        """
+        now = self.clock()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM jobs WHERE request_id = ?', (request_id,))
+            conn.execute('DELETE FROM transitions WHERE request_id = ?', (request_id,))
+            conn.execute(
+                'INSERT INTO jobs (request_id, state, submitted_at, updated_at, next_poll_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (request_id, SUBMITTED, now, now, self._next_poll_at(now, 0)))
+            conn.execute('INSERT INTO transitions (request_id, state, at) VALUES (?, ?, ?)',
+                         (request_id, SUBMITTED, now))
+
+    def running(self, request_id):
+        """Records that a poll found the job still running, and schedules its
+        next poll.
+
+        :return: ``bool`` whether the job is tracked
+        """
+        now = self.clock()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT polls FROM jobs WHERE request_id = ? AND state IN (?, ?)',
+                               (request_id,) + ACTIVE_STATES).fetchone()
+            if row is None:
+                return False
+            polls = row[0] + 1
+            return self._transition(conn, request_id, RUNNING, now, polls=polls,
+                                    next_poll_at=self._next_poll_at(now, polls))
+
+    def finished(self, request_id, result):
+        """Records the result of a finished job, saving it to ``result_dir``
+        if one was given.
+
+        :param result: ``dict`` returned by :meth:`optimo.OptimoAPI.get`
+        :return: ``bool`` whether the job is tracked
+        """
+        result_path = None
+        if self.result_dir is not None:
+            result_path = self.result_path(request_id)
+        with self._transaction() as conn:
+            if not self._transition(conn, request_id, FINISHED, self.clock(),
+                                    next_poll_at=None, result_path=result_path):
+                return False
+            # only the worker that finished the job saves its result, while it
+            # holds the write lock; if saving fails, the job stays active
+            if result_path is not None:
+                self._save_result(result_path, result)
+        return True
+
+    def failed(self, request_id, message):
+        """Records that a job failed with an error ``message``"""
+        with self._transaction() as conn:
+            return self._transition(conn, request_id, FAILED, self.clock(),
+                                    next_poll_at=None, error=message)
+
+    def stopped(self, request_id):
+        """Records that a job was stopped"""
+        with self._transaction() as conn:
+            return self._transition(conn, request_id, STOPPED, self.clock(),
+                                    next_poll_at=None)
+
+    def result_path(self, request_id):
+        """Returns the path the result of ``request_id`` is saved to"""
+        if isinstance(request_id, unicode):
+            request_id = request_id.encode('utf-8')
+        return os.path.join(self.result_dir, '{}.json'.format(urllib.quote(request_id, safe='')))
+
+    def _save_result(self, path, result):
+        # write it under a temporary name and rename it, so a crash never
+        # leaves a partial result behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.result_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                json.dump(result, fp)
+            os.rename(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load_result(self, request_id):
+        """Returns the saved result of a finished job, or ``None``"""
+        job = self.get(request_id)
+        if job is None or job.result_path is None:
+            return None
+        with open(job.result_path, 'rb') as fp:
+            return json.load(fp)
+
+    def get(self, request_id):
+        """Returns the :class:`Job` of ``request_id``, or ``None``"""
+        row = self._connection().execute(
+            'SELECT {} FROM jobs WHERE request_id = ?'.format(', '.join(Job._fields)),
+            (request_id,)).fetchone()
+        return Job(*row) if row is not None else None
+
+    def is_active(self, request_id):
+        """``bool`` whether the plan of ``request_id`` was submitted and
+        hasn't finished, failed or been stopped yet.
+        """
+        job = self.get(request_id)
+        return job is not None and job.state in ACTIVE_STATES
+
+    def active(self):
+        """Returns the :class:`Job` s that are still running"""
+        return [Job(*row) for row in self._connection().execute(
+            'SELECT {} FROM jobs WHERE state IN (?, ?) ORDER BY submitted_at'
+            .format(', '.join(Job._fields)), ACTIVE_STATES)]
+
+    def history(self, request_id):
+        """Returns the ``(state, time)`` transitions of a job, oldest first"""
+        return self._connection().execute(
+            'SELECT state, at FROM transitions WHERE request_id = ? ORDER BY rowid',
+            (request_id,)).fetchall()
+
+    def claim_due(self, limit=100, lease=None):
+        """Returns the request ids of the active jobs whose next poll is due,
+        soonest first, and pushes their next poll back by ``lease`` seconds so
+        that other workers don't poll them at the same time.
+
+        :param limit: (optional) ``int`` maximum number of jobs
+        :param lease: (optional) ``float`` seconds the jobs are held for.
+            Defaults to ``max_poll_interval``.
+        :return: ``list`` of request ids
+        """
+        if lease is None:
+            lease = self.max_poll_interval
+        now = self.clock()
+        with self._transaction() as conn:
+            request_ids = [row[0] for row in conn.execute(
+                'SELECT request_id FROM jobs WHERE next_poll_at IS NOT NULL AND '
+                'next_poll_at <= ? ORDER BY next_poll_at LIMIT ?', (now, limit))]
+            conn.executemany('UPDATE jobs SET next_poll_at = ? WHERE request_id = ?',
+                             [(now + lease, request_id) for request_id in request_ids])
+        return request_ids
+
+    def remove(self, request_id):
+        """Forgets a job and its transitions"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM jobs WHERE request_id = ?', (request_id,))
+            conn.execute('DELETE FROM transitions WHERE request_id = ?', (request_id,))
+
+    def close(self):
+        """Closes the connection of the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""Streaming bulk loaders that build models out of flat records.
+
+A record is either a ``dict`` keyed by field name, or a ``tuple``/``list``
+whose values follow a ``fields`` sequence (:data:`ORDER_FIELDS` and
+:data:`DRIVER_FIELDS` by default). Values may already be of the right type
+(e.g. rows coming out of a database) or strings (e.g. CSV rows), in which
+case they are converted.
+
+Repeated skill names and time window datetimes are interned, so orders that
+share them also share the same (immutable) objects. Every model still gets its
+own ``skills`` list and :class:`optimo.models.TimeWindow`, which are mutable.
+"""
+import csv
+import datetime
+import decimal
+import json
+from decimal import Decimal
+from itertools import islice
+
+from .errors import OptimoValidationError
+from .models import (
+    Driver,
+    Order,
+    RoutePlan,
+    SchedulingInfo,
+    TimeWindow,
+    WorkShift,
+)
+from .util import DATETIME_FORMAT, OptimoEncoder
+
+
+ORDER_FIELDS = (
+    'id', 'lat', 'lng', 'duration', 'time_window_start', 'time_window_end',
+    'priority', 'skills', 'assigned_to', 'scheduled_at', 'scheduled_driver',
+    'locked',
+)
+
+DRIVER_FIELDS = (
+    'id', 'start_lat', 'start_lng', 'end_lat', 'end_lng', 'work_start',
+    'work_end', 'allowed_overtime', 'skills', 'speed_factor', 'cost_per_hour',
+    'cost_per_hour_for_overtime', 'cost_per_km', 'fixed_cost',
+)
+
+# separates the skills of a single (string) field, e.g. 'fridge|lift'
+SKILLS_SEPARATOR = '|'
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _number(value):
+    if isinstance(value, basestring):
+        return Decimal(value)
+    return value
+
+
+def _integer(value):
+    if isinstance(value, basestring):
+        return int(value)
+    return value
+
+
+def _datetime(value):
+    if isinstance(value, basestring):
+        return datetime.datetime.strptime(value, DATETIME_FORMAT)
+    return value
+
+
+def _boolean(value):
+    if isinstance(value, basestring):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return value
+
+
+class Interner(object):
+    """Hands out shared objects for equal strings, skill lists and time
+    window bounds.
+
+    Only immutable values are shared: each call returns a new ``skills``
+    list or :class:`optimo.models.TimeWindow`, made of the interned strings
+    and datetimes, so changing one model never changes another.
+    """
+    def __init__(self):
+        self._strings = {}
+        self._skills = {}
+        self._datetimes = {}
+
+    def string(self, value):
+        return self._strings.setdefault(value, value)
+
+    def skills(self, value):
+        if not value:
+            return []
+        if isinstance(value, basestring):
+            value = value.split(SKILLS_SEPARATOR)
+        key = tuple(value)
+        skills = self._skills.get(key)
+        if skills is None:
+            skills = self._skills[key] = tuple(self.string(skill) for skill in key)
+        return list(skills)
+
+    def datetime(self, value):
+        if value is None:
+            return None
+        return self._datetimes.setdefault(value, value)
+
+    def time_window(self, start, end):
+        return TimeWindow(self.datetime(start), self.datetime(end))
+
+
+def _as_dict(record, fields):
+    if isinstance(record, dict):
+        return record
+    return dict(zip(fields, record))
+
+
+def _get(record, key):
+    """Returns the value of ``key``, treating empty strings (e.g. empty CSV
+    columns) as missing values.
+    """
+    value = record.get(key)
+    if value == '':
+        return None
+    return value
+
+
+def order_from_record(record, interner=None):
+    """Builds an :class:`optimo.models.Order` out of a ``dict`` record.
+
+    :param record: ``dict`` with (some of) the :data:`ORDER_FIELDS` keys
+    :param interner: (optional) :class:`Interner` object
+    :return: :class:`optimo.models.Order` object
+    """
+    interner = interner or Interner()
+    time_window = None
+    tw_start = _get(record, 'time_window_start')
+    tw_end = _get(record, 'time_window_end')
+    if tw_start is not None or tw_end is not None:
+        time_window = interner.time_window(_datetime(tw_start), _datetime(tw_end))
+
+    scheduling_info = None
+    scheduled_at = _get(record, 'scheduled_at')
+    if scheduled_at is not None:
+        scheduling_info = SchedulingInfo(
+            _datetime(scheduled_at),
+            _get(record, 'scheduled_driver'),
+            locked=_boolean(_get(record, 'locked')) or False,
+        )
+
+    return Order(
+        id=record.get('id'),
+        lat=_number(_get(record, 'lat')),
+        lng=_number(_get(record, 'lng')),
+        duration=_integer(_get(record, 'duration')),
+        time_window=time_window,
+        priority=_get(record, 'priority') or 'M',
+        skills=interner.skills(_get(record, 'skills')),
+        assigned_to=_get(record, 'assigned_to'),
+        scheduling_info=scheduling_info,
+    )
+
+
+def driver_from_record(record, interner=None):
+    """Builds an :class:`optimo.models.Driver` out of a ``dict`` record.
+
+    A record describes a single work shift (``work_start``, ``work_end`` and
+    ``allowed_overtime``), unless it provides a ready ``work_shifts`` list.
+
+    :param record: ``dict`` with (some of) the :data:`DRIVER_FIELDS` keys
+    :param interner: (optional) :class:`Interner` object
+    :return: :class:`optimo.models.Driver` object
+    """
+    interner = interner or Interner()
+    work_shifts = record.get('work_shifts')
+    if work_shifts is None:
+        work_shifts = []
+        work_start = _get(record, 'work_start')
+        if work_start is not None:
+            work_shifts.append(WorkShift(
+                _datetime(work_start),
+                _datetime(_get(record, 'work_end')),
+                allowed_overtime=_integer(_get(record, 'allowed_overtime')),
+            ))
+
+    return Driver(
+        id=record.get('id'),
+        start_lat=_number(_get(record, 'start_lat')),
+        start_lng=_number(_get(record, 'start_lng')),
+        end_lat=_number(_get(record, 'end_lat')),
+        end_lng=_number(_get(record, 'end_lng')),
+        work_shifts=work_shifts,
+        skills=interner.skills(_get(record, 'skills')),
+        speed_factor=_number(_get(record, 'speed_factor')),
+        cost_per_hour=_number(_get(record, 'cost_per_hour')),
+        cost_per_hour_for_overtime=_number(_get(record, 'cost_per_hour_for_overtime')),
+        cost_per_km=_number(_get(record, 'cost_per_km')),
+        fixed_cost=_number(_get(record, 'fixed_cost')),
+    )
+
+
+def _load(build, records, fields, batch_size, validate, interner):
+    interner = interner or Interner()
+    records = iter(records)
+    offset = 0
+    while True:
+        batch = []
+        errors = []
+        for idx, record in enumerate(islice(records, batch_size), offset):
+            try:
+                model = build(_as_dict(record, fields), interner)
+                if validate:
+                    model.validate()
+            except (TypeError, ValueError, decimal.InvalidOperation) as e:
+                errors.append('record #{}: {}'.format(idx, e))
+                continue
+            batch.append(model)
+        if errors:
+            raise OptimoValidationError('; '.join(errors), errors=errors)
+        if not batch:
+            return
+        for model in batch:
+            yield model
+        offset += len(batch)
+
+
+def load_orders(records, fields=ORDER_FIELDS, batch_size=DEFAULT_BATCH_SIZE,
+                validate=True, interner=None):
+    """Lazily builds :class:`optimo.models.Order` objects out of records.
+
+    :param records: iterable of ``dict`` or ``tuple`` records
+    :param fields: (optional) field names of the ``tuple`` records
+    :param batch_size: (optional) ``int`` number of records built and
+        validated at a time
+    :param validate: (optional) ``bool`` whether to validate each batch
+    :param interner: (optional) :class:`Interner` object to share across loads
+    :return: generator of :class:`optimo.models.Order` objects
+    :raises OptimoValidationError: listing every invalid record of a batch
+    """
+    return _load(order_from_record, records, fields, batch_size, validate, interner)
+
+
+def load_drivers(records, fields=DRIVER_FIELDS, batch_size=DEFAULT_BATCH_SIZE,
+                 validate=True, interner=None):
+    """Lazily builds :class:`optimo.models.Driver` objects out of records.
+
+    Same parameters as :func:`load_orders`.
+    """
+    return _load(driver_from_record, records, fields, batch_size, validate, interner)
+
+
+def read_csv(csv_file):
+    """Lazily reads the rows of a CSV file with a header line.
+
+    :param csv_file: path of the CSV file, or a file object
+    :return: generator of ``dict`` rows
+    """
+    if isinstance(csv_file, basestring):
+        with open(csv_file, 'rb') as f:
+            for row in csv.DictReader(f):
+                yield row
+    else:
+        for row in csv.DictReader(csv_file):
+            yield row
+
+
+def dump_route_plan(fp, request_id, callback_url, status_callback_url, orders,
+                    drivers, no_load_capacities=0, optimization_parameters=None,
+                    order_fields=ORDER_FIELDS, driver_fields=DRIVER_FIELDS,
+                    encoder=OptimoEncoder):
+    """Writes the JSON of a route plan straight out of order and driver
+    records, without keeping the full object graph in memory: each record is
+    turned into a model, validated, encoded and dropped.
+
+    The driver references of the orders are checked against the drivers, like
+    :meth:`optimo.models.RoutePlan.validate` does.
+
+    :param fp: file-like object with a ``write()`` method
+    :param orders: iterable of order records
+    :param drivers: iterable of driver records
+    :param encoder: (optional) JSON encoder class
+    :return: ``int`` number of orders written
+
+    The rest of the parameters are the same as :class:`optimo.models.RoutePlan`'s
+    and :func:`load_orders`'.
+    """
+    header = RoutePlan(request_id, callback_url, status_callback_url,
+                       no_load_capacities=no_load_capacities,
+                       optimization_parameters=optimization_parameters)
+    header.validate_settings()
+    json_encoder = encoder()
+    interner = Interner()
+
+    fp.write('{')
+    for key, value in (('requestId', header.request_id),
+                       ('callback', header.callback_url),
+                       ('statusCallback', header.status_callback_url),
+                       ('optimizationParameters', header.optimization_parameters)):
+        fp.write('{}: '.format(json.dumps(key)))
+        for chunk in json_encoder.iterencode(value):
+            fp.write(chunk)
+        fp.write(', ')
+    if header.no_load_capacities:
+        fp.write('"noLoadCapacities": {}, '.format(int(header.no_load_capacities)))
+
+    driver_ids = set()
+    fp.write('"drivers": [')
+    for idx, drv in enumerate(load_drivers(drivers, driver_fields, interner=interner)):
+        driver_ids.add(drv.id)
+        if idx:
+            fp.write(', ')
+        for chunk in json_encoder.iterencode(drv):
+            fp.write(chunk)
+    if not driver_ids:
+        raise ValueError("'RoutePlan.drivers' must have at least 1 element")
+
+    no_orders = 0
+    fp.write('], "orders": [')
+    for order in load_orders(orders, order_fields, interner=interner):
+        schema = order.as_optimo_schema()
+        for key in ('assignedTo', 'schedulingInfo'):
+            driver_id = schema.get(key)
+            if key == 'schedulingInfo' and driver_id is not None:
+                driver_id = driver_id.as_optimo_schema()['scheduledDriver']
+            if driver_id is not None and driver_id not in driver_ids:
+                raise OptimoValidationError(
+                    "The order with id: '{}' references driver with id: '{}' "
+                    "that is not present in 'drivers' list".format(order.id, driver_id)
+                )
+        if no_orders:
+            fp.write(', ')
+        for chunk in json_encoder.iterencode(schema):
+            fp.write(chunk)
+        no_orders += 1
+    if not no_orders:
+        raise ValueError("'RoutePlan.orders' must have at least 1 element")
+    fp.write(']}')
+    return no_orders
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Distance and cost estimates of the routes of a result, joined back to the
+coordinates and the costs of the plan that was submitted.
+
+The legs of every route (driver start, the orders in visiting order, driver
+end) are laid out in flat coordinate arrays, so the great-circle distances
+of thousands of routes are computed in a single vectorized pass when
+``numpy`` is installed, and in a plain loop otherwise.
+
+Usage::
+
+  >>> from optimo.metrics import route_metrics
+  >>> for route in route_metrics(route_plan, optimo_api.get('1234')):
+  ...     print route.driver_id, route.distance_km, route.cost
+"""
+import math
+from collections import namedtuple
+
+from .errors import OptimoError
+from .util import DatetimeParser, unwrap_result
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+#: Metrics of a single route. ``legs_km`` is a ``tuple`` of the distances from
+#: the driver's start to the first order, between consecutive orders and from
+#: the last order to the driver's end. ``hours`` spans from the first order's
+#: ``scheduledAt`` to the end of the last order's service, and ``cost`` is the
+#: driver's fixed cost plus its ``cost_per_km`` and ``cost_per_hour`` (missing
+#: costs count as 0).
+RouteMetrics = namedtuple('RouteMetrics',
+                          'driver_id order_ids legs_km distance_km hours cost')
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km between two points in degrees"""
+    lat1, lng1, lat2, lng2 = (math.radians(value) for value in (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _haversine_python(lats, lngs, starts):
+    """Distances of the legs ``i -> i + 1`` for every ``i`` in ``starts``"""
+    return [haversine_km(lats[i], lngs[i], lats[i + 1], lngs[i + 1]) for i in starts]
+
+
+def _haversine_numpy(numpy, lats, lngs, starts):
+    lats = numpy.radians(numpy.asarray(lats, dtype=numpy.float64))
+    lngs = numpy.radians(numpy.asarray(lngs, dtype=numpy.float64))
+    starts = numpy.asarray(starts, dtype=numpy.intp)
+    lat1, lat2 = lats[starts], lats[starts + 1]
+    a = numpy.sin((lat2 - lat1) / 2) ** 2 + \
+        numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lngs[starts + 1] - lngs[starts]) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(a))).tolist()
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def route_metrics(route_plan, result, use_numpy=None):
+    """Computes the distance and the cost of every route of a result.
+
+    :param route_plan: :class:`optimo.models.RoutePlan` that was submitted
+    :param result: ``dict`` of its result, from :meth:`optimo.OptimoAPI.get`
+        (the whole response, or its ``'result'``)
+    :param use_numpy: (optional) ``bool``, whether to use ``numpy``. By
+        default it's used if it's installed.
+    :return: ``list`` of :class:`RouteMetrics`, in the order of the routes of
+             the result
+    :raises OptimoError: if the result has an order or a driver that's not in
+                         the plan, or ``use_numpy`` is set without ``numpy``
+    """
+    numpy = None
+    if use_numpy or use_numpy is None:
+        numpy = _import_numpy()
+        if numpy is None and use_numpy:
+            raise OptimoError("'use_numpy' requires the 'numpy' package")
+
+    result = unwrap_result(result)
+    orders = dict((order.id, order) for order in route_plan.orders)
+    drivers = dict((drv.id, drv) for drv in route_plan.drivers)
+    parse_time = DatetimeParser()
+
+    # the points of every route, one after the other
+    lats = []
+    lngs = []
+    # the index of the first point of each leg
+    starts = []
+    routes = []
+    for route in result.get('routes') or ():
+        driver_id = route['driverId']
+        try:
+            drv = drivers[driver_id]
+        except KeyError:
+            raise OptimoError("Driver '{}' of the result is not in the plan".format(driver_id))
+        route_orders = route.get('orders') or ()
+        if not route_orders:
+            routes.append((drv, (), 0, None))
+            continue
+        first = len(lats)
+        lats.append(float(drv.start_lat))
+        lngs.append(float(drv.start_lng))
+        for stop in route_orders:
+            try:
+                order = orders[stop['id']]
+            except KeyError:
+                raise OptimoError("Order '{}' of the result is not in the plan".format(stop['id']))
+            lats.append(float(order.lat))
+            lngs.append(float(order.lng))
+        lats.append(float(drv.end_lat))
+        lngs.append(float(drv.end_lng))
+        starts.extend(xrange(first, len(lats) - 1))
+
+        hours = None
+        first_at, last_at = route_orders[0].get('scheduledAt'), route_orders[-1].get('scheduledAt')
+        if first_at and last_at:
+            span = parse_time[last_at] - parse_time[first_at]
+            hours = (span.total_seconds() / 60.0 + orders[route_orders[-1]['id']].duration) / 60.0
+        routes.append((drv, tuple(stop['id'] for stop in route_orders), len(route_orders) + 1, hours))
+
+    if numpy is not None and starts:
+        legs = _haversine_numpy(numpy, lats, lngs, starts)
+    else:
+        legs = _haversine_python(lats, lngs, starts)
+
+    metrics = []
+    offset = 0
+    for drv, order_ids, no_legs, hours in routes:
+        route_legs = tuple(legs[offset:offset + no_legs])
+        offset += no_legs
+        distance_km = math.fsum(route_legs)
+        cost = 0.0
+        if order_ids:
+            cost += float(drv.fixed_cost or 0)
+            cost += float(drv.cost_per_km or 0) * distance_km
+            cost += float(drv.cost_per_hour or 0) * (hours or 0)
+        metrics.append(RouteMetrics(drv.id, order_ids, route_legs, distance_km, hours, cost))
+    return metrics
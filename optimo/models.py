@@ -1,16 +1,22 @@
 # -*- coding: utf-8 -*-
 import abc
+import copy
 import datetime
 from numbers import Number
 from decimal import Decimal
 
 from .errors import OptimoValidationError
+from .intervals import IntervalTree, free_slots
+from .skills import SKILLS
 
 
 class BaseModel(object):
     """Abstract base class that all OptimoRoute entities must subclass"""
     __metaclass__ = abc.ABCMeta
 
+    # keys of ``as_optimo_schema()`` that hold latitudes/longitudes
+    COORDINATE_KEYS = ()
+
     @abc.abstractmethod
     def validate(self):
         """It must replicate the validation according to the JSON schema
@@ -20,9 +26,12 @@ class BaseModel(object):
         """
 
     @abc.abstractmethod
-    def as_optimo_schema(self):
+    def as_optimo_schema(self, validate=True):
         """Must return a dict with the key names as expected from OptimoRoute's
         JSON schema.
+
+        :param validate: (optional) ``bool``, whether to validate the model
+            first. Only skip it for models that have already been validated.
         """
 
     def validate_type(self, attr, expected):
@@ -45,6 +54,16 @@ class BaseModel(object):
 ITERABLES = (list, tuple)
 
 
+def _skill_mask(model, registry):
+    """Mask of ``model.skills`` in ``registry``, cached until ``skills`` is
+    assigned again (or the mask of another registry is asked for).
+    """
+    cached = model._skill_mask
+    if cached is None or cached[0] != registry.token:
+        cached = model._skill_mask = (registry.token, registry.mask(model.skills))
+    return cached[1]
+
+
 class SchedulingInfo(BaseModel):
     """Scheduling information if order is already scheduled
 
@@ -64,8 +83,9 @@ class SchedulingInfo(BaseModel):
         self.validate_type('scheduled_driver', (basestring, Driver))
         self.validate_type('locked', bool)
 
-    def as_optimo_schema(self):
-        self.validate()
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         d = {
             'scheduledAt': self.scheduled_at,
             'locked': self.locked,
@@ -92,8 +112,9 @@ class TimeWindow(BaseModel):
         self.validate_type('start_time', datetime.datetime)
         self.validate_type('end_time', datetime.datetime)
 
-    def as_optimo_schema(self):
-        self.validate()
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         return {
             'timeFrom': self.start_time,
             'timeTo': self.end_time,
@@ -116,6 +137,8 @@ class Order(BaseModel):
     :param scheduling_info: :class:`optimo.models.SchedulingInfo <SchedulingInfo>` object
         if order is already scheduled.
     """
+    COORDINATE_KEYS = ('lat', 'lon')
+
     def __init__(self, id, lat, lng, duration, time_window=None, priority='M',
                  skills=None, assigned_to=None, scheduling_info=None):
         self.id = id
@@ -130,6 +153,39 @@ class Order(BaseModel):
         self.assigned_to = assigned_to
         self.scheduling_info = scheduling_info
 
+    @property
+    def skills(self):
+        return self._skills
+
+    @skills.setter
+    def skills(self, skills):
+        self._skills = skills
+        self._skill_mask = None
+
+    @property
+    def skill_mask(self):
+        """``int`` bitmask of ``skills`` in :data:`optimo.skills.SKILLS`, see
+        :mod:`optimo.skills`. Setting it replaces ``skills`` with the names of
+        its bits.
+
+        The mask is cached until ``skills`` is assigned again, so assign a new
+        list rather than changing it in place.
+        """
+        return _skill_mask(self, SKILLS)
+
+    @skill_mask.setter
+    def skill_mask(self, mask):
+        self.skills = SKILLS.names(mask)
+
+    def get_skill_mask(self, registry=SKILLS):
+        """Returns the bitmask of ``skills`` in ``registry``, e.g. the one of
+        a :class:`optimo.skills.SkillMatcher` scoped to a plan.
+
+        :param registry: (optional) :class:`optimo.skills.SkillRegistry`
+        :return: ``int`` mask
+        """
+        return _skill_mask(self, registry)
+
     def validate(self):
         cls_name = self.__class__.__name__
         self.validate_type('id', str)
@@ -167,8 +223,9 @@ class Order(BaseModel):
         if self.scheduling_info is not None:
             self.validate_type('scheduling_info', SchedulingInfo)
 
-    def as_optimo_schema(self):
-        self.validate()
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         d = {
             'id': self.id,
             'lat': self.lat,
@@ -194,6 +251,29 @@ class Order(BaseModel):
 
         return d
 
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        """Lazily builds orders out of an iterable of ``dict`` or ``tuple``
+        records, validating them in batches.
+
+        See :func:`optimo.loaders.load_orders` for the keyword arguments.
+
+        :return: generator of :class:`Order` objects
+        """
+        from .loaders import load_orders
+        return load_orders(records, **kwargs)
+
+    @classmethod
+    def from_csv(cls, csv_file, **kwargs):
+        """Lazily builds orders out of a CSV file, whose header names the
+        :data:`optimo.loaders.ORDER_FIELDS` columns.
+
+        :param csv_file: path of the CSV file, or a file object
+        :return: generator of :class:`Order` objects
+        """
+        from .loaders import load_orders, read_csv
+        return load_orders(read_csv(csv_file), **kwargs)
+
 
 class Break(BaseModel):
     """Break information for the driver
@@ -212,8 +292,9 @@ class Break(BaseModel):
         self.validate_type('latest_start', datetime.datetime)
         self.validate_type('duration', (int, long))
 
-    def as_optimo_schema(self):
-        self.validate()
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         return {
             'breakStartFrom': self.earliest_start,
             'breakStartTo': self.latest_start,
@@ -240,7 +321,15 @@ class WorkShift(BaseModel):
         self.unavailable_times = (unavailable_times if unavailable_times
                                   is not None else [])
 
-    def validate(self):
+    def validate(self, check_intervals=False):
+        """Validates the work shift.
+
+        :param check_intervals: (optional) ``bool``, when ``True`` the
+            unavailable times and the break are also checked against each
+            other and against the work shift (see :meth:`interval_errors`).
+        :raises OptimoValidationError: listing all of the interval problems
+            at once, when ``check_intervals`` is set.
+        """
         cls_name = self.__class__.__name__
         self.validate_type('start_work', datetime.datetime)
         self.validate_type('end_work', datetime.datetime)
@@ -259,8 +348,87 @@ class WorkShift(BaseModel):
                     "{}".format(cls_name, 'TimeWindow')
                 )
 
-    def as_optimo_schema(self):
-        self.validate()
+        if check_intervals:
+            errors = self.interval_errors()
+            if errors:
+                raise OptimoValidationError('; '.join(errors), errors=errors)
+
+    def interval_errors(self):
+        """Checks the unavailable times and the break for overlapping windows,
+        windows outside of the work shift and breaks that can not fit.
+
+        The unavailable times are sorted once and swept, so the checks cost
+        O(n log n) for n unavailable times. The model must already be valid
+        type-wise.
+
+        :return: ``list`` of ``str`` error messages, empty if there are no
+                 problems.
+        """
+        cls_name = self.__class__.__name__
+        fmt = lambda dt: dt.strftime('%Y-%m-%dT%H:%M')
+        errors = []
+
+        shift_end = self.end_work
+        if self.allowed_overtime:
+            shift_end += datetime.timedelta(minutes=self.allowed_overtime)
+        if self.end_work < self.start_work:
+            errors.append("'{}.end_work' ({}) is before 'start_work' ({})"
+                          .format(cls_name, fmt(self.end_work), fmt(self.start_work)))
+
+        windows = []
+        for idx, tw in enumerate(self.unavailable_times):
+            tw.validate()
+            label = "'{}.unavailable_times[{}]'".format(cls_name, idx)
+            if tw.end_time <= tw.start_time:
+                errors.append("{} ends ({}) before it starts ({})"
+                              .format(label, fmt(tw.end_time), fmt(tw.start_time)))
+                continue
+            if tw.start_time < self.start_work or tw.end_time > shift_end:
+                errors.append("{} ({} - {}) is outside of the work shift ({} - {})".format(
+                    label, fmt(tw.start_time), fmt(tw.end_time),
+                    fmt(self.start_work), fmt(shift_end)
+                ))
+            windows.append((tw.start_time, tw.end_time, idx))
+
+        unavailable = IntervalTree(windows)
+        latest = None
+        for start, end, idx in unavailable:
+            if latest is not None and start < latest[1]:
+                errors.append(
+                    "'{0}.unavailable_times[{1}]' overlaps with "
+                    "'{0}.unavailable_times[{2}]'".format(cls_name, latest[2], idx)
+                )
+            if latest is None or end > latest[1]:
+                latest = (start, end, idx)
+
+        if self.break_ is not None:
+            errors.extend(self._break_errors(shift_end, unavailable))
+        return errors
+
+    def _break_errors(self, shift_end, unavailable):
+        cls_name = self.__class__.__name__
+        brk = self.break_
+        brk.validate()
+        label = "'{}.break_'".format(cls_name)
+        duration = datetime.timedelta(minutes=brk.duration)
+
+        if brk.duration < 0:
+            return ["{} duration cannot be negative".format(label)]
+        if brk.latest_start < brk.earliest_start:
+            return ["{} latest start is before its earliest start".format(label)]
+        if brk.earliest_start < self.start_work or brk.latest_start + duration > shift_end:
+            return ["{} can not fit inside the work shift".format(label)]
+
+        window_end = brk.latest_start + duration
+        busy = unavailable.overlapping(brk.earliest_start, window_end)
+        for slot_start, slot_end in free_slots(brk.earliest_start, window_end, busy):
+            if slot_start <= brk.latest_start and slot_start + duration <= slot_end:
+                return []
+        return ["{} can not fit between the unavailable times".format(label)]
+
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         d = {
             'workTimeFrom': self.start_work,
             'workTimeTo': self.end_work,
@@ -309,7 +477,7 @@ class ServiceRegionPolygon(BaseModel):
             if not (-180 <= pair[1] <= 180):
                 raise ValueError("Longitude can take values between -180 and +180")
 
-    def as_optimo_schema(self):
+    def as_optimo_schema(self, validate=True):
         return self.lat_lng_pairs
 
 
@@ -334,6 +502,7 @@ class Driver(BaseModel):
     :param fixed_cost: ``numbers.Number`` Cost that is incurred every time this
         driver is used, regardless of time
     """
+    COORDINATE_KEYS = ('startLat', 'startLon', 'endLat', 'endLon')
 
     def __init__(self, id, start_lat, start_lng, end_lat, end_lng, work_shifts=None, skills=None,
                  speed_factor=None, service_regions=None, cost_per_hour=None, cost_per_hour_for_overtime=None,
@@ -352,6 +521,39 @@ class Driver(BaseModel):
         self.cost_per_km = cost_per_km
         self.fixed_cost = fixed_cost
 
+    @property
+    def skills(self):
+        return self._skills
+
+    @skills.setter
+    def skills(self, skills):
+        self._skills = skills
+        self._skill_mask = None
+
+    @property
+    def skill_mask(self):
+        """``int`` bitmask of ``skills`` in :data:`optimo.skills.SKILLS`, see
+        :mod:`optimo.skills`. Setting it replaces ``skills`` with the names of
+        its bits.
+
+        The mask is cached until ``skills`` is assigned again, so assign a new
+        list rather than changing it in place.
+        """
+        return _skill_mask(self, SKILLS)
+
+    @skill_mask.setter
+    def skill_mask(self, mask):
+        self.skills = SKILLS.names(mask)
+
+    def get_skill_mask(self, registry=SKILLS):
+        """Returns the bitmask of ``skills`` in ``registry``, e.g. the one of
+        a :class:`optimo.skills.SkillMatcher` scoped to a plan.
+
+        :param registry: (optional) :class:`optimo.skills.SkillRegistry`
+        :return: ``int`` mask
+        """
+        return _skill_mask(self, registry)
+
     def validate(self):
         cls_name = self.__class__.__name__
         self.validate_type('id', basestring)
@@ -408,8 +610,9 @@ class Driver(BaseModel):
         if self.fixed_cost is not None:
             self.validate_type('fixed_cost', Number)
 
-    def as_optimo_schema(self):
-        self.validate()
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         d = {
             'id': self.id,
             'startLat': self.start_lat,
@@ -434,6 +637,29 @@ class Driver(BaseModel):
 
         return d
 
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        """Lazily builds drivers out of an iterable of ``dict`` or ``tuple``
+        records, validating them in batches.
+
+        See :func:`optimo.loaders.load_drivers` for the keyword arguments.
+
+        :return: generator of :class:`Driver` objects
+        """
+        from .loaders import load_drivers
+        return load_drivers(records, **kwargs)
+
+    @classmethod
+    def from_csv(cls, csv_file, **kwargs):
+        """Lazily builds drivers out of a CSV file, whose header names the
+        :data:`optimo.loaders.DRIVER_FIELDS` columns.
+
+        :param csv_file: path of the CSV file, or a file object
+        :return: generator of :class:`Driver` objects
+        """
+        from .loaders import load_drivers, read_csv
+        return load_drivers(read_csv(csv_file), **kwargs)
+
 
 class OptimizationParameters(BaseModel):
     """OptimizationParameters object, offering optimization options for a RoutePlan instance.
@@ -457,8 +683,9 @@ class OptimizationParameters(BaseModel):
         self.balance_by = balance_by
         self.balancing_factor = balancing_factor
 
-    def as_optimo_schema(self):
-        self.validate()
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         return {
             'serviceOutsideServiceAreas': self.service_outside_service_areas,
             'balancing': self.balancing,
@@ -518,7 +745,8 @@ class RoutePlan(BaseModel):
         self.optimization_parameters = (optimization_parameters if optimization_parameters
                                         is not None else OptimizationParameters())
 
-    def validate(self):
+    def validate_settings(self):
+        """Validates everything but the orders and the drivers of the plan."""
         from .util import validate_url
 
         cls_name = self.__class__.__name__
@@ -532,6 +760,21 @@ class RoutePlan(BaseModel):
         self.validate_type('status_callback_url', basestring)
         validate_url(self.status_callback_url)
 
+        if self.no_load_capacities is not None:
+            self.validate_type('no_load_capacities', (int, long))
+            if (self.no_load_capacities < self.NO_LOAD_CAPACITIES_MIN or
+                    self.no_load_capacities > self.NO_LOAD_CAPACITIES_MAX):
+                raise ValueError(
+                    "'{}.no_load_capacities' must be between 0-4".
+                    format(cls_name)
+                )
+
+        self.validate_type('optimization_parameters', OptimizationParameters)
+
+    def validate(self):
+        cls_name = self.__class__.__name__
+        self.validate_settings()
+
         self.validate_type('orders', ITERABLES)
         if not self.orders:
             raise ValueError("'{}.orders' must have at least 1 element".format(cls_name))
@@ -550,15 +793,6 @@ class RoutePlan(BaseModel):
                     raise TypeError("'{}.drivers' must contain elements of type"
                                     " {}".format(cls_name, 'Driver'))
 
-        if self.no_load_capacities is not None:
-            self.validate_type('no_load_capacities', (int, long))
-            if (self.no_load_capacities < self.NO_LOAD_CAPACITIES_MIN or
-                    self.no_load_capacities > self.NO_LOAD_CAPACITIES_MAX):
-                raise ValueError(
-                    "'{}.no_load_capacities' must be between 0-4".
-                    format(cls_name)
-                )
-
         # ascertain that all driver id references of
         # SchedulingInfo.scheduled_driver and Order.assigned_to
         # correspond to actual driver objects inside 'drivers'.
@@ -582,10 +816,49 @@ class RoutePlan(BaseModel):
                         .format(order.id, order_driver_id)
                     )
 
-        self.validate_type('optimization_parameters', OptimizationParameters)
+    def snapshot(self, deep=False):
+        """Returns a copy of the plan that stays the same while other threads
+        keep changing this one, so it can be validated and encoded without
+        holding any lock.
+
+        The ``orders`` and ``drivers`` lists are copied into tuples, so orders
+        and drivers added or removed later don't show up in the snapshot.
+
+        :param deep: (optional) ``bool``, also copy every model of the plan,
+            for plans whose orders and drivers are modified in place. Drivers
+            referenced by orders keep pointing to the copied drivers.
+        :return: :class:`RoutePlan` object
+        """
+        # tuple() copies a list in a single step, appends of other threads
+        # either happen before or after it
+        orders = tuple(self.orders) if isinstance(self.orders, ITERABLES) else self.orders
+        drivers = tuple(self.drivers) if isinstance(self.drivers, ITERABLES) else self.drivers
+        optimization_parameters = self.optimization_parameters
+        if deep:
+            orders, drivers, optimization_parameters = copy.deepcopy(
+                (orders, drivers, optimization_parameters))
+        return self.__class__(
+            self.request_id, self.callback_url, self.status_callback_url,
+            orders=orders, drivers=drivers,
+            no_load_capacities=self.no_load_capacities,
+            optimization_parameters=optimization_parameters,
+        )
+
+    def collect_errors(self, fail_fast=False, sample=1.0, seed=None):
+        """Validates the whole plan in one pass, collecting every problem
+        along with its path (e.g. ``orders[12].time_window.start_time``)
+        instead of raising on the first one.
+
+        See :func:`optimo.validation.validate_route_plan` for the parameters.
+
+        :return: :class:`optimo.validation.ValidationReport` object
+        """
+        from .validation import validate_route_plan
+        return validate_route_plan(self, fail_fast=fail_fast, sample=sample, seed=seed)
 
-    def as_optimo_schema(self):
-        self.validate()
+    def as_optimo_schema(self, validate=True):
+        if validate:
+            self.validate()
         d = {
             'requestId': self.request_id,
             'callback': self.callback_url,
@@ -597,3 +870,40 @@ class RoutePlan(BaseModel):
         if self.no_load_capacities:
             d['noLoadCapacities'] = self.no_load_capacities
         return d
+
+    @classmethod
+    def from_records(cls, request_id, callback_url, status_callback_url, orders,
+                     drivers, **kwargs):
+        """Builds a route plan out of order and driver records.
+
+        Skills and time windows are interned across the orders and the
+        drivers of the plan.
+
+        :param orders: iterable of order records (see :meth:`Order.from_records`)
+        :param drivers: iterable of driver records (see :meth:`Driver.from_records`)
+        :return: :class:`RoutePlan` object
+
+        The rest of the parameters are the same as the constructor's.
+        """
+        from .loaders import Interner, load_orders, load_drivers
+
+        interner = Interner()
+        return cls(
+            request_id, callback_url, status_callback_url,
+            orders=list(load_orders(orders, interner=interner)),
+            drivers=list(load_drivers(drivers, interner=interner)),
+            **kwargs
+        )
+
+    @classmethod
+    def from_csv(cls, request_id, callback_url, status_callback_url, orders_csv,
+                 drivers_csv, **kwargs):
+        """Builds a route plan out of an orders and a drivers CSV file.
+
+        :param orders_csv: path or file object of the orders CSV file
+        :param drivers_csv: path or file object of the drivers CSV file
+        :return: :class:`RoutePlan` object
+        """
+        from .loaders import read_csv
+        return cls.from_records(request_id, callback_url, status_callback_url,
+                                read_csv(orders_csv), read_csv(drivers_csv), **kwargs)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Client-side request rate limiting.
+
+A :class:`Throttle` combines a token bucket per access key with a global one.
+Requests first wait for a token of their own key, so a busy account only
+slows down itself, and then queue for a global token. The global queue is
+served round-robin across access keys: an account with a burst of pending
+requests gets one of them through per turn, the same as an account with a
+single pending request.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .errors import OptimoError
+
+
+class RateLimitTimeout(OptimoError):
+    """Raised when a request couldn't get through the rate limits in time"""
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket.
+
+    :param rate: ``float`` tokens added per second
+    :param capacity: (optional) ``int`` maximum number of tokens, i.e. the
+        largest burst. Defaults to ``rate`` (at least 1).
+    :param clock: (optional) function returning the current time in seconds
+    """
+    def __init__(self, rate, capacity=None, clock=time.time):
+        if rate <= 0:
+            raise ValueError("'rate' must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = max(now - self._updated, 0.0)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self):
+        """``float`` number of tokens available right now"""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, tokens=1):
+        """Takes ``tokens`` out of the bucket, if there are enough of them.
+
+        :return: ``0.0`` if they were taken, otherwise the ``float`` number of
+                 seconds until there will be enough of them
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """Blocks until ``tokens`` could be taken out of the bucket.
+
+        :param timeout: (optional) maximum number of seconds to wait
+        :raises RateLimitTimeout: if ``timeout`` expired
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining < wait:
+                    raise RateLimitTimeout(
+                        'Rate limit not available within {} seconds'.format(timeout))
+            time.sleep(wait)
+
+
+class FairScheduler(object):
+    """Lets requests of many tenants through a shared :class:`TokenBucket`,
+    serving the tenants round-robin.
+
+    :param bucket: (optional) :class:`TokenBucket` shared by every tenant.
+        Without one, requests are only ordered and never wait for tokens.
+    """
+    def __init__(self, bucket=None):
+        self.bucket = bucket
+        self._queues = OrderedDict()  # tenant -> deque of waiting tickets
+        self._cond = threading.Condition()
+
+    def pending(self, tenant=None):
+        """``int`` number of waiting requests, of a single tenant or overall"""
+        with self._cond:
+            if tenant is not None:
+                return len(self._queues.get(tenant, ()))
+            return sum(len(queue) for queue in self._queues.itervalues())
+
+    def _is_next(self, tenant, ticket):
+        next_tenant = next(iter(self._queues))
+        return next_tenant == tenant and self._queues[tenant][0] is ticket
+
+    def _remove(self, tenant, ticket):
+        # the tenant moves to the end of the line, behind the others
+        queue = self._queues.pop(tenant)
+        queue.remove(ticket)
+        if queue:
+            self._queues[tenant] = queue
+        self._cond.notify_all()
+
+    def acquire(self, tenant, timeout=None):
+        """Blocks until it's the turn of ``tenant`` and a token is available.
+
+        :param tenant: hashable identifier of the tenant (e.g. access key)
+        :param timeout: (optional) maximum number of seconds to wait
+        :raises RateLimitTimeout: if ``timeout`` expired
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        ticket = object()
+        with self._cond:
+            self._queues.setdefault(tenant, deque()).append(ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._is_next(tenant, ticket):
+                        wait = self.bucket.try_acquire() if self.bucket else 0.0
+                        if not wait:
+                            break
+                    if deadline is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            raise RateLimitTimeout(
+                                'Rate limit not available within {} seconds'.format(timeout))
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._remove(tenant, ticket)
+
+
+class Throttle(object):
+    """Per access key and global request rate limits.
+
+    Pass it to :class:`optimo.base.CoreOptimoAPI` (or
+    :class:`optimo.OptimoAPI`) as ``throttle``, usually through a
+    :class:`optimo.registry.ClientRegistry`.
+
+    :param rate: (optional) ``float`` requests per second of each access key
+    :param burst: (optional) ``int`` burst size of each access key
+    :param global_rate: (optional) ``float`` requests per second overall
+    :param global_burst: (optional) ``int`` overall burst size
+    :param timeout: (optional) maximum number of seconds a request waits
+        before :class:`RateLimitTimeout` is raised. Waits forever by default.
+    """
+    def __init__(self, rate=None, burst=None, global_rate=None, global_burst=None,
+                 timeout=None):
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.buckets = {}
+        self._lock = threading.Lock()
+        global_bucket = TokenBucket(global_rate, global_burst) if global_rate else None
+        self.scheduler = FairScheduler(global_bucket)
+
+    def bucket(self, access_key):
+        """Returns the :class:`TokenBucket` of an access key, if keys are
+        rate limited.
+        """
+        if not self.rate:
+            return None
+        bucket = self.buckets.get(access_key)
+        if bucket is None:
+            with self._lock:
+                bucket = self.buckets.get(access_key)
+                if bucket is None:
+                    bucket = self.buckets[access_key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def acquire(self, access_key, endpoint=None):
+        """Blocks until a request of ``access_key`` may be sent.
+
+        :param access_key: access key of the account making the request
+        :param endpoint: (optional) endpoint of the request
+        :raises RateLimitTimeout: if the ``timeout`` expired
+        """
+        started = time.time()
+        bucket = self.bucket(access_key)
+        if bucket is not None:
+            bucket.acquire(timeout=self.timeout)
+        timeout = self.timeout
+        if timeout is not None:
+            timeout = max(timeout - (time.time() - started), 0.0)
+        self.scheduler.acquire(access_key, timeout=timeout)
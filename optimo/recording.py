@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Recording and replaying of the traffic of a :class:`CoreOptimoAPI`, e.g.
+to benchmark a pipeline against realistic responses without the live
+service.
+
+:class:`RecordingTransport` wraps another transport and appends every
+exchange to a file. :class:`ReplayTransport` serves the recorded responses
+back, with their recorded latency, a fraction of it, or none at all.
+
+The file is a sequence of records. Each record is a line of JSON with the
+request, the response's status code and headers, the latency and the sizes
+of the two bodies, followed by the raw request body and the raw response
+content. The access key is never recorded.
+
+Usage::
+
+  >>> from optimo.recording import RecordingTransport, ReplayTransport
+  >>> from optimo.transports import RequestsTransport
+  >>> optimo_api = OptimoAPI('https://api.optimoroute.com', 'myaccesskey',
+  ...                        transport=RecordingTransport(RequestsTransport(), 'traffic.rec'))
+  # later, 10 times faster than the recorded traffic
+  >>> optimo_api = OptimoAPI('https://api.optimoroute.com', 'myaccesskey',
+  ...                        transport=ReplayTransport('traffic.rec', speed=10))
+"""
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+from .errors import OptimoError
+from .transports import Transport
+
+
+#: url parameters that are not recorded
+SECRET_PARAMS = frozenset(['key'])
+
+
+def _record_key(url, method, params):
+    """The request a response is replayed for"""
+    params = sorted((name, value) for name, value in (params or {}).iteritems()
+                    if name not in SECRET_PARAMS)
+    return method, url, tuple(params)
+
+
+class Exchange(object):
+    """A recorded request and its response"""
+    __slots__ = ('url', 'method', 'params', 'headers', 'data', 'status_code',
+                 'response_headers', 'content', 'started', 'elapsed')
+
+    def __init__(self, url, method, params, headers, data, status_code,
+                 response_headers, content, started, elapsed):
+        self.url = url
+        self.method = method
+        self.params = params
+        self.headers = headers
+        self.data = data
+        self.status_code = status_code
+        self.response_headers = response_headers
+        self.content = content
+        self.started = started
+        self.elapsed = elapsed
+
+    @property
+    def key(self):
+        return _record_key(self.url, self.method, self.params)
+
+    def as_response(self):
+        return {
+            'status_code': self.status_code,
+            'headers': dict(self.response_headers),
+            'content': self.content,
+        }
+
+
+def write_exchange(fp, exchange):
+    """Appends an exchange to an open (binary) file"""
+    data = '' if exchange.data is None else exchange.data
+    header = json.dumps({
+        'url': exchange.url,
+        'method': exchange.method,
+        'params': exchange.params,
+        'headers': exchange.headers,
+        'data_size': None if exchange.data is None else len(data),
+        'status_code': exchange.status_code,
+        'response_headers': exchange.response_headers,
+        'content_size': len(exchange.content),
+        'started': exchange.started,
+        'elapsed': exchange.elapsed,
+    }, separators=(',', ':'), sort_keys=True)
+    fp.write(header + '\n')
+    fp.write(data)
+    fp.write(exchange.content)
+
+
+def read_exchanges(fp):
+    """Yields the :class:`Exchange` objects of an open (binary) file"""
+    for line in iter(fp.readline, ''):
+        record = json.loads(line)
+        data_size = record['data_size']
+        data = None if data_size is None else fp.read(data_size)
+        content = fp.read(record['content_size'])
+        if len(content) != record['content_size']:
+            raise OptimoError('Truncated recording, the last exchange is incomplete')
+        yield Exchange(record['url'], record['method'], record['params'],
+                       record['headers'], data, record['status_code'],
+                       record['response_headers'], content, record['started'],
+                       record['elapsed'])
+
+
+class RecordingTransport(Transport):
+    """Sends the requests through another transport and appends every
+    exchange to a file.
+
+    :param transport: :class:`optimo.transports.Transport` that sends the
+        requests
+    :param path: ``str`` path of the file. It's appended to if it exists.
+    :param clock: (optional) function returning the current time in seconds
+    """
+    def __init__(self, transport, path, clock=time.time):
+        self.transport = transport
+        self.path = path
+        self.clock = clock
+        self._fp = open(path, 'ab')
+        self._lock = threading.Lock()
+
+    def request(self, url, method, params, data=None, headers=None):
+        started = self.clock()
+        resp = self.transport.request(url, method, params, data, headers)
+        elapsed = self.clock() - started
+        exchange = Exchange(
+            url, method,
+            dict((name, value) for name, value in (params or {}).iteritems()
+                 if name not in SECRET_PARAMS),
+            dict(headers or {}),
+            None if data is None else memoryview(data).tobytes(),
+            resp['status_code'], dict(resp['headers'] or {}), resp['content'],
+            started, elapsed,
+        )
+        with self._lock:
+            write_exchange(self._fp, exchange)
+            self._fp.flush()
+        return resp
+
+    def close(self):
+        with self._lock:
+            self._fp.close()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """Serves the responses of a recording.
+
+    Each request gets the next unused response recorded for the same method,
+    url and parameters (but the access key), in the recorded order.
+
+    :param path: ``str`` path of the recording
+    :param speed: (optional) ``float`` how much faster than recorded the
+        responses are served: ``1.0`` for real time, ``10`` for a tenth of the
+        recorded latency. ``None`` serves them right away.
+    :param loop: (optional) ``bool``, start over from the first response of a
+        request once they are all used. Otherwise an :class:`OptimoError` is
+        raised.
+    :param sleep: (optional) function that waits for a number of seconds
+    """
+    def __init__(self, path, speed=1.0, loop=False, sleep=time.sleep):
+        if speed is not None and speed <= 0:
+            raise ValueError("'speed' must be a positive number or None")
+        self.speed = speed
+        self.loop = loop
+        self.sleep = sleep
+        self.exchanges = defaultdict(list)
+        with open(path, 'rb') as fp:
+            for exchange in read_exchanges(fp):
+                self.exchanges[exchange.key].append(exchange)
+        self._queues = dict((key, deque(exchanges))
+                            for key, exchanges in self.exchanges.iteritems())
+        self._lock = threading.Lock()
+
+    def request(self, url, method, params, data=None, headers=None):
+        key = _record_key(url, method, params)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue and self.loop and key in self.exchanges:
+                queue = self._queues[key] = deque(self.exchanges[key])
+            if not queue:
+                raise OptimoError('No recorded response left for {} {} {!r}'
+                                  .format(method, url, dict(key[2])))
+            exchange = queue.popleft()
+        if self.speed is not None:
+            self.sleep(exchange.elapsed / self.speed)
+        return exchange.as_response()
+
+    def remaining(self):
+        """``int`` number of recorded responses not served yet"""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.itervalues())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Registry of :class:`optimo.OptimoAPI` clients for many accounts.
+
+Usage::
+
+  >>> from optimo.registry import ClientRegistry
+  >>> registry = ClientRegistry('https://api.optimoroute.com', rate=5,
+  ...                           global_rate=20)
+  >>> registry.get('tenant1accesskey').plan(route_plan)
+  >>> registry.get('tenant2accesskey').get('1234')
+"""
+import threading
+
+from .api import OptimoAPI
+from .ratelimit import Throttle
+from .transports import RequestsTransport
+from .util import DEFAULT_API_VERSION
+
+
+class ClientRegistry(object):
+    """Hands out one :class:`optimo.OptimoAPI` per access key, all of them
+    sharing a single transport and the same rate limits.
+
+    By default the transport is a
+    :class:`optimo.transports.RequestsTransport`, so each thread sends the
+    requests of every account through a :class:`requests.Session` of its
+    own, keeping its connections open across accounts.
+
+    :param optimo_url: the url of the optimoroute's service
+    :param version: (optional) API version string(v1, v2, ...)
+    :param rate: (optional) ``float`` requests per second of each access key
+    :param burst: (optional) ``int`` burst size of each access key
+    :param global_rate: (optional) ``float`` requests per second overall
+    :param global_burst: (optional) ``int`` overall burst size
+    :param timeout: (optional) maximum number of seconds a request waits for
+        the rate limits, see :class:`optimo.ratelimit.Throttle`
+    :param session: (optional) :class:`requests.Session` shared by the clients
+        *and* the threads. Sessions are not thread-safe, so only pass one if a
+        single thread uses the registry.
+    :param transport: (optional) :class:`optimo.transports.Transport` shared
+        by the clients, e.g. a :class:`optimo.transports.Urllib3Transport`
+        for a single thread-safe connection pool.
+    :param core_options: (optional) keyword arguments that will be relayed to
+        every :class:`optimo.base.CoreOptimoAPI` (e.g. ``compression='gzip'``)
+    """
+    def __init__(self, optimo_url, version=DEFAULT_API_VERSION, rate=None,
+                 burst=None, global_rate=None, global_burst=None, timeout=None,
+                 session=None, transport=None, **core_options):
+        self.optimo_url = optimo_url
+        self.version = version
+        self.session = session
+        self.transport = transport if transport is not None else RequestsTransport(session)
+        self.throttle = Throttle(rate, burst, global_rate, global_burst, timeout)
+        self.core_options = core_options
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, access_key):
+        """Returns the client of an account, creating it on first use.
+
+        :param access_key: access key for the account (provided by optimoroute)
+        :return: :class:`optimo.OptimoAPI` object
+        """
+        client = self._clients.get(access_key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(access_key)
+                if client is None:
+                    client = self._clients[access_key] = OptimoAPI(
+                        self.optimo_url, access_key, self.version,
+                        session=self.session, transport=self.transport,
+                        throttle=self.throttle,
+                        **self.core_options
+                    )
+        return client
+
+    def __contains__(self, access_key):
+        return access_key in self._clients
+
+    def __len__(self):
+        return len(self._clients)
+
+    def remove(self, access_key):
+        """Forgets the client (and the rate limit state) of an account"""
+        with self._lock:
+            self._clients.pop(access_key, None)
+            self.throttle.buckets.pop(access_key, None)
+
+    def close(self):
+        """Closes the connections of the shared transport"""
+        self.transport.close()
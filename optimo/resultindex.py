@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Time indexes over the scheduled stops of an optimization result, to answer
+dispatchers' questions ("which stops are between 10:00 and 11:00", "what is
+driver X doing now") without scanning the whole result.
+
+The stops are sorted by time once, globally and per driver, and every query
+is a binary search.
+
+Usage::
+
+  >>> from optimo.resultindex import ResultIndex
+  >>> index = ResultIndex(optimo_api.get('1234'))
+  >>> index.between(datetime(2014, 12, 5, 10), datetime(2014, 12, 5, 11))
+  [Stop(order_id=u'123', driver_id=u'drv1', scheduled_at=datetime(2014, 12, 5, 10, 15), sequence=3)]
+  >>> index.current_stop('drv1', datetime.now())
+"""
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from operator import attrgetter
+
+from .util import DatetimeParser, unwrap_result
+
+
+Stop = namedtuple('Stop', 'order_id driver_id scheduled_at sequence')
+
+
+class _TimeIndex(object):
+    """Stops sorted by time, with their times in a parallel list to bisect"""
+    def __init__(self, stops):
+        self.stops = sorted(stops, key=attrgetter('scheduled_at'))
+        self.times = [stop.scheduled_at for stop in self.stops]
+
+    def between(self, start, end):
+        return self.stops[bisect_left(self.times, start):bisect_left(self.times, end)]
+
+    def at_or_before(self, at):
+        idx = bisect_right(self.times, at)
+        return self.stops[idx - 1] if idx else None
+
+    def after(self, at):
+        idx = bisect_right(self.times, at)
+        return self.stops[idx] if idx < len(self.stops) else None
+
+
+class ResultIndex(object):
+    """Read-only, time-indexed view of the stops of a result.
+
+    Building it takes ``O(n log n)`` for ``n`` stops; every query takes
+    ``O(log n)`` (plus the number of stops it returns).
+
+    :param result: ``dict`` of a result of :meth:`optimo.OptimoAPI.get` (the
+        whole response, or its ``'result'``)
+    :ivar unscheduled: ``list`` of the :class:`Stop` s without a
+        ``scheduledAt``, which are left out of the time queries
+    """
+    def __init__(self, result):
+        result = unwrap_result(result)
+        parse_time = DatetimeParser()
+        self.unscheduled = []
+        self._drivers = {}
+        self.driver_ids = []
+        stops = []
+        for route in result.get('routes') or ():
+            driver_id = route['driverId']
+            route_stops = []
+            for sequence, order in enumerate(route.get('orders') or ()):
+                scheduled_at = order.get('scheduledAt')
+                if not scheduled_at:
+                    self.unscheduled.append(Stop(order['id'], driver_id, None, sequence))
+                    continue
+                route_stops.append(Stop(order['id'], driver_id, parse_time[scheduled_at], sequence))
+            self._drivers[driver_id] = _TimeIndex(route_stops)
+            self.driver_ids.append(driver_id)
+            stops.extend(route_stops)
+        self._all = _TimeIndex(stops)
+        self._by_order = dict((stop.order_id, stop) for stop in stops)
+        self._by_order.update((stop.order_id, stop) for stop in self.unscheduled)
+
+    def __len__(self):
+        return len(self._all.stops)
+
+    def _index(self, driver_id):
+        if driver_id is None:
+            return self._all
+        try:
+            return self._drivers[driver_id]
+        except KeyError:
+            raise KeyError("Unknown driver '{}'".format(driver_id))
+
+    def stops(self, driver_id=None):
+        """Returns the scheduled stops of a driver (or of every driver),
+        sorted by time.
+        """
+        return list(self._index(driver_id).stops)
+
+    def between(self, start, end, driver_id=None):
+        """Returns the stops scheduled in ``[start, end)``, sorted by time.
+
+        :param start: ``datetime.datetime``
+        :param end: ``datetime.datetime``
+        :param driver_id: (optional) only return the stops of this driver
+        :return: ``list`` of :class:`Stop`
+        """
+        return self._index(driver_id).between(start, end)
+
+    def current_stop(self, driver_id, at):
+        """Returns the last stop of a driver scheduled at or before ``at``,
+        i.e. the one the driver is at or just left, or ``None``.
+        """
+        return self._index(driver_id).at_or_before(at)
+
+    def next_stop(self, at, driver_id=None):
+        """Returns the first stop scheduled after ``at``, of a driver or of
+        every driver, or ``None``.
+        """
+        return self._index(driver_id).after(at)
+
+    def stop(self, order_id):
+        """Returns the :class:`Stop` of an order, or ``None`` if it's not
+        served.
+        """
+        return self._by_order.get(order_id)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Prioritized admission of outbound API calls.
+
+A :class:`RequestScheduler` caps the number of requests in flight. When it's
+saturated, waiting requests are let through by priority class (stops first,
+then result fetches, then plan submissions) and in arrival order within a
+class. Each class has a bounded queue: requests arriving to a full queue are
+shed right away, and requests that wait past their deadline are dropped.
+
+Usage::
+
+  >>> from optimo import OptimoAPI
+  >>> from optimo.scheduler import RequestScheduler
+  >>> scheduler = RequestScheduler(max_concurrency=4, timeouts={'plan_routes': 30})
+  >>> optimo_api = OptimoAPI('https://api.optimoroute.com', 'myaccesskey',
+  ...                        scheduler=scheduler)
+  >>> scheduler.metrics()['plan_routes']['depth']
+  0
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from .errors import OptimoError
+
+
+#: priority class of each endpoint, lower goes first. Stops free capacity on
+#: the service and results unblock dispatchers, plans can wait.
+ENDPOINT_PRIORITIES = {
+    'stop_planning': 0,
+    'get_result': 1,
+    'plan_routes': 2,
+}
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_QUEUE_SIZE = 100
+
+
+class RequestShed(OptimoError):
+    """Raised when a request is rejected because its queue is full"""
+
+
+class DeadlineExceeded(OptimoError):
+    """Raised when a request waited in its queue past its deadline"""
+
+
+class QueueStats(object):
+    """Counters of a single priority class"""
+    def __init__(self):
+        self.depth = 0
+        self.max_depth = 0
+        self.admitted = 0
+        self.shed = 0
+        self.expired = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self):
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'admitted': self.admitted,
+            'shed': self.shed,
+            'expired': self.expired,
+            'wait_total': self.wait_total,
+            'wait_max': self.wait_max,
+            'wait_mean': self.wait_total / self.admitted if self.admitted else 0.0,
+        }
+
+
+class _Waiter(object):
+    __slots__ = ('endpoint', 'enqueued', 'cancelled')
+
+    def __init__(self, endpoint, enqueued):
+        self.endpoint = endpoint
+        self.enqueued = enqueued
+        self.cancelled = False
+
+
+class RequestScheduler(object):
+    """Admits outbound requests by priority, up to a concurrency limit.
+
+    Pass it to :class:`optimo.base.CoreOptimoAPI` (or
+    :class:`optimo.OptimoAPI`) as ``scheduler``. A scheduler may be shared by
+    several clients.
+
+    :param max_concurrency: (optional) ``int`` maximum number of requests in
+        flight
+    :param max_queue_size: (optional) ``int`` maximum number of waiting
+        requests per endpoint, or ``dict`` of them keyed by endpoint
+    :param timeouts: (optional) ``dict`` of the maximum number of seconds a
+        request of an endpoint may wait. Requests wait forever by default.
+    :param priorities: (optional) ``dict`` of the priority class of each
+        endpoint (lower goes first). Defaults to :data:`ENDPOINT_PRIORITIES`.
+    """
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_queue_size=DEFAULT_MAX_QUEUE_SIZE, timeouts=None,
+                 priorities=None):
+        if max_concurrency < 1:
+            raise ValueError("'max_concurrency' must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.priorities = dict(priorities or ENDPOINT_PRIORITIES)
+        if isinstance(max_queue_size, dict):
+            self.max_queue_sizes = dict(max_queue_size)
+        else:
+            self.max_queue_sizes = dict.fromkeys(self.priorities, max_queue_size)
+        self.timeouts = dict(timeouts or {})
+        self.active = 0
+        self.stats = dict((endpoint, QueueStats()) for endpoint in self.priorities)
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def _head(self):
+        """Returns the first waiter that is still waiting, if any"""
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0][2] if self._heap else None
+
+    def acquire(self, endpoint, timeout=None):
+        """Blocks until a request to ``endpoint`` may be sent. Every
+        successful call must be followed by a :meth:`release`.
+
+        :param endpoint: one of ('get_result', 'plan_routes', 'stop_planning')
+        :param timeout: (optional) maximum number of seconds to wait, instead
+            of the endpoint's default
+        :raises RequestShed: if the queue of the endpoint is full
+        :raises DeadlineExceeded: if the request waited for too long
+        """
+        if timeout is None:
+            timeout = self.timeouts.get(endpoint)
+        stats = self.stats[endpoint]
+        now = time.time()
+        deadline = None if timeout is None else now + timeout
+
+        with self._cond:
+            if self.active < self.max_concurrency and self._head() is None:
+                self.active += 1
+                stats.admitted += 1
+                return
+            max_queue_size = self.max_queue_sizes.get(endpoint)
+            if max_queue_size is not None and stats.depth >= max_queue_size:
+                stats.shed += 1
+                raise RequestShed(
+                    "Too many queued '{}' requests ({})".format(endpoint, stats.depth))
+
+            waiter = _Waiter(endpoint, now)
+            heapq.heappush(self._heap, (self.priorities[endpoint], next(self._counter), waiter))
+            stats.depth += 1
+            stats.max_depth = max(stats.max_depth, stats.depth)
+            try:
+                while not (self.active < self.max_concurrency and self._head() is waiter):
+                    wait = None
+                    if deadline is not None:
+                        wait = deadline - time.time()
+                        if wait <= 0:
+                            stats.expired += 1
+                            raise DeadlineExceeded(
+                                "'{}' request waited for more than {} seconds"
+                                .format(endpoint, timeout))
+                    self._cond.wait(wait)
+                heapq.heappop(self._heap)
+                self.active += 1
+                waited = time.time() - waiter.enqueued
+                stats.admitted += 1
+                stats.wait_total += waited
+                stats.wait_max = max(stats.wait_max, waited)
+            finally:
+                waiter.cancelled = True
+                stats.depth -= 1
+                # the next waiter may be able to go now
+                self._cond.notify_all()
+
+    def release(self):
+        """Frees the slot of a request that was sent"""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, endpoint, timeout=None):
+        """Context manager that holds a slot while a request is sent. Takes
+        the same parameters as :meth:`acquire`.
+        """
+        self.acquire(endpoint, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def depth(self, endpoint=None):
+        """``int`` number of waiting requests, of an endpoint or overall"""
+        with self._cond:
+            if endpoint is not None:
+                return self.stats[endpoint].depth
+            return sum(stats.depth for stats in self.stats.itervalues())
+
+    def metrics(self):
+        """Returns the queue depth and wait time metrics of every endpoint.
+
+        :return: ``dict`` of ``dict`` s keyed by endpoint, with the ``depth``,
+                 ``max_depth``, ``admitted``, ``shed`` and ``expired`` counters
+                 and the ``wait_total``, ``wait_max`` and ``wait_mean`` times
+                 in seconds
+        """
+        with self._cond:
+            return dict((endpoint, stats.as_dict())
+                        for endpoint, stats in self.stats.iteritems())
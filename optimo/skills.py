@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Skills as integer bitmasks.
+
+A :class:`SkillRegistry` interns skill names to bit positions, so the skills
+of an order or a driver become a single ``int`` and "does this driver have
+every skill of this order" is ``order_mask & ~driver_mask == 0``. The models
+keep their ``skills`` lists, which are still what gets serialized; their
+``skill_mask`` is derived from them with the shared :data:`SKILLS` registry,
+and ``get_skill_mask(registry)`` with any other one.
+
+Bits are never reused, so a registry grows with every skill name it has seen.
+Long running processes that see many plans should give each plan a registry
+of its own, as :class:`optimo.feasibility.FeasibilityAnalyzer` does.
+
+:class:`SkillMatcher` groups the drivers by mask, so matching many orders
+against many drivers only compares each distinct order mask with each
+distinct driver mask, once.
+
+Usage::
+
+  >>> from optimo.skills import SkillMatcher, SkillRegistry
+  >>> matcher = SkillMatcher(route_plan.drivers, registry=SkillRegistry())
+  >>> for order in route_plan.orders:
+  ...     driver_ids = matcher.drivers_for(order.get_skill_mask(matcher.registry))
+"""
+import threading
+import uuid
+from collections import defaultdict
+
+
+class SkillRegistry(object):
+    """Assigns each skill name the next free bit, the first time it's seen.
+
+    Bits are never reused, so masks stay valid for the registry's lifetime.
+    Instances are safe to share between threads.
+
+    The models cache their masks under the registry's ``token``, a unique
+    string, rather than the registry itself (which holds a lock), so that
+    they can still be copied and pickled.
+    """
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+        self._bits = {}
+        self._names = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._bits
+
+    def bit(self, name):
+        """Returns the mask of a single skill, registering it if needed"""
+        bit = self._bits.get(name)
+        if bit is None:
+            with self._lock:
+                bit = self._bits.get(name)
+                if bit is None:
+                    bit = self._bits[name] = 1 << len(self._names)
+                    self._names.append(name)
+        return bit
+
+    def mask(self, names):
+        """Returns the mask of an iterable of skill names"""
+        mask = 0
+        for name in names:
+            mask |= self.bit(name)
+        return mask
+
+    def names(self, mask):
+        """Returns the ``list`` of skill names of a mask, in registration
+        order.
+        """
+        names = []
+        position = 0
+        while mask:
+            if mask & 1:
+                names.append(self._names[position])
+            mask >>= 1
+            position += 1
+        return names
+
+
+#: registry the models' ``skill_mask`` use, shared by the whole process
+SKILLS = SkillRegistry()
+
+
+def has_skills(driver_mask, required_mask):
+    """``bool`` whether a driver's mask covers every required skill"""
+    return not required_mask & ~driver_mask
+
+
+class SkillMatcher(object):
+    """Finds the drivers that have all of the skills of an order.
+
+    The drivers are grouped by mask and the answer of every distinct order
+    mask is memoized, so checking ``n`` orders with ``k`` distinct masks
+    against drivers with ``m`` distinct masks costs ``O(n + k * m)``.
+
+    :param drivers: ``list`` of :class:`optimo.models.Driver` objects
+    :param registry: (optional) :class:`SkillRegistry` of the masks, e.g. a
+        new one for each plan. :data:`SKILLS` by default, the registry of the
+        models' ``skill_mask``.
+    """
+    def __init__(self, drivers, registry=SKILLS):
+        self.registry = registry
+        by_mask = defaultdict(list)
+        for drv in drivers:
+            by_mask[registry.mask(drv.skills)].append(drv.id)
+        self._by_mask = by_mask.items()
+        self._cache = {}
+
+    def drivers_for(self, required_mask):
+        """Returns the ids of the drivers that have every skill of
+        ``required_mask``.
+
+        :param required_mask: ``int`` mask, e.g. ``order.skill_mask``
+        :return: ``frozenset`` of driver ids
+        """
+        driver_ids = self._cache.get(required_mask)
+        if driver_ids is None:
+            driver_ids = self._cache[required_mask] = frozenset(
+                driver_id
+                for driver_mask, ids in self._by_mask
+                if not required_mask & ~driver_mask
+                for driver_id in ids
+            )
+        return driver_ids
+
+    def drivers_with(self, skills):
+        """Same as :meth:`drivers_for`, with an iterable of skill names"""
+        return self.drivers_for(self.registry.mask(skills))
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""HTTP backends of :class:`optimo.base.CoreOptimoAPI`.
+
+A transport sends a single request and returns the server's raw response as
+a ``dict`` with its ``status_code``, ``headers`` and ``content``. The built-in
+ones are:
+
+* :class:`RequestsTransport`, the default: a :class:`requests.Session` per
+  thread.
+* :class:`Urllib3Transport`: a shared ``urllib3`` connection pool, without the
+  per-request overhead of ``requests`` (hooks, cookies, adapters).
+* :class:`HTTP2Transport`: a single HTTP/2 connection per host, that the
+  requests of every thread are multiplexed over. Requires ``hyper``.
+
+Each one imports its HTTP library on construction.
+
+Usage::
+
+  >>> from optimo import OptimoAPI
+  >>> from optimo.transports import Urllib3Transport
+  >>> optimo_api = OptimoAPI('https://api.optimoroute.com', 'myaccesskey',
+  ...                        transport=Urllib3Transport(maxsize=8))
+"""
+import abc
+import threading
+import urllib
+import urlparse
+import weakref
+
+from .errors import OptimoError
+
+
+def _body_bytes(data):
+    """Returns ``data`` (``str``, ``bytearray`` or ``memoryview``) as ``str``"""
+    if data is None or isinstance(data, str):
+        return data
+    return memoryview(data).tobytes()
+
+
+class BodyReader(object):
+    """Read-only, file-like view over an encoded request body.
+
+    ``httplib`` concatenates ``str`` bodies to the request headers before
+    sending them, i.e. it copies the whole body once more. Handing it a
+    file-like object instead makes it stream the body in blocks straight out
+    of the original buffer. ``requests`` sets the ``Content-Length`` from
+    ``len()`` and rewinds it through ``seek()``/``tell()`` on redirects.
+
+    :param body: ``str``, ``bytearray`` or ``memoryview`` of the body
+    """
+    def __init__(self, body):
+        self._view = memoryview(body)
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += len(self._view)
+        self._position = min(max(offset, 0), len(self._view))
+        return self._position
+
+    def read(self, size=-1):
+        start = self._position
+        if size is None or size < 0:
+            end = len(self._view)
+        else:
+            end = min(start + size, len(self._view))
+        self._position = end
+        return self._view[start:end].tobytes()
+
+
+class Transport(object):
+    """Base class of the transports. Subclasses implement :meth:`request`."""
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def request(self, url, method, params, data=None, headers=None):
+        """Sends a request.
+
+        :param url: the full url for the specific operation
+        :param method: the HTTP method ('GET' or 'POST')
+        :param params: ``dict`` of url parameters
+        :param data: (optional) the encoded body of a POST (``str``,
+                     ``bytearray`` or ``memoryview``)
+        :param headers: (optional) dictionary with any additional custom headers
+        :return: ``dict`` with the ``status_code``, ``headers`` and
+                 (non-processed) ``content`` of the server's response
+        """
+
+    def close(self):
+        """Closes the open connections"""
+
+
+class RequestsTransport(Transport):
+    """Sends the requests through ``requests``.
+
+    :param session: (optional) :class:`requests.Session` to send the requests
+        of every thread with. By default each thread gets a session of its
+        own, which keeps its connections open for its next requests.
+    """
+    def __init__(self, session=None):
+        self.session = session
+        self._local = threading.local()
+        # only referenced by their thread, so exited threads' sessions go away
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def get_session(self):
+        """Returns the :class:`requests.Session` of the current thread (or the
+        shared ``session``, if one was given).
+        """
+        if self.session is not None:
+            return self.session
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            # imported on first use, so that importing optimo (e.g. to only
+            # build and validate models) doesn't load the whole HTTP stack
+            import requests
+            session = self._local.session = requests.Session()
+            with self._lock:
+                self._sessions.add(session)
+        return session
+
+    def request(self, url, method, params, data=None, headers=None):
+        http = self.get_session()
+        if method == 'GET':
+            resp = http.get(url, params=params, headers=headers)
+        else:
+            # POST
+            if data is not None:
+                data = BodyReader(data)
+            resp = http.post(url, params=params, data=data, headers=headers)
+
+        return {
+            'status_code': resp.status_code,
+            'headers': resp.headers,
+            'content': resp.content
+        }
+
+    def close(self):
+        """Closes the sessions of every live thread. A shared ``session`` is
+        left to its owner.
+
+        The sessions can still be used afterwards: they open new connections.
+        """
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.close()
+
+
+class Urllib3Transport(Transport):
+    """Sends the requests through a ``urllib3`` pool manager, shared by every
+    thread.
+
+    :param pool_manager: (optional) ``urllib3.PoolManager`` to use. A new one
+        is created by default.
+    :param maxsize: (optional) ``int`` number of connections kept open per
+        host
+    :param timeout: (optional) ``float`` connect and read timeout in seconds
+    :param retries: (optional) ``urllib3.Retry``, ``int`` or ``False``.
+        Requests are not retried by default.
+    """
+    def __init__(self, pool_manager=None, maxsize=10, timeout=None, retries=False):
+        if pool_manager is None:
+            import urllib3
+            pool_manager = urllib3.PoolManager(maxsize=maxsize, timeout=timeout,
+                                               retries=retries)
+        self.pool_manager = pool_manager
+
+    def request(self, url, method, params, data=None, headers=None):
+        if params:
+            url = '{}?{}'.format(url, urllib.urlencode(params))
+        headers = dict(headers or {})
+        if data is not None:
+            # httplib copies str bodies into the headers' buffer; a
+            # memoryview with an explicit length is sent as is
+            data = memoryview(data)
+            headers['Content-Length'] = str(len(data))
+        resp = self.pool_manager.urlopen(method, url, body=data, headers=headers,
+                                         preload_content=True)
+        return {
+            'status_code': resp.status,
+            'headers': resp.headers,
+            'content': resp.data
+        }
+
+    def close(self):
+        self.pool_manager.clear()
+
+
+class HTTP2Transport(Transport):
+    """Sends the requests over a single HTTP/2 connection per host. Requests
+    of concurrent threads (e.g. many ``get_result`` polls) are sent as
+    separate streams of that connection, instead of each needing a
+    connection of its own.
+
+    Requires the ``hyper`` package.
+
+    :param timeout: (optional) ``float`` connect and read timeout in seconds
+    :raises OptimoError: if ``hyper`` isn't installed
+    """
+    def __init__(self, timeout=None):
+        try:
+            from hyper import HTTP20Connection
+        except ImportError:
+            raise OptimoError("HTTP2Transport requires the 'hyper' package")
+        self._connection_class = HTTP20Connection
+        self.timeout = timeout
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def get_connection(self, scheme, netloc):
+        """Returns the connection to a host, opening it on first use"""
+        key = (scheme, netloc)
+        connection = self._connections.get(key)
+        if connection is None:
+            with self._lock:
+                connection = self._connections.get(key)
+                if connection is None:
+                    connection = self._connections[key] = self._connection_class(
+                        netloc, secure=scheme == 'https', timeout=self.timeout)
+        return connection
+
+    def request(self, url, method, params, data=None, headers=None):
+        parts = urlparse.urlsplit(url)
+        path = parts.path or '/'
+        if params:
+            path = '{}?{}'.format(path, urllib.urlencode(params))
+        connection = self.get_connection(parts.scheme, parts.netloc)
+        stream_id = connection.request(method, path, body=_body_bytes(data),
+                                       headers=headers or {})
+        resp = connection.get_response(stream_id)
+        resp_headers = {}
+        for name, value in resp.headers.iter_raw():
+            if name in resp_headers:
+                value = resp_headers[name] + ', ' + value
+            resp_headers[name] = value
+        return {
+            'status_code': resp.status,
+            'headers': resp_headers,
+            'content': resp.read()
+        }
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for connection in connections.itervalues():
+            connection.close()
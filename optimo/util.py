@@ -1,25 +1,294 @@
 # -*- coding: utf-8 -*-
 import json
 import datetime
+import sys
+import threading
+import time
+import urlparse
 
+from collections import OrderedDict
 from decimal import Decimal
 
-from requests.packages.urllib3.util import parse_url
-
-from .models import BaseModel
+from .models import BaseModel, ServiceRegionPolygon
 from .errors import OptimoError
 
 
 DEFAULT_API_VERSION = 'v1'
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M'
+
+
+class LRUCache(object):
+    """Bounded, thread-safe mapping that evicts its least recently used
+    entries.
+
+    :param maxsize: ``int`` maximum number of entries to keep
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Returns the cached value of ``key`` (or ``default``) and marks it
+        as the most recently used one.
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Caches ``value`` under ``key``, evicting the least recently used
+        entry if the cache is full.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Removes ``key`` and returns its value (or ``default``)"""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """Returns a ``dict`` with the cache statistics"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': self.maxsize,
+            'currsize': len(self._data),
+        }
+
+
+class _Flight(object):
+    __slots__ = ('done', 'result', 'exc_info', 'finished')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.finished = None
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls for the same key into a single call, whose
+    result (or exception) is handed to every caller.
+
+    :param ttl: (optional) ``float`` number of seconds the result of a
+        successful call keeps being handed out to new callers. ``0`` only
+        shares it with the callers that arrived while it was in flight.
+    :param clock: (optional) function returning the current time in seconds
+    """
+    def __init__(self, ttl=0.0, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self.calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        for key, flight in self._flights.items():
+            if flight.finished is not None and now - flight.finished >= self.ttl:
+                del self._flights[key]
+
+    def do(self, key, func, *args, **kwargs):
+        """Returns ``func(*args, **kwargs)``, unless a call for ``key`` is in
+        flight or its result is still fresh, in which case that result is
+        returned instead.
+        """
+        with self._lock:
+            now = self.clock()
+            flight = self._flights.get(key)
+            if flight is not None and (flight.finished is None or now - flight.finished < self.ttl):
+                leader = False
+                self.coalesced += 1
+            else:
+                self._purge(now)
+                flight = self._flights[key] = _Flight()
+                leader = True
+                self.calls += 1
+
+        if leader:
+            try:
+                flight.result = func(*args, **kwargs)
+            except BaseException:
+                # KeyboardInterrupt, SystemExit, GreenletExit... must reach the
+                # followers too, or they would wait forever
+                flight.exc_info = sys.exc_info()
+            finally:
+                with self._lock:
+                    flight.finished = self.clock()
+                    if (flight.exc_info is not None or self.ttl <= 0) and \
+                            self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.exc_info is not None:
+            raise flight.exc_info[0], flight.exc_info[1], flight.exc_info[2]
+        return flight.result
+
+    def forget(self, key):
+        """Drops the shared result of ``key``, if any"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.finished is not None:
+                del self._flights[key]
+
+    def info(self):
+        """Returns a ``dict`` with the coalescing statistics"""
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'ttl': self.ttl,
+        }
+
+
+class DatetimeFormatter(object):
+    """Memoizing ``datetime.datetime`` formatter.
+
+    A plan only has a few hundred distinct datetimes (there are 1440 minutes
+    in a day), so ``strftime`` is only called for the first occurrence of each.
+    The formatted strings are kept in a plain ``dict``, without a lock: a
+    lookup is much cheaper than ``strftime``, and two threads formatting the
+    same datetime at once just both store the same string.
+
+    :param maxsize: (optional) ``int`` maximum number of cached datetimes. The
+        cache is emptied when it's full.
+    :param timezone: (optional) timezone name or ``tzinfo`` object. Timezone
+        aware datetimes are converted to it before being formatted, while
+        naive ones are assumed to already be in it. When ``None``, aware
+        datetimes are formatted in their own timezone.
+    :param fmt: (optional) ``strftime`` format
+    """
+    def __init__(self, maxsize=4096, timezone=None, fmt=DATETIME_FORMAT):
+        if isinstance(timezone, basestring):
+            import pytz
+            timezone = pytz.timezone(timezone)
+        self.timezone = timezone
+        self.fmt = fmt
+        self.maxsize = maxsize
+        self.cache = {}
+
+    def normalize(self, dt):
+        """Converts a timezone aware ``dt`` to the formatter's timezone"""
+        if self.timezone is not None and dt.tzinfo is not None:
+            dt = dt.astimezone(self.timezone)
+            if hasattr(self.timezone, 'normalize'):
+                # pytz timezone
+                dt = self.timezone.normalize(dt)
+        return dt
+
+    def format(self, dt):
+        """Formats ``dt``, using the cached string if possible.
+
+        :param dt: ``datetime.datetime`` instance
+        :return: ``str`` of the formatted datetime
+        """
+        # aware datetimes compare equal across timezones, but print differently
+        key = dt if dt.tzinfo is None else (dt, dt.tzinfo)
+        formatted = self.cache.get(key)
+        if formatted is None:
+            formatted = self.normalize(dt).strftime(self.fmt)
+            if len(self.cache) >= self.maxsize:
+                self.cache.clear()
+            self.cache[key] = formatted
+        return formatted
+
+
+#: shared by all encoders, unless they are given their own formatter
+DATETIME_FORMATTER = DatetimeFormatter()
+
+
+class DatetimeParser(dict):
+    """Memoizing parser of :data:`DATETIME_FORMAT` strings, e.g. the
+    ``scheduledAt`` times of a result, which only has a few hundred distinct
+    ones.
+
+    Usage::
+
+      >>> parse_time = DatetimeParser()
+      >>> parse_time['2014-12-05T08:00']
+      datetime.datetime(2014, 12, 5, 8, 0)
+    """
+    def __missing__(self, value):
+        parsed = self[value] = datetime.datetime.strptime(value, DATETIME_FORMAT)
+        return parsed
+
+
+def unwrap_result(response):
+    """Returns the result of an optimization out of the whole response of
+    :meth:`optimo.OptimoAPI.get`, or ``response`` itself if it already is
+    one.
+
+    :param response: ``dict`` of the response, or of its ``'result'``
+    :return: ``dict`` of the result, empty if there is none yet
+    """
+    if 'result' in response:
+        return response['result'] or {}
+    return response
+
+
+def quantize_coordinate(value, precision):
+    """Rounds a latitude/longitude to a fixed number of decimal places.
+
+    Goes through ``float`` once, which is much cheaper than
+    ``Decimal.quantize()``, and the rounded float is printed by ``json``
+    with no more digits than ``precision``.
+
+    :param value: ``numbers.Number`` coordinate
+    :param precision: ``int`` number of decimal places to keep
+    :return: ``float`` of the rounded coordinate
+    """
+    return round(float(value), precision)
 
 
 class CoreOptimoEncoder(json.JSONEncoder):
     """Custom JSON encoder that knows how to serialize ``datetime.datetime``
     and ``decimal.Decimal`` objects.
+
+    :param coordinate_precision: (optional) ``int`` number of decimal places
+        the model coordinates are rounded to. Overrides the class attribute of
+        the same name; ``None`` keeps them at full precision.
+        6 decimal places are accurate to ~0.1m.
+    :param datetime_formatter: (optional) :class:`DatetimeFormatter` object.
+        Overrides the class attribute of the same name.
     """
+    coordinate_precision = None
+    datetime_formatter = DATETIME_FORMATTER
+
+    def __init__(self, *args, **kwargs):
+        coordinate_precision = kwargs.pop('coordinate_precision', self.coordinate_precision)
+        datetime_formatter = kwargs.pop('datetime_formatter', self.datetime_formatter)
+        super(CoreOptimoEncoder, self).__init__(*args, **kwargs)
+        self.coordinate_precision = coordinate_precision
+        self.datetime_formatter = datetime_formatter
+
     def default(self, o):
         if isinstance(o, datetime.datetime):
-            return o.strftime('%Y-%m-%dT%H:%M')
+            return self.datetime_formatter.format(o)
         if isinstance(o, Decimal):
             return float(o)
 
@@ -27,12 +296,89 @@ class CoreOptimoEncoder(json.JSONEncoder):
 class OptimoEncoder(CoreOptimoEncoder):
     """Custom JSON encoder that knows how to serialize
     :class:`optimo.models.BaseModel <BaseModel>` objects.
+
+    :param validate_models: (optional) ``bool``, whether each model is
+        validated while it's being serialized. Overrides the class attribute of
+        the same name. Only disable it for models that have already been
+        validated.
+
+    Usage::
+
+      >>> json.dumps(route_plan, cls=OptimoEncoder, coordinate_precision=6)
     """
+    validate_models = True
+
+    def __init__(self, *args, **kwargs):
+        validate_models = kwargs.pop('validate_models', self.validate_models)
+        super(OptimoEncoder, self).__init__(*args, **kwargs)
+        self.validate_models = validate_models
+
     def default(self, o):
         if isinstance(o, BaseModel):
-            return o.as_optimo_schema()
+            schema = o.as_optimo_schema(validate=self.validate_models)
+            if self.coordinate_precision is not None:
+                schema = self.quantize_coordinates(o, schema)
+            return schema
         return super(OptimoEncoder, self).default(o)
 
+    def quantize_coordinates(self, model, schema):
+        """Rounds the coordinates of a model's schema to
+        ``coordinate_precision`` decimal places.
+
+        :param model: the :class:`optimo.models.BaseModel <BaseModel>` object
+        :param schema: the result of ``model.as_optimo_schema()``
+        :return: the schema with its coordinates rounded
+        """
+        precision = self.coordinate_precision
+        if isinstance(model, ServiceRegionPolygon):
+            # the schema is the model's own list, so don't modify it in place
+            return [
+                [quantize_coordinate(lat, precision), quantize_coordinate(lng, precision)]
+                for lat, lng in schema
+            ]
+        for key in model.COORDINATE_KEYS:
+            if key in schema:
+                schema[key] = quantize_coordinate(schema[key], precision)
+        return schema
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Validates a url and returns its normalized form: lower case scheme and
+    host, without the scheme's default port.
+
+    :param url: ``str`` url we want to normalize
+    :return: ``str`` normalized url
+    :raises OptimoError: When we can't deduce a valid protocol scheme, or the
+                         port is not valid
+    """
+    parts = urlparse.urlsplit(url)
+    if not parts.scheme:
+        raise OptimoError("The url: '{}' does not define a protocol scheme"
+                          .format(url))
+    scheme = parts.scheme.lower()
+    userinfo, at, hostport = parts.netloc.rpartition('@')
+    port = None
+    if ':' in hostport.rpartition(']')[2]:
+        # not the colons of an IPv6 address
+        port = hostport.rpartition(':')[2] or None
+        if port is not None:
+            if not port.isdigit() or int(port) > 65535:
+                raise OptimoError("The url: '{}' does not define a valid port"
+                                  .format(url))
+            port = int(port)
+
+    host = parts.hostname or ''
+    if ':' in host:
+        # IPv6
+        host = '[{}]'.format(host)
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = '{}:{}'.format(host, port)
+    return urlparse.urlunsplit((scheme, userinfo + at + host, parts.path,
+                                parts.query, parts.fragment))
+
 
 def validate_url(url):
     """Asserts that the url string has a valid protocol scheme.
@@ -40,8 +386,7 @@ def validate_url(url):
     :param url: ``str`` url we want to validate
     :raises OptimoError: When we can't deduce a valid protocol scheme
     """
-    _url = parse_url(url)
-    if not _url.scheme:
+    if not urlparse.urlsplit(url).scheme:
         raise OptimoError("The url: '{}' does not define a protocol scheme"
                           .format(url))
 
@@ -53,13 +398,17 @@ def validate_config_params(optimo_url, version, access_key):
     :param optimo_url: string url of the optimoroute's service
     :param version: ``int`` or ``str`` denoting the API version
     :param access_key: string access key provided by optimoroute
-    :return: ``tuple`` of the, possibly adjusted, passed parameters.
+    :return: ``tuple`` of the, possibly adjusted, passed parameters. The url
+             is normalized (see :func:`normalize_url`) and loses its trailing
+             slashes, e.g. ``'HTTPS://Api.Example.com:443/'`` becomes
+             ``'https://api.example.com'``.
     :raises OptimoError: On providing incomplete or invalid config data
     """
     if not optimo_url or not isinstance(optimo_url, basestring):
         raise OptimoError("'optimo_url' must be a url string")
 
-    validate_url(optimo_url)
+    # the version and the endpoint are appended to it
+    optimo_url = normalize_url(optimo_url).rstrip('/')
 
     if not version or not isinstance(version, basestring) or not \
             version.startswith('v'):
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Validation of a whole :class:`optimo.models.RoutePlan` graph in one pass.
+
+Instead of raising on the first problem like
+:meth:`optimo.models.RoutePlan.validate` does, :func:`validate_route_plan`
+walks every model of the plan and collects all of the problems, each with the
+path of the offending model/attribute (e.g.
+``orders[1234].time_window.start_time``).
+
+Given the :class:`optimo.compiler.CompiledValidators` of an API version, the
+models are checked against that version's JSON schema instead of their own
+``validate()`` methods.
+"""
+import math
+import random
+import re
+
+from .errors import OptimoError, OptimoValidationError
+from .models import (
+    ITERABLES,
+    Break,
+    Driver,
+    OptimizationParameters,
+    Order,
+    SchedulingInfo,
+    ServiceRegionPolygon,
+    TimeWindow,
+    WorkShift,
+)
+
+
+# model error messages start with the "'ClassName.attribute'" they refer to
+_ATTRIBUTE_RE = re.compile(r"^'\w+\.(\w+)")
+
+_ITEM_ERRORS = ("'RoutePlan.orders[]'", "'RoutePlan.drivers[]'")
+
+
+class ValidationIssue(object):
+    """A single validation problem.
+
+    :param path: ``str`` path of the offending model or attribute, relative
+        to the route plan
+    :param error: the ``TypeError``, ``ValueError`` or
+        :class:`optimo.errors.OptimoError` raised for it
+    """
+    def __init__(self, path, error):
+        self.path = path
+        self.error = error
+
+    @property
+    def message(self):
+        return '{}: {}'.format(self.path or '<root>', self.error)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, self.message)
+
+
+class ValidationReport(object):
+    """The outcome of :func:`validate_route_plan`.
+
+    :param issues: ``list`` of :class:`ValidationIssue` objects
+    :param validated: ``int`` number of models that were validated
+    """
+    def __init__(self, issues=None, validated=0):
+        self.issues = issues if issues is not None else []
+        self.validated = validated
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __iter__(self):
+        return iter(self.issues)
+
+    @property
+    def is_valid(self):
+        return not self.issues
+
+    def raise_for_errors(self):
+        """Raises an :class:`optimo.errors.OptimoValidationError` listing all
+        of the issues, if there are any.
+        """
+        if self.issues:
+            messages = [issue.message for issue in self.issues]
+            raise OptimoValidationError('; '.join(messages), errors=messages)
+
+
+class _FailFast(Exception):
+    """Stops the walk at the first issue"""
+
+
+def _join(path, name):
+    return '{}.{}'.format(path, name) if path else name
+
+
+class _Walker(object):
+    def __init__(self, fail_fast, sample, seed, validators=None):
+        self.report = ValidationReport()
+        self.fail_fast = fail_fast
+        self.sample = sample
+        self.random = random.Random(seed)
+        self.validators = validators
+        self.compiled_checks = validators.checks if validators is not None else {}
+
+    def add(self, path, error):
+        match = _ATTRIBUTE_RE.match(str(error))
+        if match:
+            path = _join(path, match.group(1))
+        self.report.issues.append(ValidationIssue(path, error))
+        if self.fail_fast:
+            raise _FailFast()
+
+    def check(self, path, model, expected, *args):
+        """Validates a single model, returning whether it's valid"""
+        if not isinstance(model, expected):
+            self.add(path, TypeError(
+                "'{}' must be of type {}, not {!r}".format(path, expected.__name__, type(model))
+            ))
+            return False
+        self.report.validated += 1
+        if self.validators is not None:
+            compiled_check = self.compiled_checks.get(type(model))
+            errors = compiled_check(model) if compiled_check else self.validators.errors(model)
+            if errors:
+                for error in errors:
+                    self.add(path, ValueError(error))
+                return False
+            return True
+        try:
+            model.validate(*args)
+        except (TypeError, ValueError, OptimoError) as e:
+            self.add(path, e)
+            return False
+        return True
+
+    def indexes(self, items):
+        """Returns the (sampled) indexes of ``items`` that must be validated"""
+        if self.sample >= 1.0 or len(items) < 2:
+            return range(len(items))
+        k = max(1, int(math.ceil(len(items) * self.sample)))
+        return sorted(self.random.sample(xrange(len(items)), k))
+
+    def items(self, model, attr, min_items=0):
+        """Returns the ``(index, item)`` pairs of a list attribute to walk"""
+        items = getattr(model, attr)
+        if self.validators is not None:
+            # the compiled checks of the model have reported bad lists already
+            if not isinstance(items, ITERABLES):
+                return []
+        elif not isinstance(items, ITERABLES):
+            self.add('', TypeError("'{}.{}' must be of type {!r}, not {!r}".format(
+                model.__class__.__name__, attr, ITERABLES, type(items))))
+            return []
+        elif len(items) < min_items:
+            self.add('', ValueError("'{}.{}' must have at least {} element".format(
+                model.__class__.__name__, attr, min_items)))
+        return [(idx, items[idx]) for idx in self.indexes(items)]
+
+    def walk_order(self, path, order, driver_ids):
+        if not self.check(path, order, Order):
+            return
+        if order.time_window is not None:
+            self.check(_join(path, 'time_window'), order.time_window, TimeWindow)
+        if order.scheduling_info is not None:
+            si_path = _join(path, 'scheduling_info')
+            if self.check(si_path, order.scheduling_info, SchedulingInfo):
+                driver_id = order.scheduling_info.as_optimo_schema(validate=False)['scheduledDriver']
+                if driver_id not in driver_ids:
+                    self.add(_join(si_path, 'scheduled_driver'), OptimoValidationError(
+                        "SchedulingInfo defines driver with id: '{}' that is "
+                        "not present in 'drivers' list".format(driver_id)
+                    ))
+        if order.assigned_to:
+            driver_id = order.as_optimo_schema(validate=False)['assignedTo']
+            if driver_id not in driver_ids:
+                self.add(_join(path, 'assigned_to'), OptimoValidationError(
+                    "The order with id: '{}' is assigned to driver with id:"
+                    " '{}' that is not present in 'drivers' list"
+                    .format(order.id, driver_id)
+                ))
+
+    def walk_driver(self, path, drv):
+        if not self.check(path, drv, Driver):
+            return
+        for idx, ws in enumerate(drv.work_shifts):
+            ws_path = '{}.work_shifts[{}]'.format(path, idx)
+            if not self.check(ws_path, ws, WorkShift):
+                continue
+            if ws.break_ is not None:
+                self.check(_join(ws_path, 'break_'), ws.break_, Break)
+            for tw_idx, tw in enumerate(ws.unavailable_times):
+                self.check('{}.unavailable_times[{}]'.format(ws_path, tw_idx), tw, TimeWindow)
+        for idx, region in enumerate(drv.service_regions):
+            self.check('{}.service_regions[{}]'.format(path, idx), region, ServiceRegionPolygon)
+
+    def walk(self, route_plan):
+        if self.validators is not None:
+            for error in self.validators.errors(route_plan):
+                # the type of every order and driver is checked while walking them
+                if not error.startswith(_ITEM_ERRORS):
+                    self.add('', ValueError(error))
+        else:
+            try:
+                route_plan.validate_settings()
+            except (TypeError, ValueError, OptimoError) as e:
+                self.add('', e)
+        if isinstance(route_plan.optimization_parameters, OptimizationParameters):
+            self.check('optimization_parameters', route_plan.optimization_parameters,
+                       OptimizationParameters)
+
+        drivers = self.items(route_plan, 'drivers', min_items=1)
+        all_drivers = route_plan.drivers if isinstance(route_plan.drivers, ITERABLES) else []
+        driver_ids = set(getattr(drv, 'id', None) for drv in all_drivers)
+
+        for idx, order in self.items(route_plan, 'orders', min_items=1):
+            self.walk_order('orders[{}]'.format(idx), order, driver_ids)
+        for idx, drv in drivers:
+            self.walk_driver('drivers[{}]'.format(idx), drv)
+
+
+def validate_route_plan(route_plan, fail_fast=False, sample=1.0, seed=None,
+                        validators=None):
+    """Validates a whole route plan, collecting every problem.
+
+    :param route_plan: :class:`optimo.models.RoutePlan` object
+    :param fail_fast: (optional) ``bool``, stop at the first problem
+    :param sample: (optional) ``float`` in ``(0, 1]``, the fraction of the
+        orders and the drivers that will be validated. Only sample
+        homogeneous records that come from a trusted source.
+    :param seed: (optional) seed of the random generator that picks the
+        sampled records
+    :param validators: (optional) :class:`optimo.compiler.CompiledValidators`
+        to check the models with. They only check what the JSON schema
+        expresses, e.g. not that a time window ends after it starts.
+    :return: :class:`ValidationReport` object
+    """
+    if not 0.0 < sample <= 1.0:
+        raise ValueError("'sample' must be in the range '(0.0 - 1.0]'")
+    walker = _Walker(fail_fast, sample, seed, validators)
+    try:
+        walker.walk(route_plan)
+    except _FailFast:
+        pass
+    return walker.report
@@ -17,10 +17,17 @@ setup(
         "requests",
         "pytz",
     ],
+    extras_require={
+        "numpy": ["numpy"],
+        "simplejson": ["simplejson"],
+        "http2": ["hyper"],
+    },
     tests_require=[
         "pytest",
         "jsonschema==2.4.0",
         "pytest-cov",
+        "simplejson",
+        "numpy",
     ],
     author="George Spanos",
     author_email="spanosgeorge@gmail.com",
@@ -28,6 +35,7 @@ setup(
     license="BSD",
     url="https://github.com/fieldaware/optimoroute",
     packages=packages,
+    package_data={'optimo': ['schema/*/*.json']},
     long_description=readme,
     classifiers=[
         'Development Status :: 4 - Beta',
@@ -16,11 +16,14 @@ def mock_requests(monkeypatch):
     to arbitrary successful or unsuccessful, raw optimoroute responses.
     """
     def request(self, method, url, **kwargs):
-        if method == 'get':
+        if method.lower() == 'get':
             request_id = kwargs['params']['requestId']
         else:
             # post
-            request_id = json.loads(kwargs['data'])['requestId']
+            data = kwargs['data']
+            if hasattr(data, 'read'):
+                data = data.read()
+            request_id = json.loads(data)['requestId']
 
         raw_response = REQUEST_ID_TO_RESPONSE[request_id]
         return MockedResponse(
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from optimo import (
+    WorkShift,
+    Driver,
+    Order,
+    RoutePlan,
+    Break,
+    SchedulingInfo,
+    TimeWindow,
+    ServiceRegionPolygon,
+    OptimizationParameters,
+    OptimoAPI,
+)
+from optimo.compiler import CompiledValidators, get_validators, load_schema
+from optimo.errors import OptimoError, OptimoValidationError
+from optimo.util import OptimoEncoder
+
+from tests.schema.v1 import (
+    DriverValidator,
+    OrderValidator,
+    OptimizationParametersValidator,
+    RoutePlanValidator,
+    ServiceRegionPolygonValidator,
+    WorkShiftValidator,
+)
+
+
+dtime = datetime(year=2014, month=12, day=5, hour=8, minute=0)
+dictify = lambda o: json.loads(json.dumps(o, cls=OptimoEncoder, validate_models=False))
+
+
+@pytest.fixture
+def validators():
+    return get_validators('v1')
+
+
+def make_order(**kwargs):
+    params = dict(id='1', lat=53.34, lng=-6.26, duration=20,
+                  time_window=TimeWindow(dtime, dtime), skills=['lift'])
+    params.update(kwargs)
+    return Order(**params)
+
+
+def make_driver(**kwargs):
+    params = dict(id='drv1', start_lat=53.35, start_lng=-6.27, end_lat=53.34,
+                  end_lng=-6.26, work_shifts=[WorkShift(dtime, dtime)],
+                  cost_per_km=Decimal('0.5'))
+    params.update(kwargs)
+    return Driver(**params)
+
+
+def test_unknown_version():
+    with pytest.raises(OptimoError):
+        get_validators('v0')
+
+
+def test_validators_are_cached(validators):
+    assert get_validators('v1') is validators
+    api = OptimoAPI('https://api.optimoroute.com', 'somekey')
+    assert api.validators is validators
+
+
+def test_valid_models(validators):
+    assert validators.errors(make_order()) == []
+    assert validators.errors(make_driver()) == []
+    assert validators.errors(TimeWindow(dtime, dtime)) == []
+    assert validators.errors(Break(dtime, dtime, 10)) == []
+    assert validators.errors(SchedulingInfo(dtime, make_driver(), locked=True)) == []
+    assert validators.errors(ServiceRegionPolygon([(0, 0), (0, 1), (1, 1)])) == []
+    assert validators.errors(OptimizationParameters(balancing='ON', balancing_factor=0.5)) == []
+
+
+def test_reports_every_error(validators):
+    order = make_order(lat=100, duration=-1, priority='X', skills=['lift', 3])
+    assert validators.errors(order) == [
+        "'Order.duration' must be >= 0",
+        "'Order.lat' must be <= 90",
+        "'Order.priority' must be one of: L, M, H, C",
+        "'Order.skills[]' must be a string",
+    ]
+    order = make_order(lat=True, time_window='noon')
+    assert validators.errors(order) == [
+        "'Order.lat' must be a number",
+        "'Order.time_window' must be of type TimeWindow",
+    ]
+    assert validators.errors(TimeWindow('noon', None)) == [
+        "'TimeWindow.start_time' must be a datetime",
+        "'TimeWindow.end_time' is required",
+    ]
+    region = ServiceRegionPolygon([(0, 0), (0, 1, 2), (1, 'a')])
+    assert validators.errors(region) == [
+        "'ServiceRegionPolygon.lat_lng_pairs[]' must have at most 2 elements",
+    ]
+
+
+def test_decimal_ranges(validators):
+    # checked exactly, without going through floats when possible
+    for lat in ('0', '9.99', '-53.35', '89.999', '90', '-90', '90.0', '0.9E+2'):
+        assert validators.errors(make_order(lat=Decimal(lat))) == [], lat
+    for lat in ('90.0001', '-90.5', '1E+3', '-Infinity', 'Infinity'):
+        assert validators.errors(make_order(lat=Decimal(lat))) != [], lat
+    assert validators.errors(make_order(lng=Decimal('-180'))) == []
+    assert validators.errors(make_order(lng=Decimal('180.5'))) == ["'Order.lng' must be <= 180"]
+
+
+def test_rules_outside_of_the_schema(validators):
+    # the models don't accept them either
+    assert validators.errors(make_order(id='')) == ["'Order.id' cannot be empty"]
+    assert validators.errors(make_driver(id='')) == ["'Driver.id' cannot be empty"]
+    routeplan = RoutePlan('', 'callback.com', 'https://status.callback.com',
+                          orders=[make_order()], drivers=[make_driver()])
+    assert validators.errors(routeplan) == [
+        "The url: 'callback.com' does not define a protocol scheme",
+        "'RoutePlan.request_id' cannot be empty",
+    ]
+    region = ServiceRegionPolygon([(0, 0), (0, 1), (1, 200)])
+    assert validators.errors(region) == ["Longitude can take values between -180 and +180"]
+
+
+@pytest.mark.parametrize('model, errors', [
+    (make_driver(work_shifts=[]), ["'Driver.work_shifts' must have at least 1 elements"]),
+    (make_order(id=u'1'), ["'Order.id' must be a str"]),
+    (make_order(priority=None), ["'Order.priority' must be one of: L, M, H, C"]),
+    (RoutePlan('1234', 'https://callback.com/1234', None,
+               orders=[make_order()], drivers=[make_driver()]),
+     ["'RoutePlan.status_callback_url' must be a string"]),
+    (OptimizationParameters(balancing_factor=1),
+     ["'OptimizationParameters.balancing_factor' must be a float or a Decimal"]),
+    (SchedulingInfo(dtime, 'drv1', locked=None), ["'SchedulingInfo.locked' must be a boolean"]),
+])
+def test_rejects_what_the_models_reject(validators, model, errors):
+    assert validators.errors(model) == errors
+    with pytest.raises((TypeError, ValueError)):
+        model.validate()
+
+
+def test_validate(validators):
+    with pytest.raises(OptimoValidationError) as excinfo:
+        validators.validate(make_driver(start_lat=-91, speed_factor='fast'))
+    assert excinfo.value.errors == [
+        "'Driver.speed_factor' must be a number",
+        "'Driver.start_lat' must be >= -90",
+    ]
+    with pytest.raises(TypeError):
+        validators.errors(object())
+
+
+@pytest.mark.parametrize('model, schema_validator', [
+    (make_order(), OrderValidator),
+    (make_order(lat=-90.5), OrderValidator),
+    (make_order(lng=180.5), OrderValidator),
+    (make_order(lat=Decimal('53.35'), lng=Decimal('-6.26')), OrderValidator),
+    (make_order(lat=Decimal('-90'), lng=Decimal('180')), OrderValidator),
+    (make_order(lat=Decimal('-90.0001')), OrderValidator),
+    (make_order(lat=Decimal('89.99999'), lng=Decimal('99.5')), OrderValidator),
+    (make_order(lng=Decimal('180.01')), OrderValidator),
+    (make_order(lng=Decimal('-1E+3')), OrderValidator),
+    (make_order(duration=-1), OrderValidator),
+    (make_order(duration=1.5), OrderValidator),
+    (make_order(priority='X'), OrderValidator),
+    (make_order(skills=[1]), OrderValidator),
+    (make_driver(), DriverValidator),
+    (make_driver(end_lat=95), DriverValidator),
+    (make_driver(speed_factor='fast'), DriverValidator),
+    (make_driver(cost_per_km=-1), DriverValidator),
+    (WorkShift(dtime, dtime, allowed_overtime=10), WorkShiftValidator),
+    (WorkShift(dtime, dtime, allowed_overtime=1.5), WorkShiftValidator),
+    (ServiceRegionPolygon([(0, 0), (0, 1), (1, 1)]), ServiceRegionPolygonValidator),
+    (ServiceRegionPolygon([(0, 0), (0, 1)]), ServiceRegionPolygonValidator),
+    (ServiceRegionPolygon([(0, 0), (0, 1), (1,)]), ServiceRegionPolygonValidator),
+    (OptimizationParameters(balancing_factor=1.5), OptimizationParametersValidator),
+    (OptimizationParameters(balance_by='X'), OptimizationParametersValidator),
+])
+def test_in_lockstep_with_the_schema(validators, model, schema_validator):
+    schema_errors = list(schema_validator.iter_errors(dictify(model)))
+    assert bool(validators.errors(model)) == bool(schema_errors)
+
+
+def test_route_plan_limits(validators):
+    drivers = [make_driver(id=str(i)) for i in range(251)]
+    routeplan = RoutePlan('1234', 'https://callback.com/1234', 'https://status.callback.com/1234',
+                          orders=[make_order()], drivers=drivers)
+    assert validators.errors(routeplan) == ["'RoutePlan.drivers' must have at most 250 elements"]
+    assert not RoutePlanValidator.is_valid(dictify(routeplan))
+
+
+def test_custom_schema():
+    schema = load_schema('v1')
+    schema['properties']['orders']['items']['properties']['duration']['maximum'] = 60
+    validators = CompiledValidators('v1-custom', schema)
+    assert validators.errors(make_order(duration=90)) == ["'Order.duration' must be <= 60"]
+
+
+def test_validate_route_plan(validators):
+    orders = [make_order(id=str(i)) for i in range(10)]
+    orders[3].lat = 91
+    orders[5] = 'not an order'
+    orders[7].time_window = TimeWindow(dtime, 'noon')
+    routeplan = RoutePlan('1234', 'https://callback.com/1234', 'https://status.callback.com/1234',
+                          orders=orders, drivers=[make_driver()])
+    api = OptimoAPI('https://api.optimoroute.com', 'somekey')
+    report = api.validate(routeplan)
+    assert [issue.path for issue in report] == [
+        'orders[3].lat',
+        'orders[5]',
+        'orders[7].time_window.end_time',
+    ]
+    # optimization parameters, orders, time windows of the valid orders, driver, work shift
+    assert report.validated == 1 + 9 + 8 + 2
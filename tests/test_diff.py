@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from optimo.diff import Reassignment, RouteChange, TimeShift, diff_results
+
+
+def make_result(routes, unserved=()):
+    return {
+        'success': True,
+        'requestId': '1234',
+        'result': {
+            'routes': [
+                {'driverId': driver_id,
+                 'orders': [{'id': order_id, 'scheduledAt': scheduled_at}
+                            for order_id, scheduled_at in orders]}
+                for driver_id, orders in routes
+            ],
+            'unservedOrders': list(unserved),
+        },
+    }
+
+
+OLD = make_result([
+    ('drv1', [('1', '2014-12-05T08:00'), ('2', '2014-12-05T09:00'), ('3', '2014-12-05T10:00')]),
+    ('drv2', [('4', '2014-12-05T08:00'), ('5', '2014-12-05T09:00')]),
+], unserved=['6'])
+
+
+def test_no_changes():
+    diff = diff_results(OLD, OLD)
+    assert not diff
+    assert diff.changed_drivers == set()
+
+
+def test_changes():
+    new = make_result([
+        ('drv1', [('1', '2014-12-05T08:03'), ('3', '2014-12-05T08:30'), ('5', '2014-12-05T09:30')]),
+        ('drv2', [('4', '2014-12-05T08:00'), ('6', '2014-12-05T09:00')]),
+    ], unserved=['2', '7'])
+
+    diff = diff_results(OLD, new, threshold=5)
+    assert diff
+    assert diff.reassigned == [Reassignment('5', 'drv2', 'drv1')]
+    assert diff.time_shifts == [
+        TimeShift('3', 'drv1', datetime.datetime(2014, 12, 5, 10, 0),
+                  datetime.datetime(2014, 12, 5, 8, 30), -90),
+    ]
+    assert diff.newly_unserved == ['2', '7']
+    assert diff.newly_served == ['6']
+    assert diff.route_changes == [
+        RouteChange('drv1', ('1', '2', '3'), ('1', '3', '5')),
+        RouteChange('drv2', ('4', '5'), ('4', '6')),
+    ]
+    assert diff.changed_drivers == set(['drv1', 'drv2'])
+
+    # every time shift is reported without a threshold
+    assert [shift.order_id for shift in diff_results(OLD, new).time_shifts] == ['1', '3']
+
+
+def test_removed_driver_and_bare_results():
+    new = make_result([
+        ('drv1', [('1', '2014-12-05T08:00'), ('2', '2014-12-05T09:00'), ('3', '2014-12-05T10:00')]),
+    ], unserved=['4', '5', '6'])
+    diff = diff_results(OLD['result'], new['result'])
+    assert diff.newly_unserved == ['4', '5']
+    assert diff.route_changes == [RouteChange('drv2', ('4', '5'), ())]
+    assert diff.changed_drivers == set(['drv2'])
+    assert diff.reassigned == diff.time_shifts == diff.newly_served == []
@@ -13,3 +13,68 @@ def test_coreoptimoencoder():
     d = {'datetime': dt, 'a_decimal': dec, 'integer': 5}
     assert json.dumps(d, cls=CoreOptimoEncoder) == \
         '{"a_decimal": 4.5, "integer": 5, "datetime": "2014-12-05T08:00"}'
+
+
+def test_coordinate_precision():
+    from optimo import Order, Driver, WorkShift, ServiceRegionPolygon
+    from optimo.util import OptimoEncoder
+
+    order = Order('1', Decimal('53.34320412345'), 53.343204999999, 20)
+    assert json.loads(json.dumps(order, cls=OptimoEncoder, coordinate_precision=6)) == {
+        'id': '1', 'lat': 53.343204, 'lon': 53.343205, 'duration': 20, 'priority': 'M',
+    }
+    # full precision by default
+    assert json.loads(json.dumps(order, cls=OptimoEncoder))['lon'] == 53.343204999999
+
+    class ShortEncoder(OptimoEncoder):
+        coordinate_precision = 3
+
+    polygon = ServiceRegionPolygon([[1.23456, 2.34567], [3, 4], [Decimal('5.6789'), 6]])
+    assert json.dumps(polygon, cls=ShortEncoder) == \
+        '[[1.235, 2.346], [3.0, 4.0], [5.679, 6.0]]'
+    # the model itself is left untouched
+    assert polygon.lat_lng_pairs[0] == [1.23456, 2.34567]
+
+    dt = datetime.datetime(year=2014, month=12, day=5, hour=8, minute=0)
+    drv = Driver('1', 1.00000049, Decimal('-2.1234567'), 3, 4.5,
+                 work_shifts=[WorkShift(dt, dt)], service_regions=[polygon])
+    d = json.loads(json.dumps(drv, cls=ShortEncoder))
+    assert (d['startLat'], d['startLon'], d['endLat'], d['endLon']) == (1.0, -2.123, 3.0, 4.5)
+    assert d['serviceRegions'] == [[[1.235, 2.346], [3.0, 4.0], [5.679, 6.0]]]
+
+
+def test_datetime_formatter():
+    import pytz
+    from optimo.util import DatetimeFormatter, LRUCache
+
+    formatter = DatetimeFormatter(maxsize=2)
+    dt = datetime.datetime(year=2014, month=12, day=5, hour=8, minute=0)
+    assert formatter.format(dt) == '2014-12-05T08:00'
+    assert formatter.format(dt) == '2014-12-05T08:00'
+    assert formatter.cache == {dt: '2014-12-05T08:00'}
+
+    # aware datetimes of the same instant are formatted in their own timezone
+    utc_dt = pytz.utc.localize(dt)
+    tokyo_dt = utc_dt.astimezone(pytz.timezone('Asia/Tokyo'))
+    assert utc_dt == tokyo_dt
+    assert formatter.format(utc_dt) == '2014-12-05T08:00'
+    assert formatter.format(tokyo_dt) == '2014-12-05T17:00'
+    # bounded
+    assert len(formatter.cache) <= 2
+
+    formatter = DatetimeFormatter(timezone='America/New_York')
+    assert formatter.format(utc_dt) == '2014-12-05T03:00'
+    assert formatter.format(tokyo_dt) == '2014-12-05T03:00'
+    assert formatter.format(dt) == '2014-12-05T08:00'
+
+    d = {'datetime': utc_dt}
+    assert json.dumps(d, cls=CoreOptimoEncoder, datetime_formatter=formatter) == \
+        '{"datetime": "2014-12-05T03:00"}'
+
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
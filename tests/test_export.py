@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import calendar
+import datetime
+import io
+import sys
+
+import pytest
+
+from optimo import OptimoError
+from optimo.export import COLUMNS, iter_rows, to_csv, to_numpy
+
+
+def epoch_minutes(value):
+    dt = datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M')
+    return calendar.timegm(dt.timetuple()) // 60
+
+
+RESULT = {
+    'success': True,
+    'requestId': '1234',
+    'result': {
+        'routes': [
+            {'driverId': 'drv1', 'orders': [{'id': '1', 'scheduledAt': '2014-12-05T08:00'},
+                                            {'id': '2', 'scheduledAt': '2014-12-05T09:30'}]},
+            {'driverId': u'drv-é', 'orders': [{'id': '3', 'scheduledAt': '2016-02-29T23:59'}]},
+            {'driverId': 'drv3', 'orders': []},
+        ],
+        'unservedOrders': ['4', {'id': '5'}],
+    },
+}
+
+ROWS = [
+    ('1234', 'drv1', '1', 0, epoch_minutes('2014-12-05T08:00')),
+    ('1234', 'drv1', '2', 1, epoch_minutes('2014-12-05T09:30')),
+    ('1234', u'drv-é', '3', 0, epoch_minutes('2016-02-29T23:59')),
+    ('1234', '', '4', -1, -1),
+    ('1234', '', '5', -1, -1),
+]
+
+
+def test_iter_rows():
+    assert list(iter_rows(RESULT)) == ROWS
+    # a bare result, and many of them
+    assert list(iter_rows(RESULT['result'])) == [('',) + row[1:] for row in ROWS]
+    assert list(iter_rows(iter([RESULT, RESULT]))) == ROWS * 2
+    assert list(iter_rows({'success': True, 'requestId': '0', 'result': None})) == []
+
+
+def test_to_csv():
+    fp = io.BytesIO()
+    assert to_csv([RESULT, RESULT], fp) == 10
+    lines = fp.getvalue().splitlines()
+    assert lines[0] == ','.join(COLUMNS)
+    assert lines[1] == '1234,drv1,1,0,{}'.format(epoch_minutes('2014-12-05T08:00'))
+    assert lines[3] == u'1234,drv-é,3,0,{}'.format(epoch_minutes('2016-02-29T23:59')).encode('utf-8')
+    assert lines[4] == '1234,,4,-1,-1'
+    assert len(lines) == 11
+
+
+def test_to_numpy_without_numpy(monkeypatch):
+    # makes ``import numpy`` fail, whether it's installed or not
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    with pytest.raises(OptimoError):
+        to_numpy(RESULT)
+
+
+def test_to_numpy(monkeypatch):
+    # numpy is in the test requirements
+    numpy = pytest.importorskip('numpy')
+
+    import optimo.export
+    # small chunks, to make the array grow
+    monkeypatch.setattr(optimo.export, '_CHUNK_SIZE', 2)
+    stops = to_numpy([RESULT] * 3)
+    assert stops.dtype.names == COLUMNS
+    assert len(stops) == 15
+    assert [tuple(row) for row in stops[:5]] == ROWS
+    assert stops['sequence'].tolist() == [0, 1, 0, -1, -1] * 3
+
+    stops = to_numpy(RESULT, id_dtype='U8', size_hint=100)
+    assert len(stops) == 5
+    assert stops['driver_id'][0] == 'drv1'
+    assert stops['scheduled_at'].dtype == numpy.int64
+    assert len(to_numpy([])) == 0
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from optimo import (
+    Break,
+    WorkShift,
+    Driver,
+    Order,
+    RoutePlan,
+    TimeWindow,
+)
+from optimo.feasibility import (
+    FeasibilityAnalyzer,
+    analyze_feasibility,
+    NO_SKILLED_DRIVER,
+    NO_MATCHING_SHIFT,
+    ASSIGNED_DRIVER_NOT_FOUND,
+    ASSIGNED_DRIVER_MISSING_SKILLS,
+    ASSIGNED_DRIVER_NO_SHIFT,
+)
+from optimo.intervals import IntervalTree, free_slots
+
+
+def at(hour, minute=0):
+    return datetime(year=2014, month=12, day=5, hour=hour, minute=minute)
+
+
+class TestIntervalTree(object):
+    def test_overlapping(self):
+        tree = IntervalTree([(1, 5, 'a'), (4, 9, 'b'), (10, 12, 'c')])
+        assert len(tree) == 3
+        assert [p for _, _, p in tree.overlapping(3, 4)] == ['a']
+        assert [p for _, _, p in tree.overlapping(4, 5)] == ['a', 'b']
+        assert [p for _, _, p in tree.overlapping(9, 10)] == []
+        assert [p for _, _, p in tree.overlapping(0, 100)] == ['a', 'b', 'c']
+        assert not IntervalTree([]).overlaps(0, 1)
+
+    def test_iter_overlapping(self):
+        tree = IntervalTree([(1, 5, 'a'), (4, 9, 'b'), (10, 12, 'c')])
+        found = tree.iter_overlapping(0, 100)
+        assert next(found)[2] == 'a'
+        assert [p for _, _, p in found] == ['b', 'c']
+        assert tree.overlaps(4, 5) and not tree.overlaps(9, 10)
+
+    def test_matches_brute_force(self):
+        rnd = random.Random(42)
+        intervals = []
+        for i in range(300):
+            start = rnd.randint(0, 1000)
+            intervals.append((start, start + rnd.randint(1, 60), i))
+        tree = IntervalTree(intervals)
+        for _ in range(200):
+            start = rnd.randint(0, 1000)
+            end = start + rnd.randint(1, 100)
+            expected = set(p for s, e, p in intervals if s < end and e > start)
+            assert set(p for _, _, p in tree.overlapping(start, end)) == expected
+
+    def test_free_slots(self):
+        busy = [(2, 4), (3, 5), (7, 8)]
+        assert free_slots(0, 10, busy) == [(0, 2), (5, 7), (8, 10)]
+        assert free_slots(2, 5, busy) == []
+
+
+class TestFeasibilityAnalyzer(object):
+    @pytest.fixture
+    def drivers(self):
+        morning = WorkShift(at(8), at(12), unavailable_times=[TimeWindow(at(10), at(11))])
+        afternoon = WorkShift(at(13), at(17), allowed_overtime=60)
+        return [
+            Driver('1', 53.35, -6.27, 53.34, -6.26, work_shifts=[morning], skills=['fridge']),
+            Driver('2', 53.35, -6.27, 53.34, -6.26, work_shifts=[afternoon],
+                   skills=['fridge', 'lift']),
+        ]
+
+    def test_feasible_orders(self, drivers):
+        analyzer = FeasibilityAnalyzer(drivers)
+        assert analyzer.check(Order('1', 53.3, -6.2, 30)) is None
+        assert analyzer.check(Order('2', 53.3, -6.2, 30, skills=['lift'])) is None
+        order = Order('3', 53.3, -6.2, 30, time_window=TimeWindow(at(17, 30), at(18)))
+        assert analyzer.check(order) is None
+        order = Order('4', 53.3, -6.2, 60, time_window=TimeWindow(at(9), at(11)),
+                      assigned_to=drivers[0])
+        assert analyzer.check(order) is None
+
+    def test_no_skilled_driver(self, drivers):
+        order = Order('1', 53.3, -6.2, 30, skills=['lift', 'crane'])
+        infeasibility = FeasibilityAnalyzer(drivers).check(order)
+        assert infeasibility.code == NO_SKILLED_DRIVER
+        assert infeasibility.order_id == '1'
+
+    def test_no_matching_shift(self, drivers):
+        analyzer = FeasibilityAnalyzer(drivers)
+        # outside every work shift
+        order = Order('1', 53.3, -6.2, 30, time_window=TimeWindow(at(19), at(20)))
+        assert analyzer.check(order).code == NO_MATCHING_SHIFT
+        # only the morning shift overlaps, but the driver is unavailable then
+        order = Order('2', 53.3, -6.2, 30, time_window=TimeWindow(at(10), at(11)))
+        assert analyzer.check(order).code == NO_MATCHING_SHIFT
+        # the overlapping shift belongs to a driver without the skill
+        order = Order('3', 53.3, -6.2, 30, time_window=TimeWindow(at(8), at(9)),
+                      skills=['lift'])
+        assert analyzer.check(order).code == NO_MATCHING_SHIFT
+        # too long for any available slot
+        order = Order('4', 53.3, -6.2, 6 * 60)
+        assert analyzer.check(order).code == NO_MATCHING_SHIFT
+
+    def test_assigned_to(self, drivers):
+        analyzer = FeasibilityAnalyzer(drivers)
+        order = Order('1', 53.3, -6.2, 30, assigned_to='3')
+        assert analyzer.check(order).code == ASSIGNED_DRIVER_NOT_FOUND
+
+        order = Order('2', 53.3, -6.2, 30, assigned_to='1', skills=['lift'])
+        assert analyzer.check(order).code == ASSIGNED_DRIVER_MISSING_SKILLS
+
+        order = Order('3', 53.3, -6.2, 30, assigned_to='1',
+                      time_window=TimeWindow(at(14), at(15)))
+        assert analyzer.check(order).code == ASSIGNED_DRIVER_NO_SHIFT
+
+    def test_breaks(self):
+        work_shift = WorkShift(at(8), at(10), break_=Break(at(8), at(9), 60))
+        analyzer = FeasibilityAnalyzer([
+            Driver('1', 53.35, -6.27, 53.34, -6.26, work_shifts=[work_shift]),
+        ])
+        assert analyzer.check(Order('1', 53.3, -6.2, 60)) is None
+        # the break takes an hour of the two
+        assert analyzer.check(Order('2', 53.3, -6.2, 90)).code == NO_MATCHING_SHIFT
+        # the break is taken before the order
+        order = Order('3', 53.3, -6.2, 60, time_window=TimeWindow(at(9), at(10)))
+        assert analyzer.check(order) is None
+        # no room for the break either before or after the order
+        order = Order('4', 53.3, -6.2, 60, time_window=TimeWindow(at(8, 30), at(9, 30)))
+        assert analyzer.check(order).code == NO_MATCHING_SHIFT
+
+        # breaks are subtracted along with the unavailable times
+        work_shift.unavailable_times = [TimeWindow(at(8), at(8, 30))]
+        analyzer = FeasibilityAnalyzer([
+            Driver('1', 53.35, -6.27, 53.34, -6.26, work_shifts=[work_shift]),
+        ])
+        assert analyzer.check(Order('5', 53.3, -6.2, 30)) is None
+        assert analyzer.check(Order('6', 53.3, -6.2, 40)).code == NO_MATCHING_SHIFT
+
+    def test_stops_at_the_first_fitting_shift(self, monkeypatch):
+        drivers = [
+            Driver(str(i), 53.35, -6.27, 53.34, -6.26,
+                   work_shifts=[WorkShift(at(8), at(17))])
+            for i in range(50)
+        ]
+        analyzer = FeasibilityAnalyzer(drivers)
+        calls = []
+        shift_cls = type(analyzer.shifts_by_driver['0'][0])
+        longest_free_slot = shift_cls.longest_free_slot
+        monkeypatch.setattr(shift_cls, 'longest_free_slot',
+                            lambda self, *args: calls.append(self) or
+                            longest_free_slot(self, *args))
+        order = Order('1', 53.3, -6.2, 30, time_window=TimeWindow(at(9), at(10)))
+        assert analyzer.check(order) is None
+        assert len(calls) == 1
+
+    def test_analyze_feasibility(self, drivers):
+        routeplan = RoutePlan(
+            request_id='1234',
+            callback_url='https://callback.com/1234',
+            status_callback_url='https://status.callback.com/1234',
+            orders=[
+                Order('1', 53.3, -6.2, 30),
+                Order('2', 53.3, -6.2, 30, skills=['crane']),
+                Order('3', 53.3, -6.2, 30, time_window=TimeWindow(at(5), at(6))),
+            ],
+            drivers=drivers,
+        )
+        infeasible = analyze_feasibility(routeplan)
+        assert [(i.order_id, i.code) for i in infeasible] == [
+            ('2', NO_SKILLED_DRIVER),
+            ('3', NO_MATCHING_SHIFT),
+        ]
+
+    def test_many_orders(self):
+        drivers = []
+        for i in range(200):
+            start = at(6) + timedelta(minutes=5 * i)
+            drivers.append(Driver(str(i), 53.35, -6.27, 53.34, -6.26,
+                                  work_shifts=[WorkShift(start, start + timedelta(hours=4))],
+                                  skills=['s{}'.format(i % 10)]))
+        analyzer = FeasibilityAnalyzer(drivers)
+        orders = []
+        for i in range(2000):
+            start = at(5) + timedelta(minutes=i % 900)
+            orders.append(Order(str(i), 53.3, -6.2, 10, skills=['s{}'.format(i % 11)],
+                                time_window=TimeWindow(start, start + timedelta(minutes=30))))
+        infeasible = analyzer.analyze(orders)
+        assert set(i.code for i in infeasible) == set([NO_SKILLED_DRIVER, NO_MATCHING_SHIFT])
+        assert all(order.skills == ['s10'] for order in
+                   (i.order for i in infeasible if i.code == NO_SKILLED_DRIVER))
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+
+from optimo import OptimoAPI, Driver, Order, RoutePlan, WorkShift
+from optimo.base import CoreOptimoAPI
+from optimo.fingerprint import PlanCache, PlanFingerprint, fingerprint
+
+
+def make_plan(request_id='4321', reverse=False, callback_url='https://callback.com'):
+    d1 = datetime.datetime(year=2014, month=12, day=5, hour=8, minute=0)
+    d2 = datetime.datetime(year=2014, month=12, day=5, hour=14, minute=0)
+    drivers = [
+        Driver(str(i), Decimal('53.350046'), Decimal('-6.274655'),
+               Decimal('53.341191'), Decimal('-6.260402'), work_shifts=[WorkShift(d1, d2)])
+        for i in range(3)
+    ]
+    orders = [Order(str(i), Decimal('53.343204'), Decimal('-6.269798'), 20 + i) for i in range(10)]
+    if reverse:
+        orders.reverse()
+        drivers.reverse()
+    return RoutePlan(request_id, callback_url, 'https://status.callback.com',
+                     orders=orders, drivers=drivers)
+
+
+def test_fingerprint_is_order_insensitive():
+    plan = make_plan()
+    assert fingerprint(plan) == fingerprint(make_plan(reverse=True))
+    # the request id is left out, but not the callbacks
+    assert fingerprint(plan) == fingerprint(make_plan('1234'))
+    assert fingerprint(plan) != fingerprint(make_plan(callback_url='https://other.com'))
+    other = make_plan()
+    other.status_callback_url = 'https://status.other.com'
+    assert fingerprint(plan) != fingerprint(other)
+
+    plan.orders[0].duration = 30
+    assert fingerprint(plan) != fingerprint(make_plan())
+    plan = make_plan()
+    plan.orders[1], plan.drivers[0] = plan.drivers[0], plan.orders[1]
+    assert fingerprint(plan) != fingerprint(make_plan())
+    plan = make_plan()
+    plan.optimization_parameters = {'balancing': 'ON'}
+    assert fingerprint(plan) != fingerprint(make_plan())
+
+
+def test_incremental_fingerprint():
+    plan = make_plan()
+    fp = PlanFingerprint(plan)
+    extra = Order('extra', 53.3, -6.2, 10)
+    fp.add_order(extra)
+    plan.orders.append(extra)
+    assert fp.hexdigest() == fingerprint(plan)
+
+    fp.remove_order(extra)
+    fp.remove_driver(plan.drivers[0])
+    assert fp.hexdigest() == fingerprint(
+        RoutePlan('4321', 'https://callback.com', 'https://status.callback.com',
+                  orders=plan.orders[:-1], drivers=plan.drivers[1:]))
+
+    # the same order twice is not the same as once
+    fp = PlanFingerprint(make_plan())
+    fp.add_order(extra)
+    fp.add_order(extra)
+    fp.remove_order(extra)
+    plan = make_plan()
+    plan.orders.append(extra)
+    assert fp.hexdigest() == fingerprint(plan)
+    fp.add_order(extra)
+    assert fp.hexdigest() != fingerprint(plan)
+
+
+def test_plan_cache():
+    now = [0.0]
+    cache = PlanCache(ttl=10, clock=lambda: now[0])
+    cache.add('fp', '1')
+    cache.alias('2', '1')
+    cache.alias('1', '1')
+    assert cache.lookup('fp') == '1'
+    assert cache.resolve('2') == '1'
+    assert cache.resolve('1') == '1'
+    cache.set_result('1', {'requestId': '1'})
+    assert cache.get_result('1') == {'requestId': '1'}
+
+    now[0] = 10
+    assert cache.lookup('fp') is None
+
+    cache.add('fp', '3')
+    cache.forget('1')
+    assert cache.lookup('fp') == '3'
+    assert cache.get_result('1') is None
+    cache.forget('3')
+    assert cache.lookup('fp') is None
+
+
+class TestOptimoAPIPlanCache(object):
+    @pytest.fixture
+    def sent(self, monkeypatch):
+        sent = []
+        raw_request = CoreOptimoAPI.raw_request
+
+        def recording_raw_request(self, url, method, params, data=None, headers=None):
+            sent.append(params['requestId'] if data is None else json.loads(str(data))['requestId'])
+            return raw_request(self, url, method, params, data, headers)
+
+        monkeypatch.setattr(CoreOptimoAPI, 'raw_request', recording_raw_request)
+        return sent
+
+    def test_duplicate_plans_are_not_submitted(self, sent):
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', plan_cache=PlanCache())
+        optimo_api.plan(make_plan('1234'))
+        # no canned response for 'dup', it must not be sent
+        optimo_api.plan(make_plan('dup', reverse=True))
+        assert sent == ['1234']
+        assert optimo_api.plan_cache.resolve('dup') == '1234'
+
+        assert optimo_api.get('dup')['requestId'] == '1234'
+        assert optimo_api.get('1234')['requestId'] == '1234'
+        assert sent == ['1234', '1234']
+
+        # the shared optimization keeps running for '1234'
+        optimo_api.stop('dup')
+        assert sent == ['1234', '1234']
+        assert optimo_api.plan_cache.resolve('dup') == 'dup'
+
+        optimo_api.stop('1234')
+        assert sent == ['1234', '1234', '1234']
+        assert optimo_api.plan_cache.lookup(fingerprint(make_plan())) is None
+
+    def test_changed_plans_are_submitted(self, sent):
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', plan_cache=PlanCache())
+        optimo_api.plan(make_plan('1234'))
+        route_plan = make_plan('4321')
+        route_plan.orders.pop()
+        optimo_api.plan(route_plan)
+        assert sent == ['1234', '4321']
+
+    def test_plans_with_other_callbacks_are_submitted(self, sent):
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', plan_cache=PlanCache())
+        optimo_api.plan(make_plan('1234'))
+        optimo_api.plan(make_plan('4321', callback_url='https://other.com/4321'))
+        assert sent == ['1234', '4321']
+        assert optimo_api.plan_cache.resolve('4321') == '4321'
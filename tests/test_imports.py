@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+
+
+def loaded_modules(statement):
+    """Returns the top level modules loaded by ``statement``, in a fresh
+    interpreter.
+    """
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        '{}\nimport sys\nprint(" ".join(sorted(set(m.split(".")[0] for m in sys.modules))))'
+        .format(statement),
+    ])
+    return set(output.split())
+
+
+def test_import_does_not_load_http_stack():
+    modules = loaded_modules('import optimo\nimport optimo.util\nimport optimo.validation')
+    assert 'optimo' in modules
+    assert not modules & set(['requests', 'urllib3', 'pytz'])
+
+
+def test_http_stack_is_loaded_on_first_use():
+    modules = loaded_modules(
+        'import optimo\n'
+        'optimo.OptimoAPI("https://foo.bar.com", "foobarkey").core_api.get_session()')
+    assert 'requests' in modules
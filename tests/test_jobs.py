@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import threading
+
+import pytest
+
+from optimo import OptimoAPI, OptimoError, RoutePlan, Order, Driver, WorkShift
+from optimo.jobs import JobTracker, FAILED, FINISHED, RUNNING, STOPPED, SUBMITTED
+
+from tests.util import FakeClock
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def db_path(tmpdir):
+    return str(tmpdir.join('jobs.db'))
+
+
+@pytest.fixture
+def tracker(db_path, tmpdir, clock):
+    return JobTracker(db_path, result_dir=str(tmpdir), poll_interval=5,
+                      max_poll_interval=30, clock=clock)
+
+
+def make_plan(request_id):
+    d1 = datetime.datetime(year=2014, month=12, day=5, hour=8, minute=0)
+    d2 = datetime.datetime(year=2014, month=12, day=5, hour=14, minute=0)
+    drv = Driver('123', 53.35, -6.27, 53.34, -6.26, work_shifts=[WorkShift(d1, d2)])
+    return RoutePlan(request_id, 'https://callback.com', 'https://status.callback.com',
+                     orders=[Order('1', 53.34, -6.26, 20)], drivers=[drv])
+
+
+def test_transitions(tracker, clock):
+    tracker.submitted('1')
+    job = tracker.get('1')
+    assert job.state == SUBMITTED
+    assert job.submitted_at == 1000
+    assert job.next_poll_at == 1005
+    assert tracker.is_active('1')
+
+    clock.now = 1005
+    assert tracker.running('1')
+    assert tracker.get('1').next_poll_at == 1015
+    clock.now = 1015
+    tracker.running('1')
+    clock.now = 1035
+    tracker.running('1')
+    # capped at max_poll_interval
+    assert tracker.get('1').next_poll_at == 1065
+
+    clock.now = 1040
+    assert tracker.finished('1', {'success': True, 'requestId': '1'})
+    job = tracker.get('1')
+    assert job.state == FINISHED
+    assert job.next_poll_at is None
+    assert tracker.load_result('1') == {'success': True, 'requestId': '1'}
+    assert not tracker.is_active('1')
+    # finished jobs stay finished
+    assert not tracker.running('1')
+    assert not tracker.stopped('1')
+    assert [state for state, at in tracker.history('1')] == [
+        SUBMITTED, RUNNING, RUNNING, RUNNING, FINISHED]
+
+    # untracked jobs are ignored
+    assert not tracker.running('2')
+    assert not tracker.finished('2', {})
+    assert tracker.get('2') is None
+    assert tracker.load_result('2') is None
+
+    tracker.remove('1')
+    assert tracker.get('1') is None
+    assert tracker.history('1') == []
+
+
+def test_claim_due(tracker, db_path, clock):
+    for request_id in ('1', '2', '3'):
+        tracker.submitted(request_id)
+        clock.now += 1
+    assert tracker.claim_due() == []
+    clock.now = 1006
+    # another worker, with a connection of its own
+    other = JobTracker(db_path, clock=clock)
+    assert other.claim_due(limit=1) == ['1']
+    assert tracker.claim_due() == ['2']
+    clock.now = 1100
+    assert sorted(tracker.claim_due(lease=10)) == ['1', '2', '3']
+    assert other.claim_due() == []
+    clock.now = 1110
+    assert len(other.claim_due()) == 3
+
+
+def test_concurrent_claims(tracker, db_path, clock):
+    for i in range(200):
+        tracker.submitted(str(i))
+    clock.now = 2000
+    claimed = []
+    lock = threading.Lock()
+
+    def claim():
+        worker = JobTracker(db_path, clock=clock)
+        while True:
+            request_ids = worker.claim_due(limit=7)
+            if not request_ids:
+                return
+            with lock:
+                claimed.extend(request_ids)
+
+    threads = [threading.Thread(target=claim) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(str(i) for i in range(200))
+
+
+def test_optimo_api_integration(tracker, clock):
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', job_tracker=tracker)
+    optimo_api.plan(make_plan('4321'))
+    assert tracker.get('4321').state == SUBMITTED
+    optimo_api.plan(make_plan('1234'))
+    # the canned responses of these can't be planned
+    tracker.submitted('0110')
+    tracker.submitted('0000')
+    assert len(tracker.active()) == 4
+
+    optimo_api.stop('4321')
+    assert tracker.get('4321').state == STOPPED
+
+    clock.now += 5
+    finished = optimo_api.poll_jobs()
+    assert [request_id for request_id, result in finished] == ['1234']
+    assert tracker.get('1234').state == FINISHED
+    assert tracker.load_result('1234')['requestId'] == '1234'
+    assert tracker.get('0110').state == RUNNING
+    assert tracker.get('0000').state == FAILED
+    assert tracker.get('0000').error.startswith('Request with the requestId')
+    assert [job.request_id for job in tracker.active()] == ['0110']
+
+    # a restarted worker resumes polling
+    clock.now += 30
+    restarted = OptimoAPI('https://foo.bar.com', 'foobarkey',
+                          job_tracker=JobTracker(tracker.path, clock=clock))
+    assert restarted.poll_jobs() == []
+    assert tracker.get('0110').polls == 2
+
+    with pytest.raises(OptimoError):
+        OptimoAPI('https://foo.bar.com', 'foobarkey').poll_jobs()
+
+
+def test_result_paths_stay_in_result_dir(tracker, tmpdir):
+    for request_id in ('../../x', '/abs/path', u'caf\xe9/..'):
+        tracker.submitted(request_id)
+        assert tracker.finished(request_id, {'requestId': request_id})
+        path = tracker.get(request_id).result_path
+        assert os.path.dirname(path) == str(tmpdir)
+        assert tracker.load_result(request_id) == {'requestId': request_id}
+    assert not os.path.exists(str(tmpdir.join('..', '..', 'x.json')))
+
+
+def test_resubmitted_job_starts_a_new_history(tracker, clock):
+    tracker.submitted('1')
+    tracker.running('1')
+    tracker.failed('1', 'boom')
+    clock.now += 10
+    tracker.submitted('1')
+    assert tracker.history('1') == [(SUBMITTED, clock.now)]
+
+
+def test_result_is_saved_once(tracker, monkeypatch):
+    saved = []
+    save_result = JobTracker._save_result
+    monkeypatch.setattr(JobTracker, '_save_result',
+                        lambda self, path, result: saved.append(path) or
+                        save_result(self, path, result))
+    tracker.submitted('1')
+    assert tracker.finished('1', {'n': 1})
+    # a second worker that polled the same result
+    assert not tracker.finished('1', {'n': 2})
+    assert len(saved) == 1
+    assert tracker.load_result('1') == {'n': 1}
+
+
+def test_failed_save_keeps_the_job_active(tracker, monkeypatch):
+    def fail(self, path, result):
+        raise IOError('disk full')
+    monkeypatch.setattr(JobTracker, '_save_result', fail)
+    tracker.submitted('1')
+    with pytest.raises(IOError):
+        tracker.finished('1', {})
+    assert tracker.is_active('1')
+
+
+def test_poll_jobs_survives_transport_errors(tracker, clock, monkeypatch):
+    from optimo.base import CoreOptimoAPI
+
+    get_result = CoreOptimoAPI.get_result
+
+    def flaky_get_result(self, request_id, headers=None):
+        if request_id == '0110':
+            raise IOError('connection reset')
+        return get_result(self, request_id, headers)
+
+    monkeypatch.setattr(CoreOptimoAPI, 'get_result', flaky_get_result)
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', job_tracker=tracker)
+    tracker.submitted('0110')
+    clock.now += 1
+    tracker.submitted('1234')
+    clock.now += 5
+    finished = optimo_api.poll_jobs()
+    assert [request_id for request_id, result in finished] == ['1234']
+    # still leased, and polled again once the lease runs out
+    assert tracker.get('0110').state == SUBMITTED
+    assert tracker.claim_due() == []
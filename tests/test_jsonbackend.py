@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+from collections import namedtuple
+from decimal import Decimal
+
+import pytest
+
+from optimo import Driver, Order, RoutePlan, TimeWindow, WorkShift, OptimoError
+from optimo import jsonbackend
+from optimo.jsonbackend import StdlibBackend, get_backend
+from optimo.util import CoreOptimoEncoder, DatetimeFormatter, OptimoEncoder
+
+from tests.util import REQUEST_ID_TO_RESPONSE
+
+
+@pytest.fixture(params=[backend_cls for _, backend_cls in jsonbackend.BACKENDS],
+                ids=[name for name, _ in jsonbackend.BACKENDS])
+def backend(request):
+    # every backend is in the test requirements, a missing one shows up as
+    # skipped rather than silently dropped
+    try:
+        return request.param()
+    except ImportError as e:
+        pytest.skip(str(e))
+
+
+@pytest.fixture
+def route_plan():
+    d1 = datetime.datetime(year=2014, month=12, day=5, hour=8, minute=0)
+    d2 = datetime.datetime(year=2014, month=12, day=5, hour=14, minute=0)
+    drv = Driver(u'drv-é', Decimal('53.350046'), Decimal('-6.274655'),
+                 Decimal('53.341191'), Decimal('-6.260402'), work_shifts=[WorkShift(d1, d2)])
+    orders = [
+        Order(str(i), Decimal('53.343204') + i, -6.269798 - i * 1e-7, 20 + i,
+              time_window=TimeWindow(d1, d2), skills=[u'fridge', 'lift'], priority='H')
+        for i in range(20)
+    ]
+    return RoutePlan('1234', 'https://callback.com/1234', 'https://status.callback.com/1234',
+                     orders=orders, drivers=[drv])
+
+
+Point = namedtuple('Point', 'lat lng')
+
+PLAIN_DATA = {
+    'ints': [0, -1, 2 ** 70],
+    'floats': [0.1, 1e-7, 53.343204, -6.269798, 1e22],
+    'strings': ['ascii', u'unicodé', u' ', '"quoted"\n'],
+    'tuple': (1, 2),
+    'namedtuple': Point(53.3, -6.2),
+    'nested': {'none': None, 'bools': [True, False], 'empty': {}},
+    'decimal': Decimal('53.343204'),
+    'datetime': datetime.datetime(2014, 12, 5, 8, 30),
+    'unknown': object(),
+}
+
+ENCODER_OPTIONS = [
+    {},
+    {'sort_keys': True, 'separators': (',', ':')},
+    {'ensure_ascii': False},
+    {'indent': 2, 'sort_keys': True},
+]
+
+
+@pytest.mark.parametrize('options', ENCODER_OPTIONS)
+def test_dumps_conformance(backend, route_plan, options):
+    expected = json.dumps(route_plan, cls=OptimoEncoder, **options)
+    assert backend.dumps(route_plan, cls=OptimoEncoder, **options) == expected
+
+    options = dict(options, coordinate_precision=3, validate_models=False,
+                   datetime_formatter=DatetimeFormatter(timezone='Europe/Dublin'))
+    expected = json.dumps(route_plan, cls=OptimoEncoder, **options)
+    assert backend.dumps(route_plan, cls=OptimoEncoder, **options) == expected
+
+    options.pop('validate_models')
+    data = dict(PLAIN_DATA)
+    expected = json.dumps(data, cls=CoreOptimoEncoder, **options)
+    assert backend.dumps(data, cls=CoreOptimoEncoder, **options) == expected
+
+
+def test_dumps_custom_encode(backend):
+    class UpperEncoder(CoreOptimoEncoder):
+        def encode(self, o):
+            return super(UpperEncoder, self).encode(o).upper()
+
+    assert backend.dumps({'a': 'b'}, cls=UpperEncoder) == '{"A": "B"}'
+
+
+def test_loads_conformance(backend):
+    for response in REQUEST_ID_TO_RESPONSE.itervalues():
+        assert backend.loads(response['content']) == json.loads(response['content'])
+    content = json.dumps(PLAIN_DATA, cls=CoreOptimoEncoder)
+    assert backend.loads(content) == json.loads(content)
+
+
+def test_get_backend(monkeypatch):
+    try:
+        import simplejson
+        preferred = 'simplejson'
+    except ImportError:
+        preferred = 'json'
+    assert get_backend().name == preferred
+    assert isinstance(get_backend('json'), StdlibBackend)
+    with pytest.raises(OptimoError) as excinfo:
+        get_backend('yaml')
+    assert str(excinfo.value) == "Unknown JSON backend 'yaml'"
+
+    class MissingBackend(StdlibBackend):
+        def __init__(self):
+            raise ImportError
+    monkeypatch.setattr(jsonbackend, 'BACKENDS', [('missing', MissingBackend),
+                                                  ('json', StdlibBackend)])
+    assert get_backend().name == 'json'
+    with pytest.raises(OptimoError) as excinfo:
+        get_backend('missing')
+    assert str(excinfo.value) == "The JSON backend 'missing' is not installed"
+
+    monkeypatch.setattr(jsonbackend, '_default', None)
+    assert jsonbackend.default_backend().name == 'json'
+    jsonbackend.set_default_backend('json')
+    assert jsonbackend.default_backend().name == 'json'
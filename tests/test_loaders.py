@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import datetime
+from decimal import Decimal
+from StringIO import StringIO
+
+import pytest
+
+from optimo import Order, Driver, RoutePlan
+from optimo.errors import OptimoValidationError
+from optimo.loaders import dump_route_plan, read_csv
+from optimo.util import OptimoEncoder
+
+from tests.schema.v1 import RoutePlanValidator
+
+
+ORDERS_CSV = """id,lat,lng,duration,time_window_start,time_window_end,skills,assigned_to
+1,53.343204,-6.269798,20,2014-12-05T08:00,2014-12-05T10:00,fridge|lift,
+2,53.341820,-6.264991,25,2014-12-05T08:00,2014-12-05T10:00,fridge|lift,
+3,53.341820,-6.264991,25,,,,drv1
+"""
+
+DRIVERS_CSV = """id,start_lat,start_lng,end_lat,end_lng,work_start,work_end,skills,cost_per_km
+drv1,53.350046,-6.274655,53.341191,-6.260402,2014-12-05T08:00,2014-12-05T14:00,fridge|lift,0.5
+"""
+
+
+def test_order_from_records():
+    dt1 = datetime(year=2014, month=12, day=5, hour=8)
+    dt2 = datetime(year=2014, month=12, day=5, hour=10)
+    records = [
+        ('1', 53.3, -6.2, 20, dt1, dt2, 'H', ['fridge']),
+        {'id': '2', 'lat': 53.3, 'lng': -6.2, 'duration': 10, 'time_window_start': dt1,
+         'time_window_end': dt2, 'skills': ['fridge'], 'scheduled_at': dt1,
+         'scheduled_driver': 'drv1', 'locked': True},
+    ]
+    order1, order2 = Order.from_records(records)
+    assert (order1.id, order1.priority, order1.duration) == ('1', 'H', 20)
+    assert order2.priority == 'M'
+    assert order2.scheduling_info.locked is True
+    # the immutable values are interned
+    assert order1.time_window.start_time is order2.time_window.start_time
+    assert order1.skills[0] is order2.skills[0]
+
+
+def test_loaded_models_do_not_share_mutable_state():
+    orders = list(Order.from_csv(StringIO(ORDERS_CSV)))
+    order1, order2 = orders[:2]
+    order1.skills.append('van')
+    order1.time_window.end_time = datetime(year=2014, month=12, day=5, hour=9)
+    assert order2.skills == ['fridge', 'lift']
+    assert order2.time_window.end_time == datetime(year=2014, month=12, day=5, hour=10)
+
+    # nor do the orders of later loads
+    order3 = next(Order.from_csv(StringIO(ORDERS_CSV)))
+    assert order3.skills == ['fridge', 'lift']
+
+
+def test_from_records_validates_batches():
+    records = [
+        ('1', 53.3, -6.2, 20),
+        ('2', 53.3, -6.2, -1),
+        ('3', 53.3, -6.2, 'abc'),
+        ('4', 53.3, -6.2, 20),
+    ]
+    orders = Order.from_records(records, batch_size=1)
+    assert next(orders).id == '1'
+    with pytest.raises(OptimoValidationError) as excinfo:
+        next(orders)
+    assert excinfo.value.errors == ["record #1: 'Order.duration' cannot be negative"]
+
+    # all the errors of a batch are reported at once
+    with pytest.raises(OptimoValidationError) as excinfo:
+        list(Order.from_records(records))
+    assert len(excinfo.value.errors) == 2
+    assert excinfo.value.errors[1].startswith("record #2: invalid literal")
+
+    # unvalidated
+    assert len(list(Order.from_records(records[:2], validate=False))) == 2
+
+
+def test_from_csv():
+    routeplan = RoutePlan.from_csv(
+        '1234', 'https://callback.com/1234', 'https://status.callback.com/1234',
+        StringIO(ORDERS_CSV), StringIO(DRIVERS_CSV),
+    )
+    assert routeplan.validate() is None
+    assert [order.id for order in routeplan.orders] == ['1', '2', '3']
+    order1, order2, order3 = routeplan.orders
+    assert order1.lat == Decimal('53.343204')
+    assert order1.skills == ['fridge', 'lift']
+    assert order1.skills[1] is order2.skills[1] is routeplan.drivers[0].skills[1]
+    assert order3.time_window is None and order3.skills == []
+    assert order3.assigned_to == 'drv1'
+    drv, = routeplan.drivers
+    assert drv.cost_per_km == Decimal('0.5')
+    assert drv.work_shifts[0].end_work == datetime(year=2014, month=12, day=5, hour=14)
+
+    drivers = list(Driver.from_csv(StringIO(DRIVERS_CSV)))
+    assert [d.id for d in drivers] == ['drv1']
+
+
+def test_dump_route_plan():
+    args = ('1234', 'https://callback.com/1234', 'https://status.callback.com/1234')
+    fp = StringIO()
+    no_orders = dump_route_plan(fp, *(args + (read_csv(StringIO(ORDERS_CSV)),
+                                              read_csv(StringIO(DRIVERS_CSV)))))
+    assert no_orders == 3
+    data = json.loads(fp.getvalue())
+    assert RoutePlanValidator.validate(data) is None
+
+    routeplan = RoutePlan.from_csv(*(args + (StringIO(ORDERS_CSV), StringIO(DRIVERS_CSV))))
+    assert data == json.loads(json.dumps(routeplan, cls=OptimoEncoder))
+
+    orders = list(read_csv(StringIO(ORDERS_CSV)))
+    orders[2]['assigned_to'] = 'drv2'
+    with pytest.raises(OptimoValidationError):
+        dump_route_plan(StringIO(), *(args + (orders, read_csv(StringIO(DRIVERS_CSV)))))
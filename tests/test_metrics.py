@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+
+import pytest
+
+from optimo import Driver, Order, RoutePlan, OptimoError
+from optimo.metrics import haversine_km, route_metrics
+
+
+def has_numpy():
+    try:
+        import numpy  # noqa
+    except ImportError:
+        return False
+    return True
+
+
+@pytest.fixture
+def route_plan():
+    drivers = [
+        Driver('drv1', Decimal('53.3498'), Decimal('-6.2603'), 53.3498, -6.2603,
+               cost_per_km=2, cost_per_hour=Decimal('30'), fixed_cost=100),
+        Driver('drv2', 53.3498, -6.2603, 51.5074, -0.1278),
+    ]
+    orders = [
+        Order('1', Decimal('53.3498'), Decimal('-6.2703'), 30),
+        Order('2', 53.3598, -6.2703, 15),
+        Order('3', 51.5074, -0.1278, 10),
+    ]
+    return RoutePlan('1234', 'https://callback.com', 'https://status.callback.com',
+                     orders=orders, drivers=drivers)
+
+
+RESULT = {
+    'success': True,
+    'requestId': '1234',
+    'result': {
+        'routes': [
+            {'driverId': 'drv1', 'orders': [{'id': '1', 'scheduledAt': '2014-12-05T08:00'},
+                                            {'id': '2', 'scheduledAt': '2014-12-05T09:30'}]},
+            {'driverId': 'drv2', 'orders': []},
+        ],
+        'unservedOrders': ['3'],
+    },
+}
+
+
+def test_haversine():
+    # Dublin to London
+    assert round(haversine_km(53.3498, -6.2603, 51.5074, -0.1278)) == 463
+    assert haversine_km(53.3498, -6.2603, 53.3498, -6.2603) == 0
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=pytest.mark.skipif(
+    not has_numpy(), reason='numpy is not installed'))])
+def test_route_metrics(route_plan, use_numpy):
+    drv1, drv2 = route_metrics(route_plan, RESULT, use_numpy=use_numpy)
+    assert drv1.driver_id == 'drv1'
+    assert drv1.order_ids == ('1', '2')
+    assert len(drv1.legs_km) == 3
+    expected_legs = (haversine_km(53.3498, -6.2603, 53.3498, -6.2703),
+                     haversine_km(53.3498, -6.2703, 53.3598, -6.2703),
+                     haversine_km(53.3598, -6.2703, 53.3498, -6.2603))
+    assert drv1.legs_km == pytest.approx(expected_legs)
+    assert drv1.distance_km == pytest.approx(sum(expected_legs))
+    # 08:00 to 09:30 plus the 15 minutes of the last order
+    assert drv1.hours == 1.75
+    assert drv1.cost == pytest.approx(100 + 2 * drv1.distance_km + 30 * 1.75)
+
+    assert drv2 == ('drv2', (), (), 0, None, 0)
+
+
+def test_route_metrics_backends_agree(route_plan):
+    if not has_numpy():
+        with pytest.raises(OptimoError):
+            route_metrics(route_plan, RESULT, use_numpy=True)
+        return
+    result = {'routes': [{'driverId': 'drv2', 'orders': [{'id': '3'}, {'id': '1'}, {'id': '2'}]}]}
+    python = route_metrics(route_plan, result, use_numpy=False)
+    vectorized = route_metrics(route_plan, result)
+    assert python[0].legs_km == pytest.approx(vectorized[0].legs_km)
+    assert python[0].hours is None
+
+
+def test_unknown_ids(route_plan):
+    with pytest.raises(OptimoError) as excinfo:
+        route_metrics(route_plan, {'routes': [{'driverId': 'drv9', 'orders': []}]})
+    assert str(excinfo.value) == "Driver 'drv9' of the result is not in the plan"
+    with pytest.raises(OptimoError) as excinfo:
+        route_metrics(route_plan, {'routes': [{'driverId': 'drv1', 'orders': [{'id': '9'}]}]})
+    assert str(excinfo.value) == "Order '9' of the result is not in the plan"
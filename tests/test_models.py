@@ -154,6 +154,57 @@ class TestWorkShift(object):
 
         assert WorkShiftValidator.validate(dictify(ws)) is None
 
+    def test_interval_checks(self, cls_name):
+        at = lambda hour: datetime(year=2014, month=12, day=5, hour=hour)
+        ws = WorkShift(start_work=at(8), end_work=at(16), allowed_overtime=60)
+        ws.break_ = Break(earliest_start=at(12), latest_start=at(13), duration=30)
+        ws.unavailable_times = [
+            TimeWindow(start_time=at(9), end_time=at(10)),
+            TimeWindow(start_time=at(16), end_time=at(17)),
+        ]
+        assert ws.interval_errors() == []
+        assert ws.validate(check_intervals=True) is None
+
+        ws.unavailable_times = [
+            TimeWindow(start_time=at(11), end_time=at(14)),
+            TimeWindow(start_time=at(6), end_time=at(7)),
+            TimeWindow(start_time=at(10), end_time=at(12)),
+            TimeWindow(start_time=at(15), end_time=at(15)),
+        ]
+        # type-wise it's still a valid work shift
+        assert ws.validate() is None
+        with pytest.raises(OptimoValidationError) as excinfo:
+            ws.validate(check_intervals=True)
+        assert excinfo.value.errors == [
+            "'{}.unavailable_times[1]' (2014-12-05T06:00 - 2014-12-05T07:00) is "
+            "outside of the work shift (2014-12-05T08:00 - 2014-12-05T17:00)".format(cls_name),
+            "'{}.unavailable_times[3]' ends (2014-12-05T15:00) before it starts "
+            "(2014-12-05T15:00)".format(cls_name),
+            "'{0}.unavailable_times[2]' overlaps with '{0}.unavailable_times[0]'".format(cls_name),
+            "'{}.break_' can not fit between the unavailable times".format(cls_name),
+        ]
+        assert str(excinfo.value) == '; '.join(excinfo.value.errors)
+
+        ws.unavailable_times = []
+        ws.break_ = Break(earliest_start=at(16), latest_start=at(17), duration=30)
+        assert ws.interval_errors() == [
+            "'{}.break_' can not fit inside the work shift".format(cls_name)
+        ]
+
+    def test_interval_checks_scale(self):
+        from datetime import timedelta
+
+        start = datetime(year=2014, month=12, day=5)
+        ws = WorkShift(start_work=start, end_work=start + timedelta(days=1))
+        ws.unavailable_times = [
+            TimeWindow(start_time=start + timedelta(minutes=3 * i),
+                       end_time=start + timedelta(minutes=3 * i + 2))
+            for i in reversed(range(400))
+        ]
+        assert ws.interval_errors() == []
+        ws.unavailable_times.append(TimeWindow(start_time=start, end_time=start + timedelta(hours=1)))
+        assert len(ws.interval_errors()) == 20
+
 
 class TestSchedulingInfo(object):
     @pytest.fixture
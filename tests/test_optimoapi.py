@@ -12,7 +12,7 @@ from optimo import (
     RoutePlan,
     OptimoError,
 )
-from optimo.util import OptimoEncoder, validate_url
+from optimo.util import OptimoEncoder, normalize_url, validate_url
 
 from tests.schema.v1 import RoutePlanValidator
 
@@ -55,6 +55,19 @@ def test_validate_scheme():
                                   "protocol scheme")
 
 
+def test_normalize_url():
+    assert normalize_url('HTTPS://Foo.Bar.com:443/Path/') == 'https://foo.bar.com/Path/'
+    assert normalize_url('http://user@[::1]:8080/x?a=1') == 'http://user@[::1]:8080/x?a=1'
+    assert normalize_url('http://foo.bar.com:80') == 'http://foo.bar.com'
+
+    with pytest.raises(OptimoError) as excinfo:
+        normalize_url('http://foo.bar.com:http')
+    assert str(excinfo.value) == ("The url: 'http://foo.bar.com:http' does not "
+                                  "define a valid port")
+    with pytest.raises(OptimoError):
+        normalize_url('foo.bar.com')
+
+
 class TestOptimoAPIConfiguration(object):
     def test_optimoapi_instatiation(self):
         optimo_apiv1 = OptimoAPI('https://foo.bar.com', 'foobarkey')
@@ -65,6 +78,19 @@ class TestOptimoAPIConfiguration(object):
         optimo_apiv2 = OptimoAPI('https://foo.bar.com', 'foobarkey', version='v2')
         assert optimo_apiv2.version == 'v2'
 
+    def test_optimoapi_url_is_normalized(self):
+        # the version and the endpoints are appended to it
+        optimo_api = OptimoAPI('HTTPS://Foo.Bar.com:443/', 'foobarkey')
+        assert optimo_api.optimo_url == 'https://foo.bar.com'
+        assert optimo_api.core_api.base_url == 'https://foo.bar.com'
+        assert OptimoAPI('https://foo.bar.com:8443//', 'foobarkey').optimo_url == \
+            'https://foo.bar.com:8443'
+
+        with pytest.raises(OptimoError) as excinfo:
+            OptimoAPI('https://foo.bar.com:99999', 'foobarkey')
+        assert str(excinfo.value) == ("The url: 'https://foo.bar.com:99999' does not "
+                                      "define a valid port")
+
     def test_optimoapi_url(self):
         with pytest.raises(OptimoError) as excinfo:
             OptimoAPI('', 'foobarkey')
@@ -155,6 +181,114 @@ def test_unsuccessful_get_planning_in_progress(optimo_api):
     assert optimo_api.get('0110') is None
 
 
+class TestGetCoalescing(object):
+    def test_concurrent_gets_share_a_request(self, monkeypatch):
+        import threading
+        from optimo.base import CoreOptimoAPI
+
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey')
+        get_result = CoreOptimoAPI.get_result
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_get_result(self, request_id, headers=None):
+            calls.append(request_id)
+            started.set()
+            release.wait()
+            return get_result(self, request_id, headers)
+
+        monkeypatch.setattr(CoreOptimoAPI, 'get_result', slow_get_result)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(optimo_api.get('1234')))
+                   for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while optimo_api.results.coalesced < 4:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ['1234']
+        assert len(results) == 5
+        assert all(result is results[0] for result in results)
+        assert results[0]['requestId'] == '1234'
+        # without a ttl, the next call makes a new request
+        optimo_api.get('1234')
+        assert calls == ['1234', '1234']
+
+    def test_result_ttl(self):
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', result_ttl=60)
+        result = optimo_api.get('1234')
+        assert optimo_api.get('1234') is result
+        assert optimo_api.results.info() == {'calls': 1, 'coalesced': 1, 'ttl': 60}
+        # stopping or re-planning a request drops its result
+        optimo_api.stop('1234')
+        assert optimo_api.get('1234') is not result
+
+    def test_errors_are_not_kept(self):
+        from optimo.util import SingleFlight
+
+        clock = [0.0]
+        flights = SingleFlight(ttl=10, clock=lambda: clock[0])
+
+        def fail():
+            raise OptimoError('boom')
+
+        for _ in range(2):
+            with pytest.raises(OptimoError):
+                flights.do('key', fail)
+        assert flights.calls == 2
+
+        assert flights.do('key', lambda: 1) == 1
+        assert flights.do('key', lambda: 2) == 1
+        clock[0] = 10
+        assert flights.do('key', lambda: 3) == 3
+
+    def test_base_exceptions_finish_the_flight(self):
+        import threading
+        from optimo.util import SingleFlight
+
+        class Interrupted(BaseException):
+            pass
+
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def interrupted():
+            started.set()
+            release.wait()
+            raise Interrupted()
+
+        errors = []
+
+        def follow():
+            try:
+                flights.do('key', lambda: 1)
+            except Interrupted:
+                errors.append('follower')
+
+        leader = threading.Thread(target=lambda: pytest.raises(Interrupted, flights.do,
+                                                               'key', interrupted))
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=follow)
+        follower.start()
+        while flights.coalesced < 1:
+            pass
+        release.set()
+        leader.join()
+        follower.join(5)
+        assert not follower.is_alive()
+        assert errors == ['follower']
+        # the failed flight is not kept
+        assert flights.do('key', lambda: 2) == 2
+
+
 def test_successful_plan(optimo_api, route_plan):
     assert route_plan.validate() is None
     # we need to do this because only the OptimoEncoder serializes correctly
@@ -188,3 +322,92 @@ def test_unsuccessful_stop(optimo_api):
 
     assert "Request with the requestId specified" in str(excinfo.value)
     assert "was not found" in str(excinfo.value)
+
+
+class TestCompression(object):
+    @pytest.fixture
+    def sent(self, monkeypatch):
+        """Captures what reaches ``raw_request`` and echoes a gzipped success
+        response back.
+        """
+        from optimo.base import CoreOptimoAPI, compress_body
+
+        sent = {}
+
+        def raw_request(self, url, method, params, data=None, headers=None):
+            sent['data'] = data
+            sent['headers'] = headers
+            return {
+                'status_code': 200,
+                'headers': {'content-encoding': 'gzip'},
+                'content': compress_body('{"success":true}', 'gzip'),
+            }
+        monkeypatch.setattr(CoreOptimoAPI, 'raw_request', raw_request)
+        return sent
+
+    def test_compressed_plan(self, sent, route_plan):
+        import zlib
+
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey',
+                               compression='gzip', compression_threshold=0)
+        assert optimo_api.plan(route_plan) is None
+        assert sent['headers']['Content-Encoding'] == 'gzip'
+        body = zlib.decompress(sent['data'], 16 + zlib.MAX_WBITS)
+        assert json.loads(body) == json.loads(json.dumps(route_plan, cls=OptimoEncoder))
+
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey',
+                               compression='deflate', compression_level=9,
+                               compression_threshold=0)
+        assert optimo_api.plan(route_plan) is None
+        assert sent['headers']['Content-Encoding'] == 'deflate'
+        assert json.loads(zlib.decompress(sent['data']))['requestId'] == '4321'
+
+    def test_compression_threshold(self, sent, route_plan):
+        optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', compression='gzip')
+        optimo_api.stop('3421')
+        assert sent['data'] == '{"requestId": "3421"}'
+        assert sent['headers'] is None
+
+    def test_invalid_compression(self):
+        with pytest.raises(ValueError):
+            OptimoAPI('https://foo.bar.com', 'foobarkey', compression='br')
+
+    def test_decompress_content(self):
+        from optimo.base import compress_body, decompress_content
+
+        content = '{"success":true}'
+        assert decompress_content(compress_body(content, 'gzip'), 'gzip') == content
+        assert decompress_content(compress_body(content, 'deflate'), 'DEFLATE') == content
+        # already decoded by the http library
+        assert decompress_content(content, 'gzip') == content
+        assert decompress_content(content, None) == content
+
+
+def test_encode_body():
+    from optimo.base import encode_body
+
+    class UnicodeEncoder(OptimoEncoder):
+        def __init__(self, *args, **kwargs):
+            kwargs['ensure_ascii'] = False
+            super(UnicodeEncoder, self).__init__(*args, **kwargs)
+
+    body = encode_body({'requestId': u'caf\xe9'}, UnicodeEncoder)
+    assert isinstance(body, str)
+    assert body == '{"requestId": "caf\xc3\xa9"}'
+    assert encode_body({'requestId': u'caf\xe9'}) == '{"requestId": "caf\\u00e9"}'
+
+
+def test_body_reader():
+    from optimo.transports import BodyReader
+
+    for body in ('0123456789', bytearray('0123456789'), memoryview('0123456789')):
+        reader = BodyReader(body)
+        assert len(reader) == 10
+        assert reader.read(4) == '0123'
+        assert reader.tell() == 4
+        assert reader.read() == '456789'
+        assert reader.read(4) == ''
+        assert reader.seek(-3, 2) == 7
+        assert reader.read(100) == '789'
+        reader.seek(0)
+        assert reader.read() == '0123456789'
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+import requests
+
+from optimo.ratelimit import FairScheduler, RateLimitTimeout, Throttle, TokenBucket
+from optimo.registry import ClientRegistry
+
+from tests.util import FakeClock
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [0, 0, 0, 0.5]
+
+    clock.now += 0.25
+    assert bucket.try_acquire() == 0.25
+    clock.now += 0.25
+    assert bucket.try_acquire() == 0
+    # never more than the capacity
+    clock.now += 60
+    assert bucket.tokens == 3
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_token_bucket_acquire_timeout():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+    bucket.acquire()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.5)
+
+
+def test_fair_scheduler_round_robin():
+    scheduler = FairScheduler(TokenBucket(rate=50, capacity=1))
+    scheduler.bucket.try_acquire()  # empty the bucket, so every request waits
+    served = []
+
+    def request(tenant):
+        scheduler.acquire(tenant)
+        served.append(tenant)
+
+    threads = []
+    # a burst of 'busy' requests is queued before the single 'quiet' one
+    for tenant in ['busy'] * 5 + ['quiet']:
+        thread = threading.Thread(target=request, args=(tenant,))
+        thread.start()
+        threads.append(thread)
+        while scheduler.pending() < len(threads) - len(served):
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+
+    assert len(served) == 6
+    assert served.index('quiet') <= 2
+    assert scheduler.pending() == 0
+
+
+def test_fair_scheduler_timeout():
+    scheduler = FairScheduler(TokenBucket(rate=1, capacity=1))
+    scheduler.acquire('a')
+    with pytest.raises(RateLimitTimeout):
+        scheduler.acquire('a', timeout=0.01)
+    assert scheduler.pending('a') == 0
+
+
+def test_throttle():
+    throttle = Throttle(rate=1, burst=2, timeout=0.001)
+    throttle.acquire('key1')
+    throttle.acquire('key1')
+    with pytest.raises(RateLimitTimeout):
+        throttle.acquire('key1')
+    # other keys are not affected
+    throttle.acquire('key2')
+    assert set(throttle.buckets) == set(['key1', 'key2'])
+
+    throttle = Throttle(global_rate=1, global_burst=1, timeout=0.001)
+    throttle.acquire('key1')
+    with pytest.raises(RateLimitTimeout):
+        throttle.acquire('key2')
+    assert not throttle.buckets
+
+
+def test_client_registry():
+    registry = ClientRegistry('https://foo.bar.com', rate=100, compression='gzip')
+    client = registry.get('key1')
+    assert registry.get('key1') is client
+    assert 'key1' in registry
+    other = registry.get('key2')
+    assert len(registry) == 2
+    assert other.access_key == 'key2'
+    assert client.core_api.transport is other.core_api.transport is registry.transport
+    assert client.core_api.throttle is registry.throttle
+    assert client.core_api.compression == 'gzip'
+
+    # requests go through the shared session and the rate limits
+    assert client.get('1234')['requestId'] == '1234'
+    assert 'key1' in registry.throttle.buckets
+
+    registry.remove('key1')
+    assert 'key1' not in registry
+    assert 'key1' not in registry.throttle.buckets
+    registry.close()
+
+
+def test_client_registry_sessions_per_thread():
+    registry = ClientRegistry('https://foo.bar.com')
+    client, other = registry.get('key1'), registry.get('key2')
+    session = client.core_api.get_session()
+    assert isinstance(session, requests.Session)
+    # the accounts share the connections of a thread...
+    assert other.core_api.get_session() is session
+
+    # ...but never a session with another thread
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(other.core_api.get_session()))
+    thread.start()
+    thread.join()
+    assert sessions[0] is not session
+    registry.close()
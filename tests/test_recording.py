@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from optimo import OptimoAPI, OptimoError
+from optimo.recording import RecordingTransport, ReplayTransport, read_exchanges
+from optimo.transports import RequestsTransport
+
+from tests.util import FakeClock
+
+
+@pytest.fixture
+def recording(tmpdir):
+    path = str(tmpdir.join('traffic.rec'))
+    transport = RecordingTransport(RequestsTransport(), path, clock=FakeClock(now=0.0, step=0.5))
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', transport=transport)
+    optimo_api.get('1234')
+    optimo_api.get('0110')
+    optimo_api.core_api.stop_planning({'requestId': '1234'})
+    optimo_api.get('1234')
+    optimo_api.core_api.close()
+    return path
+
+
+def test_recording(recording):
+    with open(recording, 'rb') as fp:
+        exchanges = list(read_exchanges(fp))
+    assert [exchange.method for exchange in exchanges] == ['GET', 'GET', 'POST', 'GET']
+    assert exchanges[0].params == {'requestId': '1234'}
+    assert exchanges[0].data is None
+    assert exchanges[2].data == '{"requestId": "1234"}'
+    assert exchanges[2].url == 'https://foo.bar.com/v1/stop_planning'
+    assert all(exchange.elapsed == 0.5 for exchange in exchanges)
+    with open(recording, 'rb') as fp:
+        assert 'foobarkey' not in fp.read()
+
+
+def test_replay(recording):
+    slept = []
+    transport = ReplayTransport(recording, speed=10, sleep=slept.append)
+    # any access key
+    optimo_api = OptimoAPI('https://foo.bar.com', 'otherkey', transport=transport)
+    assert transport.remaining() == 4
+
+    assert optimo_api.get('0110') is None
+    assert optimo_api.get('1234')['requestId'] == '1234'
+    assert optimo_api.get('1234')['requestId'] == '1234'
+    with pytest.raises(OptimoError) as excinfo:
+        optimo_api.get('1234')
+    assert str(excinfo.value).startswith('No recorded response left for GET')
+    assert slept == [0.05, 0.05, 0.05]
+    assert transport.remaining() == 1
+
+    with pytest.raises(OptimoError):
+        optimo_api.get('0000')
+
+
+def test_replay_timing(recording):
+    slept = []
+    transport = ReplayTransport(recording, speed=None, loop=True, sleep=slept.append)
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', transport=transport)
+    for _ in range(5):
+        assert optimo_api.get('1234')['requestId'] == '1234'
+    assert slept == []
+
+    transport = ReplayTransport(recording, sleep=slept.append)
+    OptimoAPI('https://foo.bar.com', 'foobarkey', transport=transport).get('1234')
+    assert slept == [0.5]
+
+    with pytest.raises(ValueError):
+        ReplayTransport(recording, speed=0)
+
+
+def test_truncated_recording(recording):
+    with open(recording, 'rb') as fp:
+        content = fp.read()
+    with open(recording, 'wb') as fp:
+        fp.write(content[:-5])
+    with pytest.raises(OptimoError):
+        ReplayTransport(recording)
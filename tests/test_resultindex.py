@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+from optimo.resultindex import ResultIndex, Stop
+
+
+def dt(hour, minute=0):
+    return datetime.datetime(2014, 12, 5, hour, minute)
+
+
+RESULT = {
+    'success': True,
+    'requestId': '1234',
+    'result': {
+        'routes': [
+            {'driverId': 'drv1', 'orders': [
+                {'id': '1', 'scheduledAt': '2014-12-05T08:00'},
+                {'id': '2', 'scheduledAt': '2014-12-05T10:00'},
+                {'id': '3', 'scheduledAt': '2014-12-05T10:30'},
+                {'id': '4'},
+            ]},
+            {'driverId': 'drv2', 'orders': [
+                {'id': '5', 'scheduledAt': '2014-12-05T09:00'},
+                {'id': '6', 'scheduledAt': '2014-12-05T11:00'},
+            ]},
+            {'driverId': 'drv3', 'orders': []},
+        ],
+        'unservedOrders': ['7'],
+    },
+}
+
+
+@pytest.fixture
+def index():
+    return ResultIndex(RESULT)
+
+
+def test_between(index):
+    assert len(index) == 5
+    assert [stop.order_id for stop in index.between(dt(10), dt(11))] == ['2', '3']
+    assert [stop.order_id for stop in index.between(dt(8), dt(12))] == ['1', '5', '2', '3', '6']
+    assert index.between(dt(8), dt(12), driver_id='drv2') == [
+        Stop('5', 'drv2', dt(9), 0), Stop('6', 'drv2', dt(11), 1)]
+    assert index.between(dt(12), dt(13)) == []
+    assert index.between(dt(10), dt(10)) == []
+
+
+def test_current_and_next_stop(index):
+    assert index.current_stop('drv1', dt(10, 15)).order_id == '2'
+    assert index.current_stop('drv1', dt(10)).order_id == '2'
+    assert index.current_stop('drv1', dt(7)) is None
+    assert index.current_stop('drv3', dt(10)) is None
+
+    assert index.next_stop(dt(10), driver_id='drv1').order_id == '3'
+    assert index.next_stop(dt(10, 30), driver_id='drv1') is None
+    assert index.next_stop(dt(9)).order_id == '2'
+    assert index.next_stop(dt(7)).order_id == '1'
+
+    with pytest.raises(KeyError):
+        index.current_stop('unknown', dt(10))
+
+
+def test_stops(index):
+    assert [stop.order_id for stop in index.stops('drv1')] == ['1', '2', '3']
+    assert index.driver_ids == ['drv1', 'drv2', 'drv3']
+    assert index.unscheduled == [Stop('4', 'drv1', None, 3)]
+    assert index.stop('3') == Stop('3', 'drv1', dt(10, 30), 2)
+    assert index.stop('4').scheduled_at is None
+    assert index.stop('7') is None
+    assert len(ResultIndex(RESULT['result'])) == 5
+    assert len(ResultIndex({'success': True, 'result': None})) == 0
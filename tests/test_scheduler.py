@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from optimo import OptimoAPI
+from optimo.scheduler import DeadlineExceeded, RequestScheduler, RequestShed
+
+
+def wait_for_depth(scheduler, depth):
+    while scheduler.depth() < depth:
+        time.sleep(0.001)
+
+
+def test_admits_up_to_max_concurrency():
+    scheduler = RequestScheduler(max_concurrency=2)
+    scheduler.acquire('plan_routes')
+    scheduler.acquire('plan_routes')
+    assert scheduler.active == 2
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire('get_result', timeout=0.01)
+    scheduler.release()
+    scheduler.acquire('get_result', timeout=0.01)
+    assert scheduler.active == 2
+
+    with pytest.raises(ValueError):
+        RequestScheduler(max_concurrency=0)
+
+
+def test_priorities():
+    scheduler = RequestScheduler(max_concurrency=1)
+    scheduler.acquire('plan_routes')
+    served = []
+
+    def request(endpoint):
+        with scheduler.slot(endpoint):
+            served.append(endpoint)
+
+    threads = []
+    for endpoint in ('plan_routes', 'get_result', 'plan_routes', 'stop_planning'):
+        thread = threading.Thread(target=request, args=(endpoint,))
+        thread.start()
+        threads.append(thread)
+        wait_for_depth(scheduler, len(threads))
+
+    assert scheduler.depth('plan_routes') == 2
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert served == ['stop_planning', 'get_result', 'plan_routes', 'plan_routes']
+    assert scheduler.active == 0
+    assert scheduler.depth() == 0
+
+
+def test_load_shedding():
+    scheduler = RequestScheduler(max_concurrency=1, max_queue_size={'plan_routes': 1})
+    scheduler.acquire('stop_planning')
+    thread = threading.Thread(target=scheduler.acquire, args=('plan_routes',))
+    thread.start()
+    wait_for_depth(scheduler, 1)
+
+    with pytest.raises(RequestShed):
+        scheduler.acquire('plan_routes')
+    metrics = scheduler.metrics()
+    assert metrics['plan_routes']['shed'] == 1
+    assert metrics['plan_routes']['depth'] == 1
+    assert metrics['plan_routes']['max_depth'] == 1
+
+    scheduler.release()
+    thread.join()
+    assert scheduler.active == 1
+
+
+def test_deadlines_and_metrics():
+    scheduler = RequestScheduler(max_concurrency=1, timeouts={'plan_routes': 0.01})
+    scheduler.acquire('get_result')
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire('plan_routes')
+
+    thread = threading.Thread(target=scheduler.acquire, args=('get_result',))
+    thread.start()
+    wait_for_depth(scheduler, 1)
+    time.sleep(0.02)
+    scheduler.release()
+    thread.join()
+
+    metrics = scheduler.metrics()
+    assert metrics['plan_routes']['expired'] == 1
+    assert metrics['plan_routes']['admitted'] == 0
+    assert metrics['plan_routes']['depth'] == 0
+    assert metrics['get_result']['admitted'] == 2
+    assert metrics['get_result']['wait_max'] >= 0.02
+    assert metrics['get_result']['wait_mean'] == metrics['get_result']['wait_total'] / 2
+
+
+def test_optimo_api_scheduler():
+    scheduler = RequestScheduler()
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', scheduler=scheduler)
+    assert optimo_api.get('1234')['requestId'] == '1234'
+    assert scheduler.metrics()['get_result']['admitted'] == 1
+    assert scheduler.active == 0
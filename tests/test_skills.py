@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import pickle
+from datetime import datetime
+
+import pytest
+
+from optimo import Driver, Order, RoutePlan, WorkShift
+from optimo.feasibility import analyze_feasibility
+from optimo.skills import SKILLS, SkillMatcher, SkillRegistry, has_skills
+
+
+def test_registry():
+    registry = SkillRegistry()
+    assert registry.mask([]) == 0
+    assert registry.bit('fridge') == 1
+    assert registry.bit('lift') == 2
+    assert registry.bit('fridge') == 1
+    assert registry.mask(['lift', 'crane', 'fridge']) == 7
+    assert len(registry) == 3
+    assert 'crane' in registry and 'ladder' not in registry
+    assert registry.names(5) == ['fridge', 'crane']
+    assert registry.names(0) == []
+
+
+def test_has_skills():
+    assert has_skills(0b111, 0b101)
+    assert has_skills(0b100, 0)
+    assert not has_skills(0b011, 0b101)
+
+
+def test_model_skill_mask():
+    order = Order('1', 53.3, -6.2, 10, skills=['fridge', 'lift'])
+    assert order.skill_mask == SKILLS.mask(['fridge', 'lift'])
+    # the mask follows new skills lists
+    order.skills = order.skills + ['hazmat']
+    assert sorted(SKILLS.names(order.skill_mask)) == ['fridge', 'hazmat', 'lift']
+    order.skills = []
+    assert order.skill_mask == 0
+
+    drv = Driver('drv1', 53.3, -6.2, 53.3, -6.2)
+    drv.skill_mask = SKILLS.mask(['lift', 'fridge'])
+    assert sorted(drv.skills) == ['fridge', 'lift']
+    # serialization still emits the names
+    assert drv.as_optimo_schema(validate=False)['skills'] == drv.skills
+
+
+@pytest.fixture
+def drivers():
+    return [
+        Driver('1', 53.3, -6.2, 53.3, -6.2, skills=['fridge']),
+        Driver('2', 53.3, -6.2, 53.3, -6.2, skills=['fridge', 'lift']),
+        Driver('3', 53.3, -6.2, 53.3, -6.2, skills=['lift', 'fridge']),
+        Driver('4', 53.3, -6.2, 53.3, -6.2),
+    ]
+
+
+def test_matcher(drivers):
+    matcher = SkillMatcher(drivers)
+    assert matcher.drivers_with([]) == frozenset(['1', '2', '3', '4'])
+    assert matcher.drivers_with(['fridge']) == frozenset(['1', '2', '3'])
+    assert matcher.drivers_with(['lift', 'fridge']) == frozenset(['2', '3'])
+    assert matcher.drivers_with(['crane']) == frozenset()
+    order = Order('1', 53.3, -6.2, 10, skills=['lift'])
+    assert matcher.drivers_for(order.skill_mask) is matcher.drivers_for(order.skill_mask)
+
+
+def test_scoped_registry(drivers):
+    registry = SkillRegistry()
+    matcher = SkillMatcher(drivers, registry=registry)
+    order = Order('1', 53.3, -6.2, 10, skills=['lift', 'scoped-only'])
+    assert order.get_skill_mask(registry) == 0b110
+    assert matcher.drivers_for(order.get_skill_mask(registry)) == frozenset()
+    order.skills = ['lift']
+    assert matcher.drivers_for(order.get_skill_mask(registry)) == frozenset(['2', '3'])
+    # the shared registry is left alone
+    assert 'scoped-only' not in SKILLS
+    assert order.skill_mask == SKILLS.mask(['lift'])
+
+
+def test_models_with_cached_masks_can_be_copied():
+    dtime = datetime(year=2014, month=12, day=5, hour=8)
+    drivers = [Driver('1', 53.3, -6.2, 53.3, -6.2, skills=['fridge'],
+                      work_shifts=[WorkShift(dtime, dtime.replace(hour=12))])]
+    orders = [Order('1', 53.3, -6.2, 10, skills=['fridge']),
+              Order('2', 53.3, -6.2, 10, skills=['crane'])]
+    routeplan = RoutePlan('1234', 'https://callback.com', 'https://status.callback.com',
+                          orders=orders, drivers=drivers)
+    assert len(analyze_feasibility(routeplan)) == 1
+    mask = orders[0].skill_mask
+
+    snapshot = routeplan.snapshot(deep=True)
+    assert snapshot.orders[0] is not orders[0]
+    assert snapshot.orders[0].skill_mask == mask
+    order = pickle.loads(pickle.dumps(orders[0], pickle.HIGHEST_PROTOCOL))
+    assert order.skill_mask == mask
+    drv = pickle.loads(pickle.dumps(drivers[0]))
+    assert drv.get_skill_mask(SkillRegistry()) == 1
+
+
+def test_matcher_agrees_with_sets(drivers):
+    matcher = SkillMatcher(drivers)
+    for skills in ([], ['fridge'], ['lift'], ['fridge', 'lift'], ['lift', 'crane']):
+        expected = frozenset(drv.id for drv in drivers if set(skills) <= set(drv.skills))
+        assert matcher.drivers_with(skills) == expected
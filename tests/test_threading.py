@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+import threading
+from decimal import Decimal
+
+import pytest
+
+from optimo import (
+    WorkShift,
+    OptimoAPI,
+    Driver,
+    Order,
+    RoutePlan,
+)
+from optimo.base import CoreOptimoAPI
+
+
+@pytest.fixture
+def route_plan():
+    d1 = datetime.datetime(year=2014, month=12, day=5, hour=8, minute=0)
+    d2 = datetime.datetime(year=2014, month=12, day=5, hour=14, minute=0)
+    drv = Driver('123', Decimal('53.350046'), Decimal('-6.274655'),
+                 Decimal('53.341191'), Decimal('-6.260402'), work_shifts=[WorkShift(d1, d2)])
+    orders = [Order(str(i), Decimal('53.343204'), Decimal('-6.269798'), 20) for i in range(50)]
+    return RoutePlan('4321', 'https://callback.com/1234', 'https://status.callback.com/1234',
+                     orders=orders, drivers=[drv])
+
+
+def run_threads(target, no_threads):
+    errors = []
+
+    def run():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(no_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_session_per_thread():
+    core_api = CoreOptimoAPI('https://foo.bar.com', 'v1', 'foobarkey')
+    sessions = []
+    lock = threading.Lock()
+
+    def get_sessions():
+        session = core_api.get_session()
+        assert core_api.get_session() is session
+        with lock:
+            sessions.append(session)
+
+    assert run_threads(get_sessions, 8) == []
+    assert len(set(map(id, sessions))) == 8
+
+    shared = object()
+    core_api = CoreOptimoAPI('https://foo.bar.com', 'v1', 'foobarkey', session=shared)
+    assert core_api.get_session() is shared
+
+
+def test_snapshot(route_plan):
+    snapshot = route_plan.snapshot()
+    assert isinstance(snapshot.orders, tuple)
+    assert list(snapshot.orders) == route_plan.orders
+    assert snapshot.drivers[0] is route_plan.drivers[0]
+
+    route_plan.orders.append(Order('new', 53.3, -6.2, 10))
+    assert len(snapshot.orders) == 50
+
+    route_plan.orders[0].assigned_to = route_plan.drivers[0]
+    deep = route_plan.snapshot(deep=True)
+    assert deep.orders[0] is not route_plan.orders[0]
+    assert deep.orders[0].assigned_to is deep.drivers[0]
+    route_plan.orders[1].duration = -1
+    assert deep.orders[1].duration == 20
+    deep.validate()
+
+
+def test_concurrent_use(monkeypatch, route_plan):
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey')
+    sent_bodies = []
+    raw_request = CoreOptimoAPI.raw_request
+
+    def recording_raw_request(self, url, method, params, data=None, headers=None):
+        if data is not None:
+            sent_bodies.append(json.loads(str(data)))
+        return raw_request(self, url, method, params, data, headers)
+
+    monkeypatch.setattr(CoreOptimoAPI, 'raw_request', recording_raw_request)
+    stop = threading.Event()
+
+    def mutate():
+        # keep adding and removing orders while the plan is being sent
+        idx = 0
+        while not stop.is_set():
+            idx += 1
+            route_plan.orders.append(Order('extra{}'.format(idx), 53.3, -6.2, 10))
+            if len(route_plan.orders) > 60:
+                route_plan.orders.pop(50)
+
+    def use_api():
+        for _ in range(20):
+            optimo_api.plan(route_plan)
+            assert optimo_api.get('1234')['requestId'] == '1234'
+
+    mutator = threading.Thread(target=mutate)
+    mutator.start()
+    try:
+        errors = run_threads(use_api, 8)
+    finally:
+        stop.set()
+        mutator.join()
+
+    assert errors == []
+    assert len(sent_bodies) == 8 * 20
+    for body in sent_bodies:
+        order_ids = [order['id'] for order in body['orders']]
+        assert len(order_ids) == len(set(order_ids)) >= 50
+        assert order_ids[:50] == [str(i) for i in range(50)]
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import gc
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from optimo import OptimoAPI, OptimoError
+from optimo.transports import HTTP2Transport, RequestsTransport, Transport, Urllib3Transport
+
+
+class FakeResponse(object):
+    status = 200
+    headers = {'Content-Type': 'application/json'}
+    data = '{"success":true,"requestId":"1234"}'
+
+
+class FakeHTTP2Headers(object):
+    def __init__(self, headers):
+        self.headers = headers
+
+    def iter_raw(self):
+        return iter(self.headers)
+
+
+class FakeHTTP2Response(object):
+    status = 200
+    headers = FakeHTTP2Headers([('content-type', 'application/json'),
+                                ('vary', 'Accept'), ('vary', 'Cookie')])
+
+    def read(self):
+        return '{"success":true,"requestId":"1234"}'
+
+
+class FakeHTTP20Connection(object):
+    def __init__(self, host, secure=False, timeout=None):
+        self.host = host
+        self.secure = secure
+        self.timeout = timeout
+        self.requests = []
+        self.closed = False
+
+    def request(self, method, path, body=None, headers=None):
+        self.requests.append((method, path, body, headers))
+        return len(self.requests)
+
+    def get_response(self, stream_id):
+        assert stream_id == len(self.requests)
+        return FakeHTTP2Response()
+
+    def close(self):
+        self.closed = True
+
+
+class FakePoolManager(object):
+    def __init__(self):
+        self.calls = []
+        self.cleared = False
+
+    def urlopen(self, method, url, body=None, headers=None, **kwargs):
+        self.calls.append((method, url, body if body is None else body.tobytes(), headers))
+        return FakeResponse()
+
+    def clear(self):
+        self.cleared = True
+
+
+def test_default_transport():
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey')
+    assert isinstance(optimo_api.core_api.transport, RequestsTransport)
+    assert optimo_api.get('1234')['requestId'] == '1234'
+    optimo_api.core_api.close()
+    assert len(optimo_api.core_api.transport._sessions) == 1
+    # closed sessions open new connections when used again
+    assert optimo_api.get('1234')['requestId'] == '1234'
+
+
+def test_sessions_of_exited_threads_are_dropped():
+    transport = RequestsTransport()
+    session = transport.get_session()
+    threads = [threading.Thread(target=transport.get_session) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    del thread, threads
+    # join() may return before the thread's locals are freed
+    deadline = time.time() + 5
+    while len(transport._sessions) > 1 and time.time() < deadline:
+        gc.collect()
+        time.sleep(0.01)
+    assert list(transport._sessions) == [session]
+
+
+def test_urllib3_transport():
+    pool_manager = FakePoolManager()
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey',
+                           transport=Urllib3Transport(pool_manager))
+    assert optimo_api.get('1234')['requestId'] == '1234'
+    optimo_api.core_api.stop_planning({'requestId': '1234'})
+
+    get, post = pool_manager.calls
+    assert get[:3] == ('GET', 'https://foo.bar.com/v1/get_result?requestId=1234&key=foobarkey', None) or \
+        get[:3] == ('GET', 'https://foo.bar.com/v1/get_result?key=foobarkey&requestId=1234', None)
+    assert post[:3] == ('POST', 'https://foo.bar.com/v1/stop_planning?key=foobarkey',
+                        '{"requestId": "1234"}')
+    assert post[3] == {'Content-Length': '21'}
+
+    optimo_api.core_api.close()
+    assert pool_manager.cleared
+
+    # a real pool manager is created by default
+    import urllib3
+    assert isinstance(Urllib3Transport(maxsize=2).pool_manager, urllib3.PoolManager)
+
+
+def test_http2_transport():
+    try:
+        import hyper  # noqa
+    except ImportError:
+        with pytest.raises(OptimoError) as excinfo:
+            HTTP2Transport()
+        assert str(excinfo.value) == "HTTP2Transport requires the 'hyper' package"
+    else:
+        transport = HTTP2Transport()
+        connection = transport.get_connection('https', 'foo.bar.com')
+        assert transport.get_connection('https', 'foo.bar.com') is connection
+
+
+def test_http2_transport_request(monkeypatch):
+    hyper = types.ModuleType('hyper')
+    hyper.HTTP20Connection = FakeHTTP20Connection
+    monkeypatch.setitem(sys.modules, 'hyper', hyper)
+
+    transport = HTTP2Transport(timeout=5)
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey', transport=transport)
+    assert optimo_api.get('1234')['requestId'] == '1234'
+    optimo_api.core_api.stop_planning({'requestId': '1234'})
+
+    connection = transport.get_connection('https', 'foo.bar.com')
+    assert (connection.host, connection.secure, connection.timeout) == ('foo.bar.com', True, 5)
+    get, post = connection.requests
+    assert get[:3] == ('GET', '/v1/get_result?requestId=1234&key=foobarkey', None) or \
+        get[:3] == ('GET', '/v1/get_result?key=foobarkey&requestId=1234', None)
+    assert post[:3] == ('POST', '/v1/stop_planning?key=foobarkey', '{"requestId": "1234"}')
+
+    response = transport.request('http://foo.bar.com', 'GET', {})
+    assert response == {
+        'status_code': 200,
+        'headers': {'content-type': 'application/json', 'vary': 'Accept, Cookie'},
+        'content': '{"success":true,"requestId":"1234"}'
+    }
+    # each host gets a connection of its own
+    assert transport.get_connection('http', 'foo.bar.com').requests == [('GET', '/', None, {})]
+
+    transport.close()
+    assert connection.closed
+    assert transport.get_connection('https', 'foo.bar.com') is not connection
+
+
+def test_base_transport():
+    with pytest.raises(TypeError):
+        Transport()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import datetime
+
+import pytest
+
+from optimo import (
+    WorkShift,
+    Driver,
+    Order,
+    RoutePlan,
+    Break,
+    SchedulingInfo,
+    TimeWindow,
+    ServiceRegionPolygon,
+    OptimoAPI,
+)
+from optimo.errors import OptimoValidationError
+from optimo.validation import validate_route_plan
+
+
+dtime = datetime(year=2014, month=12, day=5, hour=8, minute=0)
+
+
+@pytest.fixture
+def routeplan():
+    drv = Driver('drv1', 53.35, -6.27, 53.34, -6.26,
+                 work_shifts=[WorkShift(dtime, dtime, break_=Break(dtime, dtime, 5))])
+    orders = [Order(str(i), 53.34, -6.26, 20, time_window=TimeWindow(dtime, dtime))
+              for i in range(100)]
+    return RoutePlan(request_id='4321', callback_url='https://callback.com/1234',
+                     status_callback_url='https://status.callback.com/1234',
+                     orders=orders, drivers=[drv])
+
+
+def test_valid(routeplan):
+    report = routeplan.collect_errors()
+    assert report.is_valid
+    assert len(report) == 0
+    # plan, optimization parameters, orders, time windows, driver, work shift, break
+    assert report.validated == 1 + 100 * 2 + 3
+    assert report.raise_for_errors() is None
+
+
+def test_collects_every_error(routeplan):
+    routeplan.callback_url = 5
+    routeplan.orders[3].duration = -1
+    routeplan.orders[12].time_window.start_time = 'noon'
+    routeplan.orders[12].time_window = TimeWindow('noon', dtime)
+    routeplan.orders[50].assigned_to = 'drv2'
+    routeplan.orders[51].scheduling_info = SchedulingInfo(dtime, 'drv3')
+    routeplan.orders[60] = 'not an order'
+    routeplan.drivers[0].work_shifts[0].break_.duration = 1.5
+    routeplan.drivers[0].service_regions = [ServiceRegionPolygon([(0, 0), (0, 1)])]
+
+    report = validate_route_plan(routeplan)
+    assert not report.is_valid
+    assert [issue.path for issue in report] == [
+        'callback_url',
+        'orders[3].duration',
+        'orders[12].time_window.start_time',
+        'orders[50].assigned_to',
+        'orders[51].scheduling_info.scheduled_driver',
+        'orders[60]',
+        'drivers[0].work_shifts[0].break_.duration',
+        'drivers[0].service_regions[0].lat_lng_pairs',
+    ]
+    assert isinstance(report.issues[1].error, ValueError)
+
+    with pytest.raises(OptimoValidationError) as excinfo:
+        report.raise_for_errors()
+    assert len(excinfo.value.errors) == 8
+    assert excinfo.value.errors[1] == "orders[3].duration: 'Order.duration' cannot be negative"
+
+
+def test_fail_fast(routeplan):
+    routeplan.orders[3].duration = -1
+    routeplan.orders[4].duration = -1
+    report = validate_route_plan(routeplan, fail_fast=True)
+    assert [issue.path for issue in report] == ['orders[3].duration']
+
+
+def test_empty_lists(routeplan):
+    routeplan.orders = []
+    routeplan.drivers = 3
+    assert [issue.path for issue in validate_route_plan(routeplan)] == ['drivers', 'orders']
+
+
+def test_sampling(routeplan):
+    report = validate_route_plan(routeplan, sample=0.1, seed=1)
+    # plan, optimization parameters, 10 orders with their time windows, the driver
+    assert report.validated == 1 + 10 * 2 + 3
+
+    routeplan.orders[7].duration = -1
+    reports = [validate_route_plan(routeplan, sample=0.1, seed=seed) for seed in range(50)]
+    assert any(r.is_valid for r in reports)
+    assert any(not r.is_valid for r in reports)
+
+    with pytest.raises(ValueError):
+        validate_route_plan(routeplan, sample=0)
+
+
+def test_sampled_plan(routeplan, monkeypatch):
+    from optimo.base import CoreOptimoAPI
+
+    sent = {}
+
+    def raw_request(self, url, method, params, data=None, headers=None):
+        sent['data'] = data
+        return {'status_code': 200, 'headers': {}, 'content': '{"success":true}'}
+    monkeypatch.setattr(CoreOptimoAPI, 'raw_request', raw_request)
+
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey')
+    assert optimo_api.plan(routeplan, validation_sample=0.5) is None
+    sampled = sent['data']
+    assert optimo_api.plan(routeplan) is None
+    assert json.loads(sampled) == json.loads(sent['data'])
+
+    routeplan.callback_url = 'callback.com'
+    with pytest.raises(OptimoValidationError):
+        optimo_api.plan(routeplan, validation_sample=0.5)
+
+
+def test_plan_uses_the_compiled_validators(routeplan, monkeypatch):
+    from optimo.base import CoreOptimoAPI
+
+    sent = []
+    raw_request = CoreOptimoAPI.raw_request
+    monkeypatch.setattr(CoreOptimoAPI, 'raw_request',
+                        lambda self, *args: sent.append(args) or raw_request(self, *args))
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey')
+    checked = []
+    check_order = optimo_api.validators.checks[Order]
+    monkeypatch.setitem(optimo_api.validators.checks, Order,
+                        lambda order: checked.append(order) or check_order(order))
+
+    # out of range, which only the schema checks
+    for order in routeplan.orders:
+        order.lat = 91
+    with pytest.raises(OptimoValidationError) as excinfo:
+        optimo_api.plan(routeplan, validation_sample=0.5)
+    assert excinfo.value.errors[0].endswith(": 'Order.lat' must be <= 90")
+    assert len(checked) == 1
+    assert sent == []
+
+    # the whole plan is validated by the models, like it always was
+    optimo_api.plan(routeplan)
+    assert len(checked) == 1
+    assert len(sent) == 1
+
+
+def _plan_without_work_shifts():
+    drv = Driver('drv1', 53.35, -6.27, 53.34, -6.26, work_shifts=[])
+    return RoutePlan('4321', 'https://callback.com/1234', 'https://status.callback.com/1234',
+                     orders=[Order('1', 53.34, -6.26, 20)], drivers=[drv])
+
+
+def _plan_without_status_callback():
+    drv = Driver('drv1', 53.35, -6.27, 53.34, -6.26, work_shifts=[WorkShift(dtime, dtime)])
+    return RoutePlan('4321', 'https://callback.com/1234', None,
+                     orders=[Order('1', 53.34, -6.26, 20)], drivers=[drv])
+
+
+def _plan_with_unicode_order_id():
+    drv = Driver('drv1', 53.35, -6.27, 53.34, -6.26, work_shifts=[WorkShift(dtime, dtime)])
+    return RoutePlan('4321', 'https://callback.com/1234', 'https://status.callback.com/1234',
+                     orders=[Order(u'1', 53.34, -6.26, 20)], drivers=[drv])
+
+
+@pytest.mark.parametrize('validation_sample', [1.0, 0.5])
+@pytest.mark.parametrize('make_plan', [
+    _plan_without_work_shifts,
+    _plan_without_status_callback,
+    _plan_with_unicode_order_id,
+])
+def test_plan_rejects_what_the_models_reject(monkeypatch, make_plan, validation_sample):
+    from optimo.base import CoreOptimoAPI
+
+    sent = []
+    monkeypatch.setattr(CoreOptimoAPI, 'raw_request', lambda self, *args, **kwargs: sent.append(args))
+    optimo_api = OptimoAPI('https://foo.bar.com', 'foobarkey')
+    with pytest.raises((TypeError, ValueError)):
+        optimo_api.plan(make_plan(), validation_sample=validation_sample)
+    assert sent == []
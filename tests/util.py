@@ -100,3 +100,16 @@ class MockedResponse(object):
         self.content = content
         self.headers = headers
         self.status_code = status_code
+
+
+class FakeClock(object):
+    """Clock for the ``clock`` parameters, that only moves when told to (or
+    by ``step`` seconds on every call).
+    """
+    def __init__(self, now=1000.0, step=0.0):
+        self.now = now
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now